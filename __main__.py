@@ -21,14 +21,15 @@ lHelper project: python application for helping me learn Latin
 
 import argparse
 from sys import path
-from os import chdir
-from os.path import dirname, abspath
+from os import chdir, getcwd
+from os.path import dirname, abspath, join
 
 ENABLE_DATA_COMMANDS = False
 
 __version__ = "1.4.7"
 __author__ = "Julian Mueller"
 
+working_directory = getcwd()
 path_to_main = abspath(__file__)
 path.append(dirname(path_to_main))
 chdir(dirname(path_to_main))
@@ -36,10 +37,35 @@ chdir(dirname(path_to_main))
 parser = argparse.ArgumentParser()
 parser.add_argument("-g", "--gui", action="store_const", const="gui", default="cli", dest="ui",
                     help="Run the program with a GUI instead of a CLI.")
-ui_choice = parser.parse_args().ui
+parser.add_argument("-d", "--daemon", action="store_const", const="daemon", dest="ui",
+                    help="Keep the data loaded in a daemon serving CLI sessions to clients.")
+parser.add_argument("-c", "--client", action="store_const", const="client", dest="ui",
+                    help="Run the CLI in a running daemon. Falls back to a normal CLI if no daemon is running.")
+parser.add_argument("-s", "--server", action="store_const", const="server", dest="ui",
+                    help="Serve the reviews of several users over HTTP, see server.py.")
+parser.add_argument("-p", "--port", type=int, default=8080, help="The port of the server, 8080 by default.")
+parser.add_argument("-b", "--batch", metavar="FILE",
+                    help="Run the commands and answers in FILE ('-' for stdin) without prompts, "
+                         "printing a JSON line for each command and answer.")
+args = parser.parse_args()
+ui_choice = "batch" if args.batch else args.ui
+if ui_choice == "client":
+    import client
+    if not client.main():
+        ui_choice = "cli"
 if ui_choice == "cli":
     import cli
     cli.main(__version__, enable_data_commands=ENABLE_DATA_COMMANDS)
+elif ui_choice == "daemon":
+    import cli.daemon
+    cli.daemon.serve(__version__, enable_data_commands=ENABLE_DATA_COMMANDS)
+elif ui_choice == "batch":
+    import cli.batch
+    cli.batch.main(args.batch if args.batch == "-" else join(working_directory, args.batch),
+                   enable_data_commands=ENABLE_DATA_COMMANDS)
+elif ui_choice == "server":
+    import server
+    server.serve(port=args.port)
 elif ui_choice == "gui":
     import main
     main.main()
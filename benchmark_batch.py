@@ -0,0 +1,99 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Benchmarks the batch mode by replaying a recorded session of correct answers to single cards.
+The session runs on a copy of the card database in a temporary directory.
+Usage: python benchmark_batch.py [card_count [rounds]]
+"""
+
+from io import StringIO
+from os import chdir
+from os.path import abspath, dirname, join
+from random import Random
+from shutil import copy
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import List
+import json
+import sys
+
+USER_NAME = "benchmark"
+
+
+def record_session(card_ids: List[int], rounds: int) -> str:
+    """
+    Records a batch using each card and questioning it rounds times, answering every question correctly.
+    :param card_ids: the cards to be questioned
+    :param rounds: how often each card is questioned
+    :return: the batch
+    """
+    from data.cardManager import CardManager
+    from data.grading import get_prompts
+
+    lines = ["user " + USER_NAME]
+    for card in CardManager.load_cards(card_ids):
+        answers = [", ".join(sorted(prompt.solution)) for prompt in get_prompts(card)]
+
+        lines.append("use {}".format(card.get_id()))
+        for _ in range(rounds):
+            lines += ["question {}".format(card.get_id())] + answers
+
+    lines.append("exit")
+    return "\n".join(lines) + "\n"
+
+
+def main(card_count: int, rounds: int):
+    """
+    Runs the benchmark.
+    :param card_count: the amount of cards to be questioned
+    :param rounds: how often each card is questioned
+    """
+    with TemporaryDirectory() as directory:
+        copy(join(dirname(abspath(__file__)), "data.sqlite3"), directory)
+        chdir(directory)
+
+        from cli.batch import run
+        from data import database_manager
+        from language import Latin
+
+        card_ids = sorted({card_id for _, _, card_id in database_manager.get_phrase_cards(Latin.name)})
+        card_ids = sorted(Random(0).sample(card_ids, min(card_count, len(card_ids))))
+        batch = record_session(card_ids, rounds)
+
+        records = StringIO()
+        start = perf_counter()
+        run(StringIO(batch), records)
+        duration = perf_counter() - start
+
+    counts = {}
+    statuses = {}
+    for record in map(json.loads, records.getvalue().splitlines()):
+        counts[record["type"]] = counts.get(record["type"], 0) + 1
+        if record["type"] == "command":
+            statuses[record["status"]] = statuses.get(record["status"], 0) + 1
+
+    print("replayed {} commands and {} answers in {:.2f}s".format(
+        counts.get("command", 0), counts.get("answer", 0), duration))
+    print("{:.0f} answers/s, {:.0f} commands/s".format(
+        counts.get("answer", 0) / duration, counts.get("command", 0) / duration))
+    print("command status:", ", ".join("{} {}".format(count, status) for status, count in sorted(statuses.items())))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000, int(sys.argv[2]) if len(sys.argv) > 2 else 3)
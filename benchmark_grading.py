@@ -0,0 +1,84 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Benchmarks the grading engine on all cards, with correct answers, answers with typos and wrong answers.
+Usage: python benchmark_grading.py [grading_count]
+"""
+
+from data import database_manager
+from data.cardManager import CardManager
+from data.grading import get_prompts, grade_many, CORRECT, AGAIN, WRONG
+from language import Latin
+
+from random import Random
+from time import perf_counter
+import sys
+
+
+def make_answer(solution, random: Random) -> str:
+    """
+    Generates an answer: correct, with a typo, incomplete or wrong.
+    :param solution: the correct phrases
+    :param random: the random number generator
+    :return: the answer
+    """
+    phrases = sorted(solution)
+    kind = random.randrange(4)
+    if kind == 1:  # a switched pair of characters
+        phrase = phrases[0]
+        if len(phrase) > 2:
+            i = random.randrange(len(phrase) - 1)
+            phrases[0] = phrase[:i] + phrase[i + 1] + phrase[i] + phrase[i + 2:]
+    elif kind == 2:  # incomplete
+        phrases = phrases[1:]
+    elif kind == 3:  # wrong
+        phrases = ["falsch"] + phrases[1:]
+    return ", ".join(phrases)
+
+
+def main(grading_count: int):
+    """
+    Runs the benchmark.
+    :param grading_count: the amount of gradings
+    """
+    random = Random(0)
+    card_ids = sorted({card_id for _, _, card_id in database_manager.get_phrase_cards(Latin.name)})
+    cards = CardManager.load_cards(card_ids)
+
+    submissions = []
+    for _ in range(grading_count):
+        card = random.choice(cards)
+        submissions.append((card, [make_answer(prompt.solution, random) for prompt in get_prompts(card)]))
+
+    start = perf_counter()
+    results = list(grade_many(submissions))
+    duration = perf_counter() - start
+
+    counts = {CORRECT: 0, AGAIN: 0, WRONG: 0}
+    for result in results:
+        counts[result.get_result()] += 1
+    answer_count = sum(len(answers) for _, answers in submissions)
+
+    print("graded {} cards with {} answers in {:.2f}s".format(len(results), answer_count, duration))
+    print("{:.0f} gradings/s, {:.0f} answers/s".format(len(results) / duration, answer_count / duration))
+    print("correct {}, again {}, wrong {}".format(counts[CORRECT], counts[AGAIN], counts[WRONG]))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,92 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Benchmarks regular expression lookups with and without the trigram index on a synthetic catalog.
+Usage: python benchmark_trigram_index.py [phrase_count]
+"""
+
+from data.trigramIndex import TrigramIndex
+
+from random import Random
+from re import compile
+from time import perf_counter
+import sys
+
+SYLLABLES = ["a", "ab", "ad", "am", "an", "ar", "ca", "ce", "co", "cu", "de", "di", "do", "du", "e", "ex", "fa", "fe",
+             "fi", "ge", "gra", "i", "in", "la", "le", "li", "lo", "ma", "me", "mi", "mo", "mu", "na", "ne", "ni", "no",
+             "o", "ob", "pa", "pe", "per", "po", "pro", "qua", "que", "ra", "re", "ri", "ro", "sa", "se", "si", "so",
+             "spe", "ta", "te", "ti", "to", "tra", "tu", "u", "ul", "um", "va", "ve", "vi", "vo"]
+ENDINGS = ["re, {}o", "us, a, um", "or, oris m", "io, ionis f", "as, atis f", "um, i n", "is, e", "e"]
+
+REGEXPS = [
+    ("rare literal", "pertraqua"),
+    ("literal prefix", "^conse"),
+    ("alternation", "^(pro|per)vi"),
+    ("common literal", "us, a, um"),
+    ("character class", "[xq]ue[rs]"),
+    ("unselective", "a.*e$"),
+    ("no literal", "^\\w+, \\w+$"),
+]
+
+
+def make_phrase(random: Random) -> str:
+    """
+    Generates a random latin-like phrase.
+    :param random: the random number generator
+    :return: the phrase
+    """
+    stem = "".join(random.choice(SYLLABLES) for _ in range(random.randint(2, 4)))
+    return stem + random.choice(ENDINGS).format(stem)
+
+
+def main(phrase_count: int):
+    """
+    Runs the benchmark.
+    :param phrase_count: the size of the synthetic catalog
+    """
+    random = Random(0)
+    rows = [(phrase_id, make_phrase(random), phrase_id) for phrase_id in range(1, phrase_count + 1)]
+
+    start = perf_counter()
+    index = TrigramIndex()
+    index.build(rows)
+    print("built index over {} phrases with {} trigrams in {:.2f}s".format(
+        phrase_count, len(index.postings), perf_counter() - start))
+
+    print("{:16} {:20} {:>9} {:>9} {:>10} {:>10} {:>8}".format(
+        "kind", "regexp", "cands", "matches", "scan [ms]", "index [ms]", "speedup"))
+    for kind, pattern in REGEXPS:
+        reg = compile(pattern)
+        start = perf_counter()
+        expected = [phrase_id for phrase_id, description in index.texts.items() if reg.search(description)]
+        scan_time = perf_counter() - start
+
+        start = perf_counter()
+        matches = index.search(pattern)
+        index_time = perf_counter() - start
+        candidates = index.get_candidates(pattern)
+
+        assert matches == sorted(expected), pattern
+        print("{:16} {:20} {:9} {:9} {:10.1f} {:10.1f} {:7.1f}x".format(
+            kind, pattern, len(candidates), len(matches), scan_time * 1000, index_time * 1000,
+            scan_time / index_time))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500000)
@@ -20,31 +20,66 @@ Provides a text based UI for lHelper.
 Start the mainloop by calling main.
 """
 
-from cli.menu import choose_option, Command, MenuOptionsRegistry, MainloopExit, UnknownCommand
-
-from cli.lookup import lookup
-from cli.questioning import question_all_due, question_all_group, question_single_card
-from cli.show import show_group, show_card
-from cli.use import use_group, use_card
+from cli.menu import confirm, Command, MenuOptionsRegistry, MainloopExit, UnknownCommand
 
 from data import database_manager, udm_handler
-from data.cardManager import CardManager
 
 from re import match
 
+# the modules implementing the commands are imported when a command is run first, to keep the startup fast
+
+
+@MenuOptionsRegistry
+class Forecast(Command):
+    """
+    The 'forecast' command.
+    """
+    usage = "forecast [<days> [<recall>]]"
+    description = "shows how many cards will be due on each of the next days"
+
+    def __init__(self, days: str = "14", recall: str = "1"):
+        from cli.stats import print_forecast
+
+        if udm_handler.get_user() is None:
+            print("Choose user first. (user <username>)")
+            return
+        try:
+            days, recall = int(days), float(recall)
+        except ValueError:
+            raise TypeError
+        if days < 1 or not 0 <= recall <= 1:
+            raise TypeError
+        print_forecast(days, recall)
+
+    @classmethod
+    def get_help(cls):
+        """
+        Returns a help string for the 'forecast' command.
+        :return: the help string
+        """
+        return "{}\n{}\n\n{}\n{}".format(cls.usage_notice(), cls.description,
+                                         "days   : the amount of days to show, 14 by default",
+                                         "recall : the share of cards you remember, 1 by default, e.g. 0.9")
+
 
 @MenuOptionsRegistry
 class LookUp(Command):
     """
     The 'lookup' command.
     """
-    usage = "lookup <string>"
+    usage = "lookup [--de] <string>"
     description = "looks up a string in the database"
 
     def __init__(self, *word: str):
-        if len(word) == 0:
+        from cli.lookup import lookup
+        from language import German
+
+        if len(word) == 0 or word == ("--de",):
             raise TypeError
-        lookup(" ".join(word))
+        if word[0] == "--de":
+            lookup(" ".join(word[1:]), German.name)
+        else:
+            lookup(" ".join(word))
 
     @classmethod
     def get_help(cls):
@@ -52,8 +87,53 @@ class LookUp(Command):
         Returns a help string for the 'question' command.
         :return: the help string
         """
-        return "{}\n{}\n\n{}\n{}".format(cls.usage_notice(), cls.description, "string : the string to be looked up",
-                                         "         supports regular expressions with python syntax")
+        return "{}\n{}\n\n{}\n{}\n{}".format(cls.usage_notice(), cls.description,
+                                             "string : the string to be looked up",
+                                             "         supports regular expressions with python syntax",
+                                             "--de   : look up german words, best matches first")
+
+
+@MenuOptionsRegistry
+class Portion(Command):
+    """
+    The 'portion' command.
+    """
+    usage = "portion [default|<parameter>=<value> ...]"
+    description = "shows or changes how the due cards questioned in one session are selected"
+
+    def __init__(self, *parameters: str):
+        from data.cardManager import CardManager
+        from data.portionPolicy import get_portion_policy
+        from data.userDatabaseConstants import SETTING_PORTION
+
+        if udm_handler.get_user() is None:
+            print("Choose user first. (user <username>)")
+            return
+        if parameters:
+            if parameters == ("default",):
+                parameters = ()
+            try:
+                policy = get_portion_policy(" ".join((CardManager.get_portion_policy().get_spec(),) + parameters)
+                                            if parameters else "")
+            except ValueError as e:
+                print(e)
+                return
+            udm_handler.get_udm().set_setting(SETTING_PORTION, policy.get_spec())
+        print("Portion: {}".format(CardManager.get_portion_policy().get_spec()))
+
+    @classmethod
+    def get_help(cls):
+        """
+        Returns a help string for the 'portion' command.
+        :return: the help string
+        """
+        return "{}\n{}\n\n{}\n{}\n{}\n{}\n{}".format(
+            cls.usage_notice(), cls.description,
+            "size           : the maximum amount of cards",
+            "priority_shelf : cards up to this shelf are taken first, the others by how long they are overdue",
+            "fair           : 1 to take the cards from the groups in turns",
+            "s<shelf>       : the maximum amount of cards from a shelf, e.g. s0=20",
+            "default        : go back to the default portion")
 
 
 @MenuOptionsRegistry
@@ -64,7 +144,11 @@ class Question(Command):
     usage = "question [due|<group_name>|<card_id>]"
     description = "questions the user over all due cards or all cards in group_name or a single card"
 
-    def __init__(self, group_name: str = "due"):
+    def __init__(self, *group_name: str):
+        from cli.questioning import question_all_due, question_all_group, question_single_card
+        from data.cardManager import CardManager
+
+        group_name = " ".join(group_name) or "due"  # a group expression may contain spaces
         if udm_handler.get_user() is None:
             print("Choose user first. (user <username>)")
             return
@@ -90,7 +174,123 @@ class Question(Command):
         Returns a help string for the 'question' command.
         :return: the help string
         """
-        return "{}\n{}\n\n{}".format(cls.usage_notice(), cls.description, "group_name : the group to be used")
+        return "{}\n{}\n\n{}\n{}\n{}".format(
+            cls.usage_notice(), cls.description,
+            "group_name : the group to be used, or an expression like 'adeo-9..adeo-40 & s0|s1 - ratio-aa-2':",
+            "             | unites, & intersects and - subtracts, in this order; s<shelf> are your cards on a shelf",
+            "             and <prefix keeps the cards before prefix, e.g. adeo-9<b")
+
+
+@MenuOptionsRegistry
+class Schedule(Command):
+    """
+    The 'scheduler' command.
+    """
+    usage = "scheduler [<name> [<parameter>=<value> ...]]"
+    description = "shows or switches the scheduler deciding when cards are due again"
+
+    def __init__(self, *spec: str):
+        from data.cardManager import CardManager
+        from data.scheduler import SCHEDULERS
+
+        if udm_handler.get_user() is None:
+            print("Choose user first. (user <username>)")
+            return
+        if not spec:
+            print("Current scheduler: {}".format(CardManager.get_scheduler().get_spec()))
+            print("Available schedulers: {}".format(", ".join(sorted(SCHEDULERS))))
+            return
+        try:
+            count = CardManager.set_scheduler(" ".join(spec))
+        except ValueError as e:
+            print(e)
+            return
+        print("Switched to {}, rescheduled {} cards.".format(CardManager.get_scheduler().get_spec(), count))
+
+    @classmethod
+    def get_help(cls):
+        """
+        Returns a help string for the 'scheduler' command.
+        :return: the help string
+        """
+        return "{}\n{}\n\n{}\n{}\n{}".format(cls.usage_notice(), cls.description,
+                                             "leitner : moves cards up a shelf, due again in 2**shelf - 1 days",
+                                             "sm2     : SuperMemo 2, parameters initial_ease, minimum_ease",
+                                             "fsrs    : FSRS 4.5, parameters retention, maximum_interval")
+
+
+@MenuOptionsRegistry
+class Shift(Command):
+    """
+    The 'shift' command.
+    """
+    usage = "shift <days> [<group_name>]"
+    description = "moves the due dates of all cards or the cards in group_name by days"
+
+    def __init__(self, days: str, *group_name: str):
+        from data.cardManager import CardManager
+
+        if udm_handler.get_user() is None:
+            print("Choose user first. (user <username>)")
+            return
+        try:
+            days = int(days)
+        except ValueError:
+            raise TypeError
+        group_name = " ".join(group_name)  # a group expression may contain spaces
+        if group_name and not CardManager.group_name_exists(group_name):
+            print("Group {} does not exist.".format(group_name))
+            return
+        card_ids = CardManager.get_used_card_ids(group_name) if group_name else None
+        print("Moved {} cards by {} days.".format(udm_handler.get_udm().shift_due_dates(days, card_ids), days))
+
+    @classmethod
+    def get_help(cls):
+        """
+        Returns a help string for the 'shift' command.
+        :return: the help string
+        """
+        return "{}\n{}\n\n{}\n{}".format(cls.usage_notice(), cls.description,
+                                         "days       : the amount of days, negative to move the due dates back",
+                                         "group_name : a group or group expression, all cards by default")
+
+
+@MenuOptionsRegistry
+class Vacation(Command):
+    """
+    The 'vacation' command.
+    """
+    usage = "vacation <days> [<group_name>]"
+    description = "spreads the due cards, the longest overdue first, over the next days"
+
+    def __init__(self, days: str, *group_name: str):
+        from data.cardManager import CardManager
+
+        if udm_handler.get_user() is None:
+            print("Choose user first. (user <username>)")
+            return
+        try:
+            days = int(days)
+        except ValueError:
+            raise TypeError
+        if days < 1:
+            raise TypeError
+        group_name = " ".join(group_name)  # a group expression may contain spaces
+        if group_name and not CardManager.group_name_exists(group_name):
+            print("Group {} does not exist.".format(group_name))
+            return
+        card_ids = CardManager.get_used_card_ids(group_name) if group_name else None
+        print("Spread {} cards over {} days.".format(udm_handler.get_udm().spread_overdue(days, card_ids), days))
+
+    @classmethod
+    def get_help(cls):
+        """
+        Returns a help string for the 'vacation' command.
+        :return: the help string
+        """
+        return "{}\n{}\n\n{}\n{}".format(cls.usage_notice(), cls.description,
+                                         "days       : the amount of days, starting today",
+                                         "group_name : a group or group expression, all due cards by default")
 
 
 @MenuOptionsRegistry
@@ -101,7 +301,10 @@ class Show(Command):
     usage = "show (c|w|<group_name>|<card_id>)"
     description = "show corresponding parts of LICENSE or all cards in card-group group_name"
 
-    def __init__(self, group: str):
+    def __init__(self, first: str, *rest: str):
+        from cli.show import show_group, show_card
+
+        group = " ".join((first,) + rest)  # a group expression may contain spaces
         if group == "c":
             print(self.get_copyright())
             return
@@ -117,10 +320,7 @@ class Show(Command):
             else:
                 print("Card {} does not exist.".format(card_id))
         except ValueError:
-            if database_manager.group_name_exists(group):
-                show_group(group)
-            else:
-                print("group_name unknown")
+            show_group(group)
 
     @staticmethod
     def get_warranty() -> str:
@@ -163,6 +363,28 @@ class Show(Command):
         return to_return
 
 
+@MenuOptionsRegistry
+class Stats(Command):
+    """
+    The 'stats' command.
+    """
+    usage = "stats [<group_name>]"
+    description = "shows the progress in group_name and its subgroups or in all groups"
+
+    def __init__(self, group_name: str = None):
+        from cli.stats import print_group_statistics, print_all_group_statistics
+
+        if udm_handler.get_user() is None:
+            print("Choose user first. (user <username>)")
+            return
+        if group_name is None:
+            print_all_group_statistics()
+        elif not database_manager.group_name_exists(group_name):
+            print("Group {} does not exist.".format(group_name))
+        else:
+            print_group_statistics(group_name)
+
+
 @MenuOptionsRegistry
 class Use(Command):
     """
@@ -171,7 +393,10 @@ class Use(Command):
     usage = "use (<group_name>|<card_id>)"
     description = "put all cards in card-group group_name in shelf 1"
 
-    def __init__(self, group_name: str):
+    def __init__(self, first: str, *rest: str):
+        from cli.use import use_group, use_card
+
+        group_name = " ".join((first,) + rest)  # a group expression may contain spaces
         if udm_handler.get_user() is None:
             print("Choose user first. (user <username>)")
             return
@@ -184,10 +409,7 @@ class Use(Command):
             else:
                 use_card(card_id)
         except ValueError:
-            if not CardManager.group_name_exists(group_name):
-                print("Group {} does not exist.".format(group_name))
-            else:
-                use_group(group_name)
+            use_group(group_name)
 
 
 @MenuOptionsRegistry
@@ -203,7 +425,7 @@ class User(Command):
         if name not in udm_handler.get_user_names():
             if not match("^[\w\-. ]+$", name):
                 print("Invalid user name. Only use a-z, A-Z, 0-9, _, -, .")
-            if choose_option(["y", "n"], "Username does not exist. Create new user? [y|n] ")[0] == "n":
+            if not confirm("Username does not exist. Create new user? [y] "):
                 return
         udm_handler.set_user(name)
         prompt = "{} $ ".format(name)
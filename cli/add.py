@@ -20,6 +20,8 @@ Provides methods for the 'add' cycle.
 Call add_cards to prompt the user for ney cards.
 """
 
+from cli.menu import confirm
+
 from data import database_manager
 
 
@@ -65,8 +67,15 @@ def add_card(group_name: str = None) -> str:
                     for translation in translations:
                         print("{} -> {}".format(translation[0], translation[2]))
 
+                    # warn about phrases differing only in case, diacritics or punctuation
+                    for phrase, language in sorted({(t[0], t[1]) for t in translations}
+                                                   | {(t[2], t[3]) for t in translations}):
+                        for _, description in database_manager.find_phrases_with_key(phrase, language):
+                            if description != phrase:
+                                print("similar phrase exists: {} ~ {}".format(phrase, description))
+
                     # ask whether the card should be saved
-                    if input("Save card? [y] > ").strip(" ").lower().endswith("y"):
+                    if confirm("Save card? [y] > "):
                         card_id = database_manager.add_card(translations)
 
                         print("card_id: {}".format(card_id))
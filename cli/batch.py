@@ -0,0 +1,164 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Runs the text based UI without prompts, reading commands and answers from a file or stdin.
+Every command and every answer read is reported as a JSON object on a line of its own.
+Confirmations are skipped in batch mode, see cli.menu.confirm.
+Start a batch by calling main.
+"""
+
+from cli import menu
+from cli.menu import MenuOptionsRegistry, MainloopExit, UnknownCommand
+
+from data import udm_handler
+
+from io import StringIO
+from typing import Callable, Dict, List, TextIO
+import json
+import sys
+
+
+class BatchOutput(StringIO):
+    """
+    Collects everything the commands print.
+    """
+
+    def pop_lines(self) -> List[str]:
+        """
+        Returns the output collected since the last call and clears it.
+        :return: the lines of the output, the last one being the unfinished line (usually "")
+        """
+        lines = self.getvalue().split("\n")
+        self.seek(0)
+        self.truncate()
+        return lines
+
+
+class BatchEnded(BaseException):
+    """
+    Raised when the batch ends while a command waits for an answer.
+    Not an Exception, so that MenuOptionsRegistry.run does not report it as an error, like MainloopExit.
+    """
+
+
+class BatchInput:
+    """
+    Stands in for sys.stdin while a batch runs.
+    Passes the lines of the batch on to input() and reports every answer read.
+    """
+
+    def __init__(self, source: TextIO, output: BatchOutput, report: Callable[[Dict], None]):
+        """
+        Initialize the BatchInput.
+        :param source: the batch
+        :param output: the output of the running command
+        :param report: called with a record for each answer
+        """
+        self.source = source
+        self.output = output
+        self.report = report
+        self.command = None
+
+    def readline(self) -> str:
+        """
+        Reads an answer for the running command.
+        :raises BatchEnded: if the batch ended
+        :return: the next line of the batch
+        """
+        line = self.source.readline()
+        if not line:
+            raise BatchEnded
+
+        # the prompt is the unfinished last line of the output
+        *output, prompt = self.output.pop_lines()
+        self.report({"type": "answer", "command": self.command, "prompt": prompt, "answer": line.rstrip("\n"),
+                     "output": output})
+        return line
+
+    def close(self):
+        """
+        Closes the batch. Called by multiprocessing in forked worker processes.
+        """
+        self.source.close()
+
+
+def run(source: TextIO, target: TextIO = None):
+    """
+    Runs the commands in source until it ends or the command exit is run.
+    The lines following a command are read by the command as its answers.
+    Empty lines and lines starting with # between commands are skipped.
+    :param source: the batch
+    :param target: where the records are written to, defaults to sys.stdout
+    """
+    target = target or sys.stdout
+
+    def report(record: Dict):
+        target.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    output = BatchOutput()
+    batch_input = BatchInput(source, output, report)
+
+    stdin, stdout = sys.stdin, sys.stdout
+    menu.batch_mode = True
+    sys.stdin, sys.stdout = batch_input, output
+    try:
+        for line in iter(source.readline, ""):
+            choice = line.strip("\n").strip(" ").split(" ")
+            if choice[0] == "" or choice[0].startswith("#"):
+                continue
+
+            batch_input.command = " ".join(choice)
+            record = {"type": "command", "command": batch_input.command, "status": "ok"}
+            try:
+                MenuOptionsRegistry.run(*choice)
+            except UnknownCommand:
+                record["status"] = "unknown"
+            except MainloopExit:
+                record["status"] = "exit"
+            except BatchEnded:  # the command was still waiting for answers
+                record["status"] = "incomplete"
+
+            lines = output.pop_lines()
+            record["output"] = lines if lines[-1] else lines[:-1]
+            report(record)
+            if record["status"] == "exit":
+                break
+    finally:
+        sys.stdin, sys.stdout = stdin, stdout
+        menu.batch_mode = False
+
+
+def main(file_name: str, user: str = None, enable_data_commands: bool = False):
+    """
+    Runs a batch and prints a JSON record for each command and answer.
+    :param file_name: the file containing the commands and answers, "-" to read them from stdin
+    :param user: the user that should be active on start
+    :param enable_data_commands: True to enable data_commands
+    """
+    if user:
+        udm_handler.set_user(user)
+
+    if enable_data_commands:
+        import cli.data_commands
+
+    if file_name == "-":
+        run(sys.stdin)
+    else:
+        with open(file_name, encoding="utf-8") as source:
+            run(source)
@@ -0,0 +1,147 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Provides a daemon serving the text based UI over a Unix domain socket.
+The daemon loads the data once; every client session is served by a forked copy of the warm process.
+Start the daemon by calling serve, connect with client.main.
+"""
+
+from client import SOCKET_PATH
+
+from io import TextIOWrapper
+from os import getpid, remove
+from signal import signal, SIGTERM
+from socketserver import ForkingMixIn, StreamRequestHandler, UnixStreamServer
+import socket
+import sys
+
+
+class SessionHandler(StreamRequestHandler):
+    """
+    Runs one CLI session for a connected client.
+    """
+    version = None
+    enable_data_commands = False
+
+    def handle(self):
+        """
+        Redirects stdin and stdout to the client and runs the CLI mainloop.
+        """
+        import cli
+
+        stdout = TextIOWrapper(self.wfile, encoding="utf-8", line_buffering=True, write_through=True)
+        stdout.write("lHelper-daemon session {}\n".format(getpid()))
+        sys.stdin = TextIOWrapper(self.rfile, encoding="utf-8")
+        sys.stdout = stdout
+        try:
+            cli.main(self.version, enable_data_commands=self.enable_data_commands)
+        except (EOFError, BrokenPipeError, ConnectionResetError, KeyboardInterrupt):
+            pass  # the client went away
+        finally:
+            sys.stdout = sys.__stdout__
+            sys.stdin = sys.__stdin__
+
+
+class DaemonServer(ForkingMixIn, UnixStreamServer):
+    """
+    Forks a session process for each connecting client.
+    """
+    catalog_version = None  # the version of the card database the loaded data belongs to
+
+    def process_request(self, request, client_address):
+        """
+        Loads the data again if a session changed the card database, then forks the session.
+        Overrides ForkingMixIn.process_request().
+        """
+        from data import database_manager
+
+        # the forked sessions inherit the loaded data, it must not be outdated
+        if database_manager.get_version() != self.catalog_version:
+            self.catalog_version = warm_up(reload=True)
+        super().process_request(request, client_address)
+
+
+def serve(version: str, enable_data_commands: bool = False, socket_path: str = SOCKET_PATH):
+    """
+    Loads all data and serves client sessions until interrupted or terminated.
+    :param version: the programs version to be displayed
+    :param enable_data_commands: True to enable data_commands in the sessions
+    :param socket_path: the path of the Unix domain socket
+    """
+    catalog_version = warm_up()
+
+    # remove the socket of a daemon that did not shut down cleanly
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+        print("A daemon is already running.")
+        return
+    except FileNotFoundError:
+        pass
+    except ConnectionRefusedError:
+        remove(socket_path)
+    finally:
+        probe.close()
+
+    SessionHandler.version = version
+    SessionHandler.enable_data_commands = enable_data_commands
+    server = DaemonServer(socket_path, SessionHandler)
+    server.catalog_version = catalog_version
+    signal(SIGTERM, lambda signal_number, frame: sys.exit(0))
+    print("lHelper daemon listening on {}. Stop it with Ctrl-C.".format(socket_path))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        remove(socket_path)
+
+
+def warm_up(reload: bool = False) -> tuple:
+    """
+    Imports all command modules and loads the catalog, the indexes, the group bitmaps and the active users database.
+    :param reload: True to drop the data loaded before, as the card database changed
+    :return: the version of the card database the loaded data belongs to
+    """
+    import cli.lookup
+    import cli.questioning
+    import cli.show
+    import cli.use
+
+    from data import database_manager, session_manager, udm_handler
+    from data.cardManager import CardManager
+    from language import German, Latin
+
+    if reload:
+        CardManager.clear_caches()
+        database_manager.reload()
+    else:
+        database_manager.load_ids()
+    version = database_manager.get_version()
+    database_manager.get_group_bitmaps()
+    CardManager.get_phrase_index(German.name)
+    for language in (German.name, Latin.name):
+        CardManager.get_trigram_index(language)
+    if udm_handler.get_user() is not None:
+        udm_handler.get_udm()
+
+    # the schema check is done, but SQLite connections must not be shared with the forked sessions
+    session_manager.close()
+    return version
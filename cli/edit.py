@@ -19,6 +19,8 @@
 Provides methods for the 'edit' command.
 """
 
+from cli.menu import confirm
+
 from data import database_manager
 
 
@@ -101,7 +103,7 @@ def edit_card(card_id: int):
     if added_translations:
         print(*added_translations, sep="\n")
 
-    if input("Save card? [y] ").strip(" ").lower().endswith("y"):
+    if confirm("Save card? [y] "):
         database_manager.update_card(card_id, added_translations, removed_translations)
         print("Card saved.")
 
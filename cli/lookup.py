@@ -19,24 +19,51 @@
 Provides methods for the 'lookup' command.
 """
 
-from data.cardManager import CardManager
+from cli.menu import confirm
+
+from data.cardManager import Card, CardManager
+from data.regexSandbox import RegexTimeout
 from language import Latin
 
+from re import error
+
 
-def lookup(string: str):
+def lookup(string: str, language: str = Latin.name):
     """
     Looks up word in the database.
+    Cards are printed page by page as soon as they are found.
     :param string: the string to be looked up
+    :param language: the language of the string
     """
+    pages = CardManager.lookup_pages(string, language)
+    found = 0
+    try:
+        for page in pages:
+            if found and not confirm("Show more cards? [y] "):
+                break
+            for card in page:
+                print_card(card)
+            found += len(page)
+    except error as e:
+        print("Invalid regular expression: {}".format(e))
+        return
+    except RegexTimeout as e:
+        print(e)
+        print("Lookup aborted after {} cards.".format(found))
+        return
+    finally:
+        pages.close()
 
-    # retrieve cards form database
-    cards = CardManager.lookup(string, Latin.name)
-    if len(cards) == 0:
+    if found == 0:
         print("No cards found.")
 
-    # print out cards
-    for card in cards:
-        groups = sorted(list(card.get_groups()))
-        print("[{}, {}]".format(card.get_id(), ", ".join(groups)) if groups else "[{}]".format(card.get_id()))
-        for translation in card.get_translations():
-            print("{} -> {}".format(translation[0], translation[1]))
+
+def print_card(card: Card):
+    """
+    Prints a card with its groups and translations.
+    :param card: the card
+    """
+    groups = sorted(list(card.get_groups()))
+    print("[{}, {}]".format(card.get_id(), ", ".join(groups)) if groups else "[{}]".format(card.get_id()))
+    for translation in card.get_translations():
+        print("{} -> {}".format(translation[0], translation[1]))
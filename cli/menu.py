@@ -21,6 +21,8 @@ Framework for a TextUI mainloop menu.
 
 from typing import List, Iterable
 
+batch_mode = False  # True while the commands are read from a batch, see cli.batch
+
 
 class Command:
     """
@@ -182,3 +184,16 @@ def choose_option(options: Iterable, prompt: str) -> List[str]:
             print("Options:", ", ".join(options))
         choice = input(prompt).strip(" ").split(" ")
     return choice
+
+
+def confirm(prompt: str, batch_default: bool = True) -> bool:
+    """
+    Asks the user to confirm an action. Any answer ending with 'y' confirms it.
+    In batch mode the user is not asked and batch_default is returned instead.
+    :param prompt: the prompt the user is to be prompted with
+    :param batch_default: the answer assumed in batch mode
+    :return: True if the action was confirmed
+    """
+    if batch_mode:
+        return batch_default
+    return input(prompt).strip(" ").lower().endswith("y")
@@ -20,22 +20,26 @@ Provides methods for the 'show' command.
 """
 
 from data import database_manager
+from data.cardManager import CardManager
 from typing import Tuple, List
 
 
 def show_group(group_name: str):
     """
     Prints all cards in card-group group_name.
-    :param group_name: the groups name
+    :param group_name: the groups name or a group expression, see data.groupExpression
     """
 
-    # assert the group exists
-    if not database_manager.group_name_exists(group_name):
-        print("Group {} does not exist.".format(group_name))
+    # evaluate the group expression, which also asserts the groups exist
+    try:
+        card_ids = CardManager.get_group_card_ids(group_name)
+    except ValueError as e:
+        print(e)
         return
 
-    for card_id, translations in database_manager.load_group(database_manager.get_group_id_for_name(group_name))[2]:
-        print_card(card_id, translations, database_manager.get_group_names_for_card(card_id))
+    group_names = database_manager.get_group_names_for_cards(card_ids)
+    for card_id, translations in database_manager.get_cards(card_ids):
+        print_card(card_id, translations, group_names[card_id])
 
 
 def show_card(card_id: int):
@@ -50,7 +54,7 @@ def show_card(card_id: int):
         return
 
     _, translations = database_manager.get_card(card_id)
-    print_card(card_id, translations, database_manager.get_group_names_for_card(card_id))
+    print_card(card_id, translations, database_manager.get_group_bitmaps().get_group_names(card_id))
 
 
 def print_card(card_id: int, translations: Tuple[str, str, str, str], group_names: List[str] = list()):
@@ -0,0 +1,108 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Provides methods for the 'stats' and 'forecast' commands.
+Call print_group_statistics(group_name) or print_all_group_statistics() to show the progress of the current user
+and print_forecast(days, recall) to show how many cards will be due on the next days.
+"""
+
+from data import udm_handler
+from data.cardManager import CardManager
+from data.forecast import forecast
+from data.userDatabaseManager import GroupStatistics
+
+from time import localtime, strftime, time
+
+DAYS = 7  # the amount of days due cards are shown for
+FORECAST_DAYS = 14
+
+
+def print_group_statistics(group_name: str, days: int = DAYS):
+    """
+    Prints the shelf histogram, the due cards of the next days and the unused cards of a group and its subgroups.
+    :param group_name: the groups name
+    :param days: the amount of days to show the due cards for
+    """
+    statistics = udm_handler.get_udm().get_group_statistics(group_name, days)
+    if group_name not in statistics:
+        print("Group {} has no cards.".format(group_name))
+        return
+    group = statistics[group_name]
+
+    print("{}: {} of {} cards used, {} from shelf {} on".format(
+        group.name, group.get_used(), group.get_used() + group.unused,
+        CardManager.count_cards(group_name, CardManager.MIN_AGAIN_SHELF), CardManager.MIN_AGAIN_SHELF))
+    for shelf in sorted(group.shelves):
+        print("Shelf {}: {} cards".format(shelf, group.shelves[shelf]))
+
+    if group.due:
+        print("\nDue in the next {} days:".format(days))
+        width = max(group.due.values())
+        for due_date in sorted(group.due):
+            print("{} {:>4} {}".format(due_date, group.due[due_date], bar(group.due[due_date], width)))
+
+
+def print_all_group_statistics():
+    """
+    Prints the progress in all groups, one line per group.
+    """
+    statistics = udm_handler.get_udm().get_group_statistics(days=1)
+    shelves = sorted({shelf for group in statistics.values() for shelf in group.shelves})
+    name_width = max(map(len, statistics), default=0)
+
+    print(" ".join(["{:<{}}".format("group", name_width), "  used", "unused", "   due"]
+                   + ["{:>4}".format("s{}".format(shelf)) for shelf in shelves]))
+    for name in sorted(statistics):
+        group = statistics[name]  # type: GroupStatistics
+        print(" ".join(["{:<{}}".format(name, name_width), "{:>6}".format(group.get_used()),
+                        "{:>6}".format(group.unused), "{:>6}".format(sum(group.due.values()))]
+                       + ["{:>4}".format(group.shelves.get(shelf, "")) for shelf in shelves]))
+
+
+def print_forecast(days: int = FORECAST_DAYS, recall: float = 1.0):
+    """
+    Prints a histogram of the amount of cards due on each of the next days.
+    :param days: the amount of days to show
+    :param recall: the assumed probability of remembering a card
+    """
+    udm = udm_handler.get_udm()
+    scheduler = CardManager.get_scheduler(udm)
+    counts = forecast(udm.get_schedule(), days, recall, scheduler)
+
+    print("Due cards with {:.0%} recall, scheduled by {}:".format(recall, scheduler.get_spec()))
+    if scheduler.uses_history:
+        print("The projection starts every card from its shelf, not from its review history.")
+    width = max(counts, default=0)
+    for day, count in enumerate(counts):
+        print("{} {:>4} {}".format(strftime("%Y-%m-%d", localtime(time() + 86400 * day)), round(count),
+                                   bar(count, width)))
+    print("Sum: {} cards".format(round(sum(counts))))
+
+
+def bar(count: int, maximum: int, width: int = 40) -> str:
+    """
+    Returns a bar of '#' scaled to width for maximum.
+    :param count: the value to be shown
+    :param maximum: the largest value shown
+    :param width: the length of the bar for maximum
+    :return: the bar
+    """
+    if not count:
+        return ""
+    return "#" * max(1, round(count * width / maximum))
@@ -20,7 +20,10 @@ Provides methods for the 'use group' command.
 Call use_group(group_name) to assert that all cards in group <group_name> are used by the current user.
 """
 
-from data import database_manager, udm_handler
+from cli.menu import confirm
+
+from data import udm_handler
+from data.bitmapIndex import to_ids
 from data.cardManager import CardManager
 
 
@@ -30,22 +33,23 @@ def use_group(group_name: str):
     :param group_name: the groups name
     """
 
-    # assert the group exists
-    name, lt = CardManager.parse_group_name(group_name)
-    if not database_manager.group_name_exists(name):
-        print("Group {} does not exist.".format(name))
+    # evaluate the group expression, which also asserts the groups exist
+    try:
+        bitmap = CardManager.get_group_bitmap(group_name)
+    except ValueError as e:
+        print(e)
         return
 
-    cards = database_manager.load_group(database_manager.get_group_id_for_name(name))[2]
-    if lt is not None:
-        cards = list(filter(lambda c: c[1][0][0] < lt[1:], cards))
+    # leave out the cards already used
+    udm = udm_handler.get_udm()
+    card_ids = to_ids(bitmap & ~udm.get_shelf_bitmaps().get_used())
 
-    if len(cards) > 100 and not (
-            input("Do you really want to add {} cards? [y] ".format(len(cards))).strip(" ").lower().endswith("y")):
+    if len(card_ids) > 100 and not confirm("Do you really want to add {} cards? [y] ".format(len(card_ids))):
         return
 
-    for card_id, _ in cards:
-        use_card(card_id, verbosity=1)
+    for card_id in card_ids:
+        udm.add_card(card_id, CardManager.DEFAULT_SHELF, "today")
+        print("Added card {} to shelf {}".format(card_id, CardManager.DEFAULT_SHELF))
 
 
 def use_card(card_id: int, verbosity=2):
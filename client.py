@@ -0,0 +1,82 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+A thin client for the lHelper daemon started with 'python lHelper --daemon'.
+Forwards the users input to the daemon and prints its output, without loading any data itself.
+Call :method:'main' to connect.
+"""
+
+from os import kill
+from signal import SIGINT
+from threading import Thread
+import socket
+import sys
+
+SOCKET_PATH = ".lHelper.sock"  # relative to the program directory
+
+
+def main(socket_path: str = SOCKET_PATH) -> bool:
+    """
+    Runs a session with the daemon until the session ends.
+    Ctrl-C is forwarded to the daemon and aborts the running command.
+    :param socket_path: the path of the daemons Unix domain socket
+    :return: False if no daemon is running, True after the session ended
+    """
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(socket_path)
+    except (FileNotFoundError, ConnectionRefusedError, AttributeError):
+        connection.close()
+        return False
+
+    # the daemon introduces the process serving this session
+    reader = connection.makefile("rb")
+    session_pid = int(reader.readline().split()[-1])
+
+    output = Thread(target=copy_output, args=(reader,), daemon=True)
+    output.start()
+    try:
+        while output.is_alive():
+            try:
+                line = sys.stdin.readline()
+                if not line:
+                    break
+                connection.sendall(line.encode("utf-8"))
+            except KeyboardInterrupt:
+                kill(session_pid, SIGINT)
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        connection.shutdown(socket.SHUT_WR)
+        output.join()
+        connection.close()
+    return True
+
+
+def copy_output(reader):
+    """
+    Copies everything the daemon sends to stdout, as soon as it arrives.
+    :param reader: the binary file object reading from the daemon
+    """
+    while True:
+        data = reader.read1(4096)
+        if not data:
+            break
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
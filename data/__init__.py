@@ -19,13 +19,58 @@
 Provides data to other modules of lHelper.
 """
 
-from data.databaseManager import DatabaseManager
-from data.udmHandler import UDMHandler
+from typing import Callable
 
 
-database_manager = DatabaseManager()
+class LazyInstance:
+    """
+    Stands in for an object that is only created when one of its attributes is accessed for the first time.
+    """
 
-if len(UDMHandler.get_user_names()) == 1:
-    udm_handler = UDMHandler(UDMHandler.get_user_names()[0])
-else:
-    udm_handler = UDMHandler(None)
+    def __init__(self, factory: Callable[[], object]):
+        """
+        Initialize the LazyInstance.
+        :param factory: creates the object
+        """
+        self.factory = factory
+        self.instance = None
+
+    def __getattr__(self, name: str):
+        # only called for attributes the LazyInstance itself does not have
+        if self.instance is None:
+            self.instance = self.factory()
+        return getattr(self.instance, name)
+
+
+def create_database_manager():
+    """
+    Opens the card database.
+    :return: a DatabaseManager
+    """
+    from data.databaseManager import DatabaseManager
+    return DatabaseManager()
+
+
+def create_session_manager():
+    """
+    Creates the UserSessionManager for the user databases in the working directory.
+    :return: a UserSessionManager
+    """
+    from data.userSessionManager import UserSessionManager
+    return UserSessionManager()
+
+
+def create_udm_handler():
+    """
+    Creates the UDMHandler, with the only available user active if there is exactly one.
+    :return: a UDMHandler
+    """
+    from data.udmHandler import UDMHandler
+    user_names = session_manager.get_user_names()
+    return UDMHandler(session_manager, user_names[0] if len(user_names) == 1 else None)
+
+
+# all are set up on first use, so that importing data does not touch any database
+database_manager = LazyInstance(create_database_manager)
+session_manager = LazyInstance(create_session_manager)
+udm_handler = LazyInstance(create_udm_handler)
@@ -0,0 +1,222 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Provides bitmaps of card ids as Python ints, bit card_id being set for every card in the set.
+GroupBitmaps holds the cards of every group, ShelfBitmaps the cards of a user on every shelf.
+Set operations are bitwise operations and counting is a popcount, neither touches the database.
+"""
+
+from data.sortedIds import ID_TYPECODE
+
+from array import array
+from json import dump, load
+from operator import and_, or_
+from os import replace
+from typing import Dict, Iterable, List, Optional, Tuple
+
+OPERATIONS = {"|": or_, "&": and_, "-": lambda a, b: a & ~b}  # the group expression operators, see data.groupExpression
+
+
+def to_bitmap(ids: Iterable[int]) -> int:
+    """
+    Converts ids into a bitmap.
+    :param ids: the ids
+    :return: the bitmap
+    """
+    bitmap = 0
+    for item in ids:
+        bitmap |= 1 << item
+    return bitmap
+
+
+def to_ids(bitmap: int) -> array:
+    """
+    Converts a bitmap into a sorted array of ids.
+    :param bitmap: the bitmap
+    :return: a sorted array
+    """
+    bits = bin(bitmap)[:1:-1]  # the lowest bit first
+    ids = array(ID_TYPECODE)
+    position = bits.find("1")
+    while position != -1:
+        ids.append(position)
+        position = bits.find("1", position + 1)
+    return ids
+
+
+def popcount(bitmap: int) -> int:
+    """
+    Counts the ids in a bitmap.
+    :param bitmap: the bitmap
+    :return: the amount of set bits
+    """
+    return bin(bitmap).count("1")
+
+
+class GroupBitmaps:
+    """
+    The cards directly in every group and the group tree, stamped with the version of the card database.
+    """
+
+    def __init__(self, version: Tuple[int, ...] = ()):
+        """
+        Initialize empty GroupBitmaps.
+        :param version: the version of the card database the bitmaps are built from
+        """
+        self.version = version
+        self.members = {}  # type: Dict[str, int]  # group_name -> bitmap of the cards directly in the group
+        self.parents = {}  # type: Dict[str, Optional[str]]  # group_name -> parent_name or None
+
+    def build(self, rows: Iterable[Tuple[str, Optional[str], Optional[int]]]):
+        """
+        Fills the bitmaps.
+        :param rows: (group_name, parent_name, card_id) tuples as returned by DatabaseManager.get_group_memberships,
+                     card_id is None for groups without cards
+        """
+        for group_name, parent_name, card_id in rows:
+            self.add_group(group_name, parent_name)
+            if card_id is not None:
+                self.members[group_name] |= 1 << card_id
+
+    def add_group(self, group_name: str, parent_name: Optional[str] = None):
+        """
+        Adds a group without cards, if it is not known yet.
+        :param group_name: the groups name
+        :param parent_name: the parents name
+        """
+        if group_name not in self.members:
+            self.members[group_name] = 0
+            self.parents[group_name] = parent_name
+
+    def add_card(self, card_id: int, group_name: str):
+        """
+        Adds a card to a group.
+        :param card_id: the cards id
+        :param group_name: the groups name
+        """
+        self.add_group(group_name)
+        self.members[group_name] |= 1 << card_id
+
+    def get_group(self, group_name: str) -> int:
+        """
+        Unites the cards of a group and its subgroups.
+        :raises ValueError: if the group does not exist
+        :param group_name: the groups name
+        :return: the bitmap
+        """
+        if group_name not in self.members:
+            raise ValueError("Group name '{}' does not exist.".format(group_name))
+
+        bitmap = 0
+        names = [group_name]
+        for name in names:
+            bitmap |= self.members[name]
+            names.extend(child for child, parent in self.parents.items() if parent == name)
+        return bitmap
+
+    def get_group_names(self, card_id: int) -> List[str]:
+        """
+        Returns the groups a card is directly in.
+        :param card_id: the cards id
+        :return: the group names
+        """
+        return [group_name for group_name, bitmap in self.members.items() if bitmap >> card_id & 1]
+
+    def save(self, path: str):
+        """
+        Writes the bitmaps and their version to a file, replacing it at once.
+        :param path: the path of the file
+        """
+        with open(path + ".tmp", "w", encoding="utf-8") as file:
+            dump({"version": list(self.version),
+                  "groups": {group_name: [self.parents[group_name], "{:x}".format(bitmap)]
+                             for group_name, bitmap in self.members.items()}}, file)
+        replace(path + ".tmp", path)
+
+    @staticmethod
+    def load(path: str, version: Tuple[int, ...]) -> Optional["GroupBitmaps"]:
+        """
+        Reads the bitmaps written by save, if they have the expected version.
+        :param path: the path of the file
+        :param version: the current version of the card database
+        :return: the GroupBitmaps or None if the file is missing, unreadable or outdated
+        """
+        try:
+            with open(path, encoding="utf-8") as file:
+                data = load(file)
+            if tuple(data["version"]) != tuple(version):
+                return None
+            bitmaps = GroupBitmaps(version)
+            for group_name, (parent_name, bitmap) in data["groups"].items():
+                bitmaps.members[group_name] = int(bitmap, 16)
+                bitmaps.parents[group_name] = parent_name
+            return bitmaps
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+
+class ShelfBitmaps:
+    """
+    The used cards of a user on every shelf.
+    """
+
+    def __init__(self):
+        """
+        Initialize empty ShelfBitmaps.
+        """
+        self.shelves = {}  # type: Dict[int, int]  # shelf -> bitmap of the cards on the shelf
+
+    def build(self, rows: Iterable[Tuple[int, int, str]]):
+        """
+        Fills the bitmaps.
+        :param rows: 3-tuples (id, shelf, due_date) as returned by UserDatabaseManager.get_all_cards
+        """
+        for card_id, shelf, _ in rows:
+            self.add(card_id, shelf)
+
+    def add(self, card_id: int, shelf: int):
+        """
+        Adds a card to a shelf.
+        :param card_id: the cards id
+        :param shelf: the cards shelf
+        """
+        self.shelves[shelf] = self.shelves.get(shelf, 0) | 1 << card_id
+
+    def move(self, card_id: int, shelf: int):
+        """
+        Moves a card from its shelf to another one.
+        :param card_id: the cards id
+        :param shelf: the cards new shelf
+        """
+        bit = 1 << card_id
+        for old_shelf, bitmap in self.shelves.items():
+            if bitmap & bit:
+                self.shelves[old_shelf] = bitmap & ~bit
+        self.add(card_id, shelf)
+
+    def get_used(self, min_shelf: int = 0) -> int:
+        """
+        Unites the shelves from min_shelf on.
+        :param min_shelf: the lowest shelf
+        :return: the bitmap of the cards on these shelves
+        """
+        bitmap = 0
+        for shelf, shelf_bitmap in self.shelves.items():
+            if shelf >= min_shelf:
+                bitmap |= shelf_bitmap
+        return bitmap
@@ -20,13 +20,23 @@ Manages the loading and saving of vocabulary cards.
 Instantiate CardManager to get access to the functionality.
 """
 
-from data import database_manager, udm_handler
-from language import Phrase, phrase_classes
-from random import choice
+from data import database_manager, regexSandbox, udm_handler
+from data import scheduler
+from data.bitmapIndex import popcount, to_bitmap, to_ids
+from data.groupExpression import Term, evaluate, get_terms, parse_group_expression
+from data.phraseIndex import PhraseIndex
+from data.portionPolicy import DEFAULT_SIZE, PortionPolicy, get_portion_policy
+from data.scheduler import Scheduler, get_scheduler, WRONG, AGAIN, CORRECT
+from data.trigramIndex import TrigramIndex
+from data.userDatabaseConstants import SETTING_PORTION, SETTING_SCHEDULER
+from data.userDatabaseManager import UserDatabaseManager
+from language import German, Phrase, phrase_classes
+from array import array
+from itertools import islice
 from time import localtime, strftime, time
-from re import match
+from re import search
 
-from typing import Iterable, List, Set, Tuple
+from typing import Iterable, Iterator, List, Set, Tuple
 
 
 class Card:
@@ -128,14 +138,27 @@ class CardManager:
     """
     Manages the loading and saving of vocabulary cards.
     """
-    CARD_PORTION = 100
+    CARD_PORTION = DEFAULT_SIZE
+    LOOKUP_PAGE_SIZE = 10
+    QUESTION_CHUNK_SIZE = 50
 
-    MIN_SHELF = 0
-    DEFAULT_SHELF = 1
-    MIN_AGAIN_SHELF = 3
-    MAX_SHELF = 7
+    MIN_SHELF = scheduler.MIN_SHELF
+    DEFAULT_SHELF = scheduler.DEFAULT_SHELF
+    MIN_AGAIN_SHELF = scheduler.MIN_AGAIN_SHELF
+    MAX_SHELF = scheduler.MAX_SHELF
 
     groups = {}
+    phrase_indexes = {}
+    trigram_indexes = {}
+
+    @classmethod
+    def clear_caches(cls):
+        """
+        Drops the loaded groups and indexes, after the card database was changed by another process.
+        """
+        cls.groups = {}
+        cls.phrase_indexes = {}
+        cls.trigram_indexes = {}
 
     @classmethod
     def load_card_group(cls, group_id: int) -> CardGroup:
@@ -145,8 +168,9 @@ class CardManager:
         :return: the card group
         """
         name, parent_name, cards = database_manager.load_group(group_id)
+        group_bitmaps = database_manager.get_group_bitmaps()
         cards = list(map(lambda c: UsedCard(*udm_handler.get_udm().get_card(c[0]), c[1],
-                                            database_manager.get_group_names_for_card(c[0])),
+                                            group_bitmaps.get_group_names(c[0])),
                          cards))  # cards = List[Tuple[int, List[Translation]]]
         cls.groups[group_id] = CardGroup(cards, name, parent_name)
 
@@ -178,66 +202,140 @@ class CardManager:
     # get methods
 
     @classmethod
-    def lookup(cls, string, language) -> List[Card]:
+    def lookup(cls, string: str, language: str) -> Iterator[Card]:
         """
-        Returns a list of Card-objects, that match the string.
+        Yields the Card-objects matching the string, best matches first.
         :param string: the string to be looked up
         :param language: the language of the string
-        :return: a list of cards.
+        :return: an iterator over cards
         """
-        raise NotImplementedError("WIP")
+        for page in cls.lookup_pages(string, language):
+            yield from page
 
-        # get possible root forms for string
-        rfs = phrase_classes[language].get_possible_root_forms_for(string)
+    @classmethod
+    def lookup_pages(cls, string: str, language: str, page_size: int = None) -> Iterator[List[Card]]:
+        """
+        Yields the Card-objects matching the string in pages, best matches first.
+        Only the cards of the requested page are loaded from the database.
+        :raises re.error: if string is no valid regular expression
+        :raises RegexTimeout: if the regular expression search exceeds its time budget
+        :param string: the string to be looked up
+        :param language: the language of the string
+        :param page_size: the amount of cards per page, defaults to LOOKUP_PAGE_SIZE
+        :return: an iterator over lists of cards
+        """
+        card_ids = cls.lookup_card_ids(string, language)
+        try:
+            while True:
+                page = list(islice(card_ids, page_size or cls.LOOKUP_PAGE_SIZE))
+                if not page:
+                    return
+                yield cls.load_cards(page)
+        finally:
+            card_ids.close()  # stops a running regular expression search
 
-        # load corresponding cards
-        cards = []
+    @classmethod
+    def lookup_card_ids(cls, string: str, language: str) -> Iterator[int]:
+        """
+        Yields the ids of the cards matching the string, best matches first:
+        For german strings the cards found in the german PhraseIndex,
+        otherwise first the cards with a phrase equal to the string, then those with phrases starting with the
+        string or with one of its possible root forms and finally those with a phrase matching the string as
+        regular expression.
+        :param string: the string to be looked up
+        :param language: the language of the string
+        :return: an iterator over card_ids
+        """
+        if language == German.name:
+            stages = ([card_id for card_id, _ in cls.get_phrase_index(language).find_cards(string)],)
+        elif search(r"[.^$*+?{}\[\]\\|()]", string):
+            stages = (cls.find_cards_matching(string, language),)
+        else:
+            stages = (database_manager.find_cards_with_key(string, language),
+                      database_manager.find_cards_with_key(string, language, prefix=True),
+                      (card_id for root_form in phrase_classes[language].get_possible_root_forms_for(string)
+                       for card_id in database_manager.find_cards_with_key(root_form, language, prefix=True)),
+                      cls.find_cards_matching(string, language))
+
+        found = set()
+        for stage in stages:
+            for card_id in stage:
+                if card_id not in found:
+                    found.add(card_id)
+                    yield card_id
 
-        for rf in rfs:
-            matching_cards = [c[0] for c in database_manager.find_cards_with(rf, language)]
+    @classmethod
+    def get_phrase_index(cls, language: str) -> PhraseIndex:
+        """
+        Builds the PhraseIndex for language if necessary and returns it.
+        :param language: the language of the indexed phrases
+        :return: the PhraseIndex
+        """
+        if language not in cls.phrase_indexes:
+            index = PhraseIndex(language)
+            index.build(database_manager.get_phrase_cards(language))
+            cls.phrase_indexes[language] = index
+        return cls.phrase_indexes[language]
 
-            for card in matching_cards:
-                if udm_handler.get_udm().card_is_used(card[0]):
-                    cards.append(UsedCard(*udm_handler.get_udm().get_card(card[0]), card[1],
-                                          database_manager.get_group_names_for_card(card[0])))
-                else:
-                    cards.append(Card(card[0], card[1], database_manager.get_group_names_for_card(card[0])))
+    @classmethod
+    def find_cards_matching(cls, pattern: str, language: str,
+                            time_budget: float = regexSandbox.DEFAULT_TIME_BUDGET) -> Iterator[int]:
+        """
+        Yields the ids of all cards with a phrase in language matching the regular expression.
+        The expression is only run on the phrases found by the trigram index, in a worker process.
+        :raises re.error: if pattern is no valid regular expression
+        :raises RegexTimeout: if the search exceeds time_budget; the ids yielded so far are valid
+        :param pattern: the regular expression
+        :param language: the language of the phrases
+        :param time_budget: the maximum search time in seconds
+        :return: an iterator over card_ids
+        """
+        index = cls.get_trigram_index(language)
+        texts = [(phrase_id, index.texts[phrase_id]) for phrase_id in index.get_candidates(pattern)]
+
+        found = set()
+        for phrase_id in regexSandbox.search(pattern, texts, time_budget):
+            for card_id in sorted(index.phrase_cards[phrase_id].difference(found)):
+                found.add(card_id)
+                yield card_id
 
-                    # todo implement checking whether each card really corresponds to the string
+    @classmethod
+    def get_trigram_index(cls, language: str) -> TrigramIndex:
+        """
+        Builds the TrigramIndex for language if necessary and returns it.
+        :param language: the language of the indexed phrases
+        :return: the TrigramIndex
+        """
+        if language not in cls.trigram_indexes:
+            index = TrigramIndex()
+            index.build(database_manager.get_phrase_cards(language))
+            cls.trigram_indexes[language] = index
+        return cls.trigram_indexes[language]
 
     @classmethod
-    def get_due_cards(cls, due_date: str = "today") -> List[UsedCard]:
+    def get_due_card_ids(cls, due_date: str = "today") -> List[int]:
         """
-        Loads self.CARD_PORTION many due cards from the database.
+        Selects a portion of the due cards, as selected by the users portion policy, without loading any card.
         :param due_date: a date in format %Y-%m-%d or 'today'
-        :return: a list of UsedCards
+        :return: a list of card_ids
         """
+        udm = udm_handler.get_udm()
+        card_ids = udm.get_due_portion(cls.get_portion_policy(udm), due_date)
 
-        # load data for due cards
-        due_cards = [[], []]
-        for card in udm_handler.get_udm().get_due_cards(due_date):
-            if card[1] <= 2:  # shelf
-                due_cards[0].append(card)
-            else:
-                due_cards[1].append(card)
-
-        if len(due_cards[0]) < cls.CARD_PORTION < len(due_cards[0]) + len(due_cards[1]) and len(due_cards[1]) > 0:
-            print("Selecting {} of {} cards.".format(max(cls.CARD_PORTION, len(due_cards[0])),
-                                                     len(due_cards[0]) + len(due_cards[1])))
+        count = udm.count_due_cards(due_date)
+        if len(card_ids) < count:
+            print("Selecting {} of {} cards.".format(len(card_ids), count))
 
-        # limit card amount by using all cards in shelf 1 and 2 and using as much as possible random others
-        while len(due_cards[0]) < cls.CARD_PORTION and len(due_cards[1]) > 0:
-            card = choice(due_cards[1])
-            due_cards[0].append(card)
-            due_cards[1].remove(card)
+        return card_ids
 
-        # load translations from database
-        cards = []
-        for card in due_cards[0]:
-            cards.append(UsedCard(card[0], card[1], card[2],
-                                  database_manager.get_card(card[0])[1],
-                                  database_manager.get_group_names_for_card(card[0])))
-        return cards
+    @staticmethod
+    def get_portion_policy(udm: UserDatabaseManager = None) -> PortionPolicy:
+        """
+        Returns the portion policy of a user.
+        :param udm: the database of the user, defaults to the current users
+        :return: the PortionPolicy
+        """
+        return get_portion_policy((udm or udm_handler.get_udm()).get_setting(SETTING_PORTION, ""))
 
     @staticmethod
     def get_cards_on_shelf(shelf: int) -> List[UsedCard]:
@@ -246,12 +344,7 @@ class CardManager:
         :param shelf: the shelf
         :return: a list of UsedCards
         """
-        cards = []
-        for card in udm_handler.get_udm().get_cards_on_shelf(shelf):
-            cards.append(UsedCard(card[0], card[1], card[2],
-                                  database_manager.get_card(card[0])[1],
-                                  database_manager.get_group_names_for_card(card[0])))
-        return cards
+        return [UsedCard(*card) for card in udm_handler.get_udm().get_cards_on_shelf_with_content(shelf)]
 
     @classmethod
     def get_group(cls, group_id: int) -> CardGroup:
@@ -267,47 +360,123 @@ class CardManager:
     @classmethod
     def get_group_for_name(cls, group_name: str) -> CardGroup:
         """
-        Returns the CardGroup with name group_name.
-        :param group_name: the groups name
-        :return: the CardGroup
+        Returns the used cards selected by a group expression as CardGroup.
+        :raises ValueError: if the expression is malformed or names an unknown group
+        :param group_name: the group expression, see data.groupExpression
+        :return: the CardGroup named like the expression
+        """
+        card_ids = cls.get_group_card_ids(group_name)
+        return CardGroup(map(lambda card: UsedCard(*card), udm_handler.get_udm().get_cards_with_content(card_ids)),
+                         group_name)
+
+    @classmethod
+    def get_group_card_ids(cls, group_name: str, udm: UserDatabaseManager = None) -> array:
+        """
+        Evaluates a group expression with bitwise operations on the group and shelf bitmaps.
+        No card is loaded, <prefix is an index range scan over the sort keys.
+        :raises ValueError: if the expression is malformed or names an unknown group
+        :param group_name: the group expression, see data.groupExpression
+        :param udm: the database of the user whose shelves are selected, defaults to the current users
+        :return: the sorted array of the selected card_ids
+        """
+        return to_ids(cls.get_group_bitmap(group_name, udm))
+
+    @classmethod
+    def get_group_bitmap(cls, group_name: str, udm: UserDatabaseManager = None) -> int:
+        """
+        Evaluates a group expression with bitwise operations on the group and shelf bitmaps.
+        :raises ValueError: if the expression is malformed or names an unknown group
+        :param group_name: the group expression, see data.groupExpression
+        :param udm: the database of the user whose shelves are selected, defaults to the current users
+        :return: the bitmap of the selected card_ids
         """
-        name, lt = CardManager.parse_group_name(group_name)
-        if name in ("s{}".format(i) for i in range(CardManager.MIN_SHELF, CardManager.MAX_SHELF + 1)):
-            group = CardGroup(CardManager.get_cards_on_shelf(int(name[1:])), name)
+        return evaluate(parse_group_expression(group_name), lambda term: cls.get_term_bitmap(term, udm))
+
+    @classmethod
+    def get_term_bitmap(cls, term: Term, udm: UserDatabaseManager = None) -> int:
+        """
+        Resolves a single group, group range or shelf of a group expression.
+        :raises ValueError: if a group does not exist or a shelf is selected while no user is active
+        :param term: the Term
+        :param udm: the database of the user whose shelves are selected, defaults to the current users
+        :return: the bitmap of the card_ids
+        """
+        shelf = term.get_shelf()
+        if shelf is not None and cls.MIN_SHELF <= shelf <= cls.MAX_SHELF:
+            if udm is None:
+                if udm_handler.get_user() is None:
+                    raise ValueError("Choose user first to select shelf {}. (user <username>)".format(shelf))
+                udm = udm_handler.get_udm()
+            bitmap = udm.get_shelf_bitmaps().shelves.get(shelf, 0)
         else:
-            group = cls.get_group(database_manager.get_group_id_for_name(name))
+            group_bitmaps = database_manager.get_group_bitmaps()
+            bitmap = 0
+            for name in term.get_group_names(list(group_bitmaps.members)):
+                bitmap |= group_bitmaps.get_group(name)
 
-        if lt is not None:
-            return CardGroup(filter(lambda c: c.get_translations()[0][0].phrase < lt[1:],
-                                    group.get_cards()), group.name, group.parent_name)
-        return group
+        if term.prefix is not None:
+            bitmap &= to_bitmap(database_manager.get_card_ids_before(term.prefix))
+        return bitmap
 
-    @staticmethod
-    def group_name_exists(group_description: str) -> bool:
+    @classmethod
+    def count_cards(cls, group_name: str, min_shelf: int = MIN_SHELF) -> int:
         """
-        Checks whether a group exists.
-        :param group_description: the groups name + optional modifiers
-        :return: the groups existence
+        Counts the cards of the current user selected by a group expression on a shelf from min_shelf on.
+        :raises ValueError: if the expression is malformed or names an unknown group
+        :param group_name: the group expression, see data.groupExpression
+        :param min_shelf: the lowest shelf
+        :return: the amount of cards
         """
-        name, lt = CardManager.parse_group_name(group_description)
+        used = udm_handler.get_udm().get_shelf_bitmaps().get_used(min_shelf)
+        return popcount(cls.get_group_bitmap(group_name) & used)
 
-        # s1, s2, s3, s4, ...
-        if name in ("s{}".format(i) for i in range(CardManager.MIN_SHELF, CardManager.MAX_SHELF + 1)) \
-                or database_manager.group_name_exists(name):
-            return True
-        return False
+    @classmethod
+    def get_used_card_ids(cls, group_name: str) -> array:
+        """
+        Selects the cards of the current user by a group expression, without loading any card.
+        :raises ValueError: if the expression is malformed or names an unknown group
+        :param group_name: the group expression, see data.groupExpression
+        :return: the sorted array of the selected card_ids
+        """
+        return to_ids(cls.get_group_bitmap(group_name) & udm_handler.get_udm().get_shelf_bitmaps().get_used())
 
     @staticmethod
-    def parse_group_name(group_name: str) -> List[str]:
+    def count_shelves(card_ids: Iterable[int]) -> List[int]:
         """
-        Splits a group_name into name and modifiers.
-        :param group_name: the raw group names
-        :return: name, lt  # lt is None or a string starting with '<'
+        Counts the used cards among card_ids on every shelf, without loading any card.
+        :param card_ids: the cards ids
+        :return: counts[i] amount of cards on shelf i
         """
-        m = match("([\w-]+)(<\w+)?", group_name)
-        if m:
-            return m.groups()
-        return group_name, None
+        bitmap = to_bitmap(card_ids)
+        shelves = udm_handler.get_udm().get_shelf_bitmaps().shelves
+        counts = [0] * (max(shelves, default=-1) + 1)
+        for shelf, shelf_bitmap in shelves.items():
+            counts[shelf] = popcount(bitmap & shelf_bitmap)
+        return counts
+
+    @classmethod
+    def group_name_exists(cls, group_description: str) -> bool:
+        """
+        Checks whether a group expression is well-formed and all groups in it exist.
+        :param group_description: the group expression, see data.groupExpression
+        :return: the groups existence
+        """
+        try:
+            tree = parse_group_expression(group_description)
+        except ValueError:
+            return False
+
+        group_names = database_manager.get_group_bitmaps().members
+        for term in get_terms(tree):
+            shelf = term.get_shelf()
+            if shelf is not None and cls.MIN_SHELF <= shelf <= cls.MAX_SHELF:
+                continue
+            try:
+                if not all(name in group_names for name in term.get_group_names(list(group_names))):
+                    return False
+            except ValueError:
+                return False
+        return True
 
     @staticmethod
     def get_card(card_id: int) -> UsedCard:
@@ -317,45 +486,120 @@ class CardManager:
         :return: a UsedCard
         """
         return UsedCard(*udm_handler.get_udm().get_card(card_id), database_manager.get_card(card_id)[1],
-                        database_manager.get_group_names_for_card(card_id))
+                        database_manager.get_group_bitmaps().get_group_names(card_id))
+
+    @staticmethod
+    def load_cards(card_ids: List[int]) -> List[Card]:
+        """
+        Loads several cards from the database at once, as UsedCards if the current user uses them.
+        :param card_ids: the cards ids
+        :return: a list of Cards and UsedCards in the order of card_ids
+        """
+        groups = database_manager.get_group_names_for_cards(card_ids)
+        used = {}
+        if udm_handler.get_user() is not None:
+            used = {card[0]: card for card in udm_handler.get_udm().get_cards(card_ids)}
+
+        cards = []
+        for card_id, translations in database_manager.get_cards(card_ids):
+            if card_id in used:
+                cards.append(UsedCard(*used[card_id], translations, groups[card_id]))
+            else:
+                cards.append(Card(card_id, translations, groups[card_id]))
+        return cards
+
+    @classmethod
+    def iterate_used_cards(cls, card_ids: List[int], chunk_size: int = None) -> Iterator[UsedCard]:
+        """
+        Yields the UsedCards of card_ids in their order, loading them in chunks just before they are needed.
+        :param card_ids: the ids of used cards
+        :param chunk_size: the amount of cards loaded at once, defaults to QUESTION_CHUNK_SIZE
+        :return: an iterator over UsedCards
+        """
+        chunk_size = chunk_size or cls.QUESTION_CHUNK_SIZE
+        udm = udm_handler.get_udm()
+        for start in range(0, len(card_ids), chunk_size):
+            chunk = card_ids[start:start + chunk_size]
+            cards = {card[0]: card for card in udm.get_cards_with_content(chunk)}
+            for card_id in chunk:
+                yield UsedCard(*cards[card_id])
 
     #######
     # card manipulation methods
 
     @classmethod
-    def correct(cls, card: UsedCard):
+    def correct(cls, card: UsedCard, udm: UserDatabaseManager = None):
         """
         Modifies the card and saves it to the database.
         :param card: the card to be modified.
+        :param udm: the database of the user the card belongs to, defaults to the current users
         """
-        card.shelf = card.shelf + 1 if card.shelf < cls.MAX_SHELF else cls.MAX_SHELF
-
-        days = 2 ** card.shelf - 1
-        card.due_date = strftime("%Y-%m-%d", localtime(time() + 86400 * days))  # in *days* days
-
-        udm_handler.get_udm().update_card((card.card_id, card.shelf, card.due_date))
+        cls.answer(card, CORRECT, udm)
 
     @classmethod
-    def again(cls, card: UsedCard):
+    def again(cls, card: UsedCard, udm: UserDatabaseManager = None):
         """
         Modifies the card and saves it to the database.
         :param card: the card to be modified.
+        :param udm: the database of the user the card belongs to, defaults to the current users
         """
         assert card.shelf >= cls.MIN_AGAIN_SHELF, \
             "cards below shelf {} should be learned directly.".format(cls.MIN_AGAIN_SHELF)
 
-        card.shelf = cls.DEFAULT_SHELF + 1 if card.shelf >= cls.MIN_AGAIN_SHELF + 1 else cls.DEFAULT_SHELF
-        card.due_date = strftime('%Y-%m-%d')  # today
-
-        udm_handler.get_udm().update_card((card.card_id, card.shelf, card.due_date))
+        cls.answer(card, AGAIN, udm)
 
     @classmethod
-    def wrong(cls, card: UsedCard):
+    def wrong(cls, card: UsedCard, udm: UserDatabaseManager = None):
         """
         Modifies the cards and saves it to the database.
         :param card: the card to be modified.
+        :param udm: the database of the user the card belongs to, defaults to the current users
+        """
+        cls.answer(card, WRONG, udm)
+
+    @classmethod
+    def answer(cls, card: UsedCard, outcome: int, udm: UserDatabaseManager = None):
+        """
+        Moves the card with the scheduler of the user and saves it and the review to the database.
+        The due date is moved to the least loaded day near the one chosen by the scheduler.
+        :param card: the card to be modified
+        :param outcome: WRONG, AGAIN or CORRECT
+        :param udm: the database of the user the card belongs to, defaults to the current users
+        """
+        udm = udm or udm_handler.get_udm()
+        user_scheduler = cls.get_scheduler(udm)
+
+        history = udm.get_reviews(card.card_id) if user_scheduler.uses_history else []
+        shelf = card.shelf
+        card.shelf, days = user_scheduler.schedule(card.shelf, outcome, history)
+        days = udm.get_due_histogram().balance(days)
+        card.due_date = strftime("%Y-%m-%d", localtime(time() + 86400 * days))  # in *days* days
+
+        udm.update_card((card.card_id, card.shelf, card.due_date), (shelf, outcome))
+
+    @staticmethod
+    def get_scheduler(udm: UserDatabaseManager = None) -> Scheduler:
         """
-        card.shelf = cls.MIN_SHELF
-        card.due_date = strftime('%Y-%m-%d')  # today
+        Returns the scheduler of a user.
+        :param udm: the database of the user, defaults to the current users
+        :return: the Scheduler
+        """
+        return get_scheduler((udm or udm_handler.get_udm()).get_setting(SETTING_SCHEDULER, scheduler.DEFAULT_SCHEDULER))
 
-        udm_handler.get_udm().update_card((card.card_id, card.shelf, card.due_date))
+    @staticmethod
+    def set_scheduler(spec: str, udm: UserDatabaseManager = None) -> int:
+        """
+        Switches the scheduler of a user and reschedules all cards with a review history.
+        :raises ValueError: if spec is no valid scheduler spec, see data.scheduler.get_scheduler
+        :param spec: the new schedulers spec
+        :param udm: the database of the user, defaults to the current users
+        :return: the amount of rescheduled cards
+        """
+        udm = udm or udm_handler.get_udm()
+        user_scheduler = get_scheduler(spec)
+
+        histories = udm.get_all_reviews()
+        cards = [card for card in udm.get_all_cards() if card[0] in histories]
+        udm.update_cards(user_scheduler.reschedule_many(cards, histories))
+        udm.set_setting(SETTING_SCHEDULER, user_scheduler.get_spec())
+        return len(cards)
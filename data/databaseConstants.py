@@ -19,17 +19,31 @@
 Provides constants for the data.sqlite3 database.
 """
 
+from language.latin import Latin
+
 TABLE_PHRASE = "phrase"
 PHRASE_ID = "phrase_id"
 PHRASE_DESCRIPTION = "description"
 PHRASE_LANGUAGE = "language"
+PHRASE_SEARCH_KEY = "search_key"  # the folded description, see language.fold
 
 CREATE_TABLE_PHRASE = "CREATE TABLE IF NOT EXISTS " + TABLE_PHRASE + "(" + \
                       PHRASE_ID + " INTEGER PRIMARY KEY, " + \
                       PHRASE_DESCRIPTION + " TEXT, " + \
                       PHRASE_LANGUAGE + " TEXT, " + \
+                      PHRASE_SEARCH_KEY + " TEXT, " + \
                       "UNIQUE (" + PHRASE_DESCRIPTION + "," + PHRASE_LANGUAGE + "));"
 
+ADD_COLUMN_PHRASE_SEARCH_KEY = "ALTER TABLE " + TABLE_PHRASE + " ADD COLUMN " + PHRASE_SEARCH_KEY + " TEXT;"
+
+CREATE_INDEX_PHRASE_SEARCH_KEY = "CREATE INDEX IF NOT EXISTS " + TABLE_PHRASE + "_" + PHRASE_SEARCH_KEY + \
+                                 " ON " + TABLE_PHRASE + "(" + PHRASE_LANGUAGE + "," + PHRASE_SEARCH_KEY + ");"
+
+# databases migrated by earlier versions filled the search keys with triggers calling a python function
+DROP_TRIGGER_PHRASE_INSERT = "DROP TRIGGER IF EXISTS " + TABLE_PHRASE + "_" + PHRASE_SEARCH_KEY + "_insert;"
+
+DROP_TRIGGER_PHRASE_UPDATE = "DROP TRIGGER IF EXISTS " + TABLE_PHRASE + "_" + PHRASE_SEARCH_KEY + "_update;"
+
 
 TABLE_TRANSLATION = "translation"
 TRANSLATION_ID = "translation_id"
@@ -69,3 +83,65 @@ CREATE_TABLE_CARD_GROUP = "CREATE TABLE IF NOT EXISTS " + TABLE_CARD_GROUP + "("
                           GROUP_ID + " INTEGER, " + \
                           CARD_ID + " INTEGER, " + \
                           "UNIQUE (" + GROUP_ID + "," + CARD_ID + "));"
+
+
+TABLE_CARD_SORT_KEY = "card_sort_key"  # card - sort key map, kept up to date by triggers
+CARD_SORT_KEY = "sort_key"  # the latin phrase of the cards lowest translation_id
+
+CREATE_TABLE_CARD_SORT_KEY = "CREATE TABLE IF NOT EXISTS " + TABLE_CARD_SORT_KEY + "(" + \
+                             CARD_ID + " INTEGER PRIMARY KEY, " + \
+                             CARD_SORT_KEY + " TEXT);"
+
+# the sort key of the card whose id is the sql expression formatted into {}, phrase_1 if both phrases are latin
+SELECT_CARD_SORT_KEY = "(SELECT p." + PHRASE_DESCRIPTION + " FROM " + TABLE_CARD + " AS k" + \
+                       " JOIN " + TABLE_TRANSLATION + " AS t ON t." + TRANSLATION_ID + "=k." + TRANSLATION_ID + \
+                       " JOIN " + TABLE_PHRASE + " AS p ON p." + PHRASE_ID + " IN (t." + TRANSLATION_PHRASE_1 + \
+                       ",t." + TRANSLATION_PHRASE_2 + ") AND p." + PHRASE_LANGUAGE + "='" + Latin.name + "'" + \
+                       " WHERE k." + CARD_ID + "={} ORDER BY k." + TRANSLATION_ID + \
+                       ", p." + PHRASE_ID + "!=t." + TRANSLATION_PHRASE_1 + " LIMIT 1)"
+
+REPLACE_CARD_SORT_KEY = "INSERT OR REPLACE INTO " + TABLE_CARD_SORT_KEY + "(" + CARD_ID + "," + CARD_SORT_KEY + ")"
+
+CLEAR_CARD_SORT_KEY = "DELETE FROM " + TABLE_CARD_SORT_KEY + ";"
+
+FILL_CARD_SORT_KEY = REPLACE_CARD_SORT_KEY + \
+                     " SELECT " + CARD_ID + "," + SELECT_CARD_SORT_KEY.format("c." + CARD_ID) + \
+                     " FROM (SELECT DISTINCT " + CARD_ID + " FROM " + TABLE_CARD + ") AS c;"
+
+CREATE_INDEX_CARD_SORT_KEY = "CREATE INDEX IF NOT EXISTS " + TABLE_CARD_SORT_KEY + "_" + CARD_SORT_KEY + \
+                             " ON " + TABLE_CARD_SORT_KEY + "(" + CARD_SORT_KEY + ");"
+
+TRIGGER_CARD_INSERT = TABLE_CARD_SORT_KEY + "_card_insert"
+TRIGGER_CARD_DELETE = TABLE_CARD_SORT_KEY + "_card_delete"
+TRIGGER_PHRASE_SORT_KEY = TABLE_CARD_SORT_KEY + "_phrase_update"
+
+CREATE_TRIGGER_CARD_INSERT = "CREATE TRIGGER IF NOT EXISTS " + TRIGGER_CARD_INSERT + \
+                             " AFTER INSERT ON " + TABLE_CARD + " BEGIN " + REPLACE_CARD_SORT_KEY + \
+                             " VALUES (NEW." + CARD_ID + "," + SELECT_CARD_SORT_KEY.format("NEW." + CARD_ID) + "); END;"
+
+# the row of a card is deleted with its last translation, otherwise the key of the remaining translations is kept
+CREATE_TRIGGER_CARD_DELETE = "CREATE TRIGGER IF NOT EXISTS " + TRIGGER_CARD_DELETE + \
+                             " AFTER DELETE ON " + TABLE_CARD + " BEGIN" + \
+                             " DELETE FROM " + TABLE_CARD_SORT_KEY + " WHERE " + CARD_ID + "=OLD." + CARD_ID + ";" + \
+                             " " + REPLACE_CARD_SORT_KEY + " SELECT OLD." + CARD_ID + "," + \
+                             SELECT_CARD_SORT_KEY.format("OLD." + CARD_ID) + \
+                             " WHERE EXISTS (SELECT 1 FROM " + TABLE_CARD + \
+                             " WHERE " + CARD_ID + "=OLD." + CARD_ID + "); END;"
+
+CREATE_TRIGGER_PHRASE_SORT_KEY = "CREATE TRIGGER IF NOT EXISTS " + TRIGGER_PHRASE_SORT_KEY + \
+                                 " AFTER UPDATE OF " + PHRASE_DESCRIPTION + "," + PHRASE_LANGUAGE + \
+                                 " ON " + TABLE_PHRASE + " BEGIN" + \
+                                 " UPDATE " + TABLE_CARD_SORT_KEY + " SET " + CARD_SORT_KEY + "=" + \
+                                 SELECT_CARD_SORT_KEY.format(TABLE_CARD_SORT_KEY + "." + CARD_ID) + \
+                                 " WHERE " + CARD_ID + " IN (SELECT c." + CARD_ID + " FROM " + TABLE_CARD + " AS c" + \
+                                 " JOIN " + TABLE_TRANSLATION + " AS t" + \
+                                 " ON t." + TRANSLATION_ID + "=c." + TRANSLATION_ID + \
+                                 " WHERE NEW." + PHRASE_ID + " IN (t." + TRANSLATION_PHRASE_1 + \
+                                 ",t." + TRANSLATION_PHRASE_2 + ")); END;"
+
+# the sort key triggers are recreated by migrations, in case their definition changed
+DROP_TRIGGER_CARD_INSERT = "DROP TRIGGER IF EXISTS " + TRIGGER_CARD_INSERT + ";"
+
+DROP_TRIGGER_CARD_DELETE = "DROP TRIGGER IF EXISTS " + TRIGGER_CARD_DELETE + ";"
+
+DROP_TRIGGER_PHRASE_SORT_KEY = "DROP TRIGGER IF EXISTS " + TRIGGER_PHRASE_SORT_KEY + ";"
@@ -20,8 +20,12 @@ Responsible for all database interactions not concerning user data.
 Instantiate DatabaseManager to get access to the functionality.
 """
 
+from data.bitmapIndex import GroupBitmaps
 from data.databaseOpenHelper import *
 from data.databaseConstants import *
+from language.folding import fold
+from os import stat
+from os.path import splitext
 
 from typing import List, Optional, Tuple, Dict
 
@@ -35,11 +39,12 @@ class DatabaseManager(DatabaseOpenHelper):
     Responsible for all database interactions not concerning user data.
     """
 
-    def __init__(self):
+    def __init__(self, check_schema: bool = True):
         """
         Initialize the DatabaseManager to use the database db_name
+        :param check_schema: False to skip create_tables, e.g. to migrate an outdated database
         """
-        super().__init__("data.sqlite3")
+        super().__init__("data.sqlite3", check_schema)
 
         # init database ids with default values ...
         self.phrase_id = 0
@@ -50,6 +55,9 @@ class DatabaseManager(DatabaseOpenHelper):
         # ... and load the actual values from the database - if they exist
         self.load_ids()
 
+        self.bitmap_file = splitext(self.db_name)[0] + ".bitmaps"
+        self.group_bitmaps = None  # type: GroupBitmaps  # loaded by get_group_bitmaps, then kept up to date
+
     def load_ids(self):
         """
         Loads the current max ids from the database.
@@ -70,11 +78,21 @@ class DatabaseManager(DatabaseOpenHelper):
         if group_id is not None:
             self.group_id = group_id
 
+    def reload(self):
+        """
+        Loads the ids again and drops the group bitmaps, after the database was changed by another process.
+        """
+        self.load_ids()
+        self.group_bitmaps = None
+
     def create_tables(self):
         """
-        Creates the database tables if not present.
+        Creates the database tables if not present and migrates databases created by older versions.
         Overrides DatabaseOpenHelper.create_tables().
         """
+        if self.is_outdated():
+            self.migrate()
+
         db = self.get_connection()
         cur = db.cursor()
         cur.execute(CREATE_TABLE_PHRASE)
@@ -82,6 +100,67 @@ class DatabaseManager(DatabaseOpenHelper):
         cur.execute(CREATE_TABLE_CARD)
         cur.execute(CREATE_TABLE_GROUP)
         cur.execute(CREATE_TABLE_CARD_GROUP)
+        cur.execute(CREATE_TABLE_CARD_SORT_KEY)
+        cur.execute(CREATE_INDEX_PHRASE_SEARCH_KEY)
+        cur.execute(CREATE_INDEX_CARD_SORT_KEY)
+        cur.execute(CREATE_TRIGGER_CARD_INSERT)
+        cur.execute(CREATE_TRIGGER_CARD_DELETE)
+        cur.execute(CREATE_TRIGGER_PHRASE_SORT_KEY)
+        db.commit()
+        db.close()
+
+    def is_outdated(self, cursor: Cursor = None) -> bool:
+        """
+        Checks whether the database lacks parts of the schema added by later versions.
+        :param cursor: the cursor to be used to access the database
+        :return: True if the database needs to be migrated
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            outdated = self.is_outdated(cur)
+            db.close()
+            return outdated
+
+        # a cursor was passed on
+        else:
+            tables = [row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")]
+            if TABLE_PHRASE not in tables:
+                return False  # a new database is created with the current schema
+            columns = [row[1] for row in cursor.execute("PRAGMA table_info(" + TABLE_PHRASE + ");")]
+            return PHRASE_SEARCH_KEY not in columns or TABLE_CARD_SORT_KEY not in tables
+
+    def migrate(self):
+        """
+        Adds the parts of the schema added by later versions to the database.
+        """
+        db = self.get_connection()
+        cur = db.cursor()
+
+        # the search keys are folded in python, the schema must not depend on functions of lHelper
+        cur.execute(DROP_TRIGGER_PHRASE_INSERT)
+        cur.execute(DROP_TRIGGER_PHRASE_UPDATE)
+        if PHRASE_SEARCH_KEY not in (row[1] for row in cur.execute("PRAGMA table_info(" + TABLE_PHRASE + ");")):
+            cur.execute(ADD_COLUMN_PHRASE_SEARCH_KEY)
+        cur.executemany("UPDATE " + TABLE_PHRASE + " SET " + PHRASE_SEARCH_KEY + "=? WHERE " + PHRASE_ID + "=?;",
+                        [(fold(description), phrase_id) for phrase_id, description
+                         in cur.execute("SELECT " + PHRASE_ID + "," + PHRASE_DESCRIPTION + " FROM " + TABLE_PHRASE
+                                        + ";").fetchall()])
+        cur.execute(CREATE_INDEX_PHRASE_SEARCH_KEY)
+
+        # the sort keys are filled anew and their triggers recreated, in case their definition changed
+        cur.execute(DROP_TRIGGER_CARD_INSERT)
+        cur.execute(DROP_TRIGGER_CARD_DELETE)
+        cur.execute(DROP_TRIGGER_PHRASE_SORT_KEY)
+        cur.execute(CREATE_TABLE_CARD_SORT_KEY)
+        cur.execute(CLEAR_CARD_SORT_KEY)
+        cur.execute(FILL_CARD_SORT_KEY)
+        cur.execute(CREATE_INDEX_CARD_SORT_KEY)
+        cur.execute(CREATE_TRIGGER_CARD_INSERT)
+        cur.execute(CREATE_TRIGGER_CARD_DELETE)
+        cur.execute(CREATE_TRIGGER_PHRASE_SORT_KEY)
         db.commit()
         db.close()
 
@@ -112,8 +191,8 @@ class DatabaseManager(DatabaseOpenHelper):
             # try to add the phrase to the database
             try:
                 cursor.execute("INSERT INTO " + TABLE_PHRASE + "("
-                               + ",".join((PHRASE_ID, PHRASE_DESCRIPTION, PHRASE_LANGUAGE))
-                               + ") VALUES (?,?,?);", (self.phrase_id + 1, phrase, language))
+                               + ",".join((PHRASE_ID, PHRASE_DESCRIPTION, PHRASE_LANGUAGE, PHRASE_SEARCH_KEY))
+                               + ") VALUES (?,?,?,?);", (self.phrase_id + 1, phrase, language, fold(phrase)))
 
                 # insert succeeded
                 self.phrase_id += 1
@@ -230,6 +309,8 @@ class DatabaseManager(DatabaseOpenHelper):
 
                 # insert succeeded
                 self.group_id += 1
+                if self.group_bitmaps is not None:
+                    self.group_bitmaps.add_group(group_name, parent_name)
                 return self.group_id
 
             # group name did already exist
@@ -254,6 +335,8 @@ class DatabaseManager(DatabaseOpenHelper):
             self.add_card_to_group(card_id, group_name, cur)
             db.commit()
             db.close()
+            if self.group_bitmaps is not None:
+                self.save_group_bitmaps()
 
         # a cursor was passed on
         else:
@@ -263,6 +346,8 @@ class DatabaseManager(DatabaseOpenHelper):
             try:
                 cursor.execute("INSERT INTO " + TABLE_CARD_GROUP + "(" + ",".join((GROUP_ID, CARD_ID)) + ")"
                                + " VALUES (?,?);", (group_id, card_id))
+                if self.group_bitmaps is not None:
+                    self.group_bitmaps.add_card(card_id, group_name)
 
             # the card is already in group group_name
             except IntegrityError:
@@ -391,6 +476,40 @@ class DatabaseManager(DatabaseOpenHelper):
 
             return card_id, cursor.fetchall()
 
+    def get_cards(self, card_ids: List[int], cursor: Cursor = None) -> List[Card]:
+        """
+        Loads several cards from the database at once.
+        :param card_ids: the cards ids
+        :param cursor: the cursor to be used to access the database
+        :return: a list of cards in the order of card_ids, as returned by get_card
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            cards = self.get_cards(card_ids, cur)
+            db.close()
+            return cards
+
+        # a cursor was passed on
+        else:
+            translations = {card_id: [] for card_id in card_ids}
+            cursor.execute("SELECT c." + CARD_ID + "," + ",".join(["l1." + PHRASE_DESCRIPTION, "l1." + PHRASE_LANGUAGE,
+                                                                   "l2." + PHRASE_DESCRIPTION, "l2." + PHRASE_LANGUAGE])
+                           + " FROM " + TABLE_CARD + " AS c"
+                           + " JOIN " + TABLE_TRANSLATION + " AS t ON c." + TRANSLATION_ID + "=t." + TRANSLATION_ID
+                           + " JOIN " + TABLE_PHRASE + " AS l1 ON t." + TRANSLATION_PHRASE_1 + "=l1." + PHRASE_ID
+                           + " JOIN " + TABLE_PHRASE + " AS l2 ON t." + TRANSLATION_PHRASE_2 + "=l2." + PHRASE_ID
+                           + " WHERE c." + CARD_ID + " IN (" + ",".join(map(str, translations)) + ");")
+            for card_id, *translation in cursor.fetchall():
+                translations[card_id].append(tuple(translation))
+
+            for card_id, card_translations in translations.items():
+                if not card_translations:
+                    raise ValueError("Card {} does not exist.".format(card_id))
+            return [(card_id, translations[card_id]) for card_id in card_ids]
+
     def load_group(self, group_id: int, cursor: Cursor = None) -> Group:
         """
         Loads a group from the database.
@@ -486,6 +605,99 @@ class DatabaseManager(DatabaseOpenHelper):
         db.close()
         return names
 
+    def get_group_memberships(self, cursor: Cursor = None) -> List[Tuple[str, Optional[str], Optional[int]]]:
+        """
+        Loads which cards are directly in which group.
+        :param cursor: the cursor to be used to access the database
+        :return: a list of (group_name, parent_name, card_id) tuples, card_id is None for groups without cards
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            memberships = self.get_group_memberships(cur)
+            db.close()
+            return memberships
+
+        # a cursor was passed on
+        else:
+            return cursor.execute("SELECT g." + GROUP_NAME + ", p." + GROUP_NAME + ", cg." + CARD_ID
+                                  + " FROM " + TABLE_GROUP + " AS g"
+                                  + " LEFT JOIN " + TABLE_GROUP + " AS p ON p." + GROUP_ID + "=g." + GROUP_PARENT
+                                  + " LEFT JOIN " + TABLE_CARD_GROUP + " AS cg ON cg." + GROUP_ID + "=g." + GROUP_ID
+                                  + " ORDER BY g." + GROUP_ID + ";").fetchall()
+
+    def get_group_bitmaps(self) -> GroupBitmaps:
+        """
+        Returns the bitmaps of the cards in every group. They are read from the bitmap file if it has the version
+        of the database, built and saved otherwise, and kept up to date by add_group and add_card_to_group.
+        :return: the GroupBitmaps
+        """
+        if self.group_bitmaps is None:
+            version = self.get_version()
+            group_bitmaps = GroupBitmaps.load(self.bitmap_file, version)
+            if group_bitmaps is not None:
+                self.group_bitmaps = group_bitmaps
+            else:
+                group_bitmaps = GroupBitmaps(version)
+                group_bitmaps.build(self.get_group_memberships())
+                self.group_bitmaps = group_bitmaps
+                self.save_group_bitmaps()
+        return self.group_bitmaps
+
+    def save_group_bitmaps(self):
+        """
+        Saves the group bitmaps stamped with the current version of the database, if possible.
+        """
+        self.group_bitmaps.version = self.get_version()
+        try:
+            self.group_bitmaps.save(self.bitmap_file)
+        except OSError:
+            pass  # e.g. a read-only directory, the bitmaps are built again next time
+
+    def get_version(self) -> Tuple[int, int, int]:
+        """
+        Identifies the current state of the database file, it changes with every committed write.
+        :return: the files modification time in ns, inode and size
+        """
+        db_stat = stat(self.db_name)
+        return db_stat.st_mtime_ns, db_stat.st_ino, db_stat.st_size
+
+    def get_all_card_ids(self) -> List[int]:
+        """
+        Loads the ids of all cards.
+        :return: a sorted list of card_ids
+        """
+        db = self.get_connection()
+        card_ids = list(map(lambda row: row[0],
+                            db.execute("SELECT DISTINCT " + CARD_ID + " FROM " + TABLE_CARD
+                                       + " ORDER BY " + CARD_ID + ";").fetchall()))
+        db.close()
+        return card_ids
+
+    def get_card_ids_before(self, prefix: str, cursor: Cursor = None) -> List[int]:
+        """
+        Loads the ids of all cards whose sort key, the latin phrase of their lowest translation_id, comes before prefix.
+        :param prefix: the string all sort keys are compared with
+        :param cursor: the cursor to be used to access the database
+        :return: a list of card_ids in the order of their sort keys
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            card_ids = self.get_card_ids_before(prefix, cur)
+            db.close()
+            return card_ids
+
+        # a cursor was passed on
+        else:
+            return [row[0] for row in cursor.execute("SELECT " + CARD_ID + " FROM " + TABLE_CARD_SORT_KEY
+                                                     + " WHERE " + CARD_SORT_KEY + "<? ORDER BY " + CARD_SORT_KEY
+                                                     + ", " + CARD_ID + ";", (prefix,))]
+
     def get_group_names_for_card(self, card_id: int, cursor: Cursor = None) -> List[str]:
         """
         Loads the names of all groups a card is in.
@@ -513,6 +725,32 @@ class DatabaseManager(DatabaseOpenHelper):
                                            + " WHERE cg." + CARD_ID + "=?",
                                            (card_id,)).fetchall()))
 
+    def get_group_names_for_cards(self, card_ids: List[int], cursor: Cursor = None) -> Dict[int, List[str]]:
+        """
+        Loads the names of all groups several cards are in at once.
+        :param card_ids: the cards ids
+        :param cursor: the cursor to be used to access the database
+        :return: a dict mapping each card_id to a list of group_names
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            group_names = self.get_group_names_for_cards(card_ids, cur)
+            db.close()
+            return group_names
+
+        # a cursor was passed on
+        else:
+            group_names = {card_id: [] for card_id in card_ids}
+            for card_id, group_name in cursor.execute(
+                    "SELECT cg." + CARD_ID + ", g." + GROUP_NAME + " FROM " + TABLE_GROUP + " AS g"
+                    + " JOIN " + TABLE_CARD_GROUP + " AS cg ON cg." + GROUP_ID + "=g." + GROUP_ID
+                    + " WHERE cg." + CARD_ID + " IN (" + ",".join(map(str, group_names)) + ");").fetchall():
+                group_names[card_id].append(group_name)
+            return group_names
+
     def get_all_phrases(self, language: str) -> List[str]:
         """
         Returns all phrases of a language.
@@ -526,6 +764,102 @@ class DatabaseManager(DatabaseOpenHelper):
         db.close()
         return phrases
 
+    def get_phrase_cards(self, language: str, cursor: Cursor = None) -> List[Tuple[int, str, int]]:
+        """
+        Returns all phrases of a language together with the ids of the cards they are on.
+        :param language: the language of the phrases
+        :param cursor: the cursor to be used to access the database
+        :return: a list of (phrase_id, description, card_id) tuples
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            rows = self.get_phrase_cards(language, cur)
+            db.close()
+            return rows
+
+        # a cursor was passed on
+        else:
+            select = "SELECT p." + PHRASE_ID + ", p." + PHRASE_DESCRIPTION + ", c." + CARD_ID \
+                     + " FROM " + TABLE_PHRASE + " AS p" \
+                     + " JOIN " + TABLE_TRANSLATION + " AS t ON t.{}=p." + PHRASE_ID \
+                     + " JOIN " + TABLE_CARD + " AS c ON c." + TRANSLATION_ID + "=t." + TRANSLATION_ID \
+                     + " WHERE p." + PHRASE_LANGUAGE + "=?"
+            return cursor.execute(select.format(TRANSLATION_PHRASE_1) + " UNION " + select.format(TRANSLATION_PHRASE_2)
+                                  + ";", (language, language)).fetchall()
+
+    def find_phrases_with_key(self, string: str, language: str, prefix: bool = False,
+                              cursor: Cursor = None) -> List[Tuple[int, str]]:
+        """
+        Returns all phrases in language whose search key equals - or starts with - the folded string.
+        :param string: the string to be searched for
+        :param language: the strings language
+        :param prefix: True to match all phrases starting with string
+        :param cursor: the cursor to be used to access the database
+        :return: a list of (phrase_id, description) tuples
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            phrases = self.find_phrases_with_key(string, language, prefix, cur)
+            db.close()
+            return phrases
+
+        # a cursor was passed on
+        else:
+            key = fold(string)
+            select = "SELECT " + ",".join((PHRASE_ID, PHRASE_DESCRIPTION)) + " FROM " + TABLE_PHRASE \
+                     + " WHERE " + PHRASE_LANGUAGE + "=? AND "
+
+            if not prefix or not key:
+                return cursor.execute(select + PHRASE_SEARCH_KEY + "=?;", (language, key)).fetchall()
+
+            # a range instead of LIKE, so that the index is used
+            upper = key[:-1] + chr(ord(key[-1]) + 1)
+            return cursor.execute(select + PHRASE_SEARCH_KEY + ">=? AND " + PHRASE_SEARCH_KEY + "<?;",
+                                  (language, key, upper)).fetchall()
+
+    def find_cards_with_key(self, string: str, language: str, prefix: bool = False,
+                            cursor: Cursor = None) -> List[int]:
+        """
+        Returns the ids of all cards with a phrase in language whose search key equals - or starts with - the
+        folded string. Cards with shorter matching phrases come first.
+        :param string: the string to be searched for
+        :param language: the strings language
+        :param prefix: True to match all phrases starting with string
+        :param cursor: the cursor to be used to access the database
+        :return: a list of card_ids
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            card_ids = self.find_cards_with_key(string, language, prefix, cur)
+            db.close()
+            return card_ids
+
+        # a cursor was passed on
+        else:
+            ranks = {phrase_id: (len(description), phrase_id)
+                     for phrase_id, description in self.find_phrases_with_key(string, language, prefix, cursor)}
+            phrase_ids = ",".join(map(str, ranks))
+
+            card_ranks = {}
+            for phrase_1, phrase_2, card_id in cursor.execute(
+                    "SELECT t." + TRANSLATION_PHRASE_1 + ", t." + TRANSLATION_PHRASE_2 + ", c." + CARD_ID
+                    + " FROM " + TABLE_CARD + " AS c"
+                    + " JOIN " + TABLE_TRANSLATION + " AS t ON t." + TRANSLATION_ID + "=c." + TRANSLATION_ID
+                    + " WHERE t." + TRANSLATION_PHRASE_1 + " IN (" + phrase_ids + ")"
+                    + " OR t." + TRANSLATION_PHRASE_2 + " IN (" + phrase_ids + ");").fetchall():
+                rank = min(ranks[phrase_id] for phrase_id in (phrase_1, phrase_2) if phrase_id in ranks)
+                card_ranks[card_id] = min(rank, card_ranks.get(card_id, rank))
+            return sorted(card_ranks, key=lambda card_id: (card_ranks[card_id], card_id))
+
     def find_cards_with(self, string: str, language: str, cursor: Cursor = None) -> List[Card]:
         """
         Returns all cards with a phrase in language like <string> on them
@@ -630,15 +964,15 @@ class DatabaseManager(DatabaseOpenHelper):
 
             # update phrase 1
             if old_translation[0] != new_translation[0] or old_translation[1] != new_translation[1]:
-                cursor.execute("UPDATE " + TABLE_PHRASE + " SET " + PHRASE_DESCRIPTION + "=?," + PHRASE_LANGUAGE + "=?"
-                               + " WHERE " + PHRASE_ID + "=?;",
-                               (new_translation[0], new_translation[1], phrase_1))
+                cursor.execute("UPDATE " + TABLE_PHRASE + " SET " + PHRASE_DESCRIPTION + "=?," + PHRASE_LANGUAGE + "=?,"
+                               + PHRASE_SEARCH_KEY + "=? WHERE " + PHRASE_ID + "=?;",
+                               (new_translation[0], new_translation[1], fold(new_translation[0]), phrase_1))
 
             # update phrase 2
             if old_translation[2] != new_translation[2] or old_translation[3] != new_translation[3]:
-                cursor.execute("UPDATE " + TABLE_PHRASE + " SET " + PHRASE_DESCRIPTION + "=?," + PHRASE_LANGUAGE + "=?"
-                               + " WHERE " + PHRASE_ID + "=?;",
-                               (new_translation[2], new_translation[3], phrase_2))
+                cursor.execute("UPDATE " + TABLE_PHRASE + " SET " + PHRASE_DESCRIPTION + "=?," + PHRASE_LANGUAGE + "=?,"
+                               + PHRASE_SEARCH_KEY + "=? WHERE " + PHRASE_ID + "=?;",
+                               (new_translation[2], new_translation[3], fold(new_translation[2]), phrase_2))
 
     def remove_translation(self, translation: Translation, cursor: Cursor = None):
         """
@@ -27,20 +27,63 @@ class DatabaseOpenHelper:
     Responsible for opening the database.
     """
 
-    def __init__(self, db_name: str):
+    def __init__(self, db_name: str, check_schema: bool = True):
+        """
+        Initialize the DatabaseOpenHelper.
+        :param db_name: the path of the database file
+        :param check_schema: False to skip create_tables, if the tables are known to exist
+        """
         self.db_name = db_name
-        self.create_tables()
+        self.kept_connection = None
+        if check_schema:
+            self.create_tables()
 
     def get_connection(self) -> Connection:
         """
         Opens the database and returns a Cursor
         :return: a Cursor
         """
+        if self.kept_connection is not None:
+            return self.kept_connection
         return connect(self.db_name)
 
+    def keep_connection(self):
+        """
+        Keeps a single connection open and returns it from get_connection from now on.
+        The connection may be used by other threads than the current one, but only by one thread at a time.
+        """
+        if self.kept_connection is None:
+            self.kept_connection = KeptConnection(connect(self.db_name, check_same_thread=False))
+
+    def close_connection(self):
+        """
+        Closes the kept connection. get_connection opens a new connection per call again.
+        """
+        if self.kept_connection is not None:
+            self.kept_connection.connection.close()
+            self.kept_connection = None
+
     def create_tables(self):
         """
         Creates the database tables if not present.
         :raises RuntimeError: when not implemented in inherited classes
         """
         raise RuntimeError("{} has not implemented the create_tables method".format(self.__class__))
+
+
+class KeptConnection:
+    """
+    Wraps a Connection that stays open when closed by the methods of a DatabaseOpenHelper.
+    """
+
+    def __init__(self, connection: Connection):
+        self.connection = connection
+
+    def __getattr__(self, name: str):
+        return getattr(self.connection, name)
+
+    def close(self):
+        """
+        Rolls back what was not committed instead of closing the connection.
+        """
+        self.connection.rollback()
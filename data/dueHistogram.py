@@ -0,0 +1,90 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Provides an in-memory histogram of the due dates of the cards of one user.
+It is used to spread cards answered in the same session over several days instead of a single one.
+"""
+
+from datetime import date, timedelta
+from typing import Dict, Iterable, Tuple
+
+MIN_BALANCED_INTERVAL = 3  # shorter intervals are kept exactly
+BALANCE_TOLERANCE = 0.15  # the share of an interval a due date may be moved by
+
+
+class DueHistogram:
+    """
+    Counts the cards of a user per due_date.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty DueHistogram.
+        """
+        self.counts = {}  # type: Dict[str, int]  # due_date -> amount of cards
+
+    def build(self, rows: Iterable[Tuple[str, int]]):
+        """
+        Fills the histogram.
+        :param rows: (due_date, amount of cards) tuples as returned by UserDatabaseManager.get_due_date_counts
+        """
+        for due_date, count in rows:
+            self.counts[due_date] = self.counts.get(due_date, 0) + count
+
+    def add(self, due_date: str):
+        """
+        Counts a card.
+        :param due_date: the cards due_date in format '%Y-%m-%d'
+        """
+        self.counts[due_date] = self.counts.get(due_date, 0) + 1
+
+    def move(self, old_due_date: str, new_due_date: str):
+        """
+        Moves a card from one due_date to another.
+        :param old_due_date: the cards due_date before
+        :param new_due_date: the cards new due_date
+        """
+        if self.counts.get(old_due_date, 0) > 1:
+            self.counts[old_due_date] -= 1
+        else:
+            self.counts.pop(old_due_date, None)
+        self.add(new_due_date)
+
+    def count_until(self, due_date: str) -> int:
+        """
+        Counts the cards due until a day.
+        :param due_date: the day in format '%Y-%m-%d'
+        :return: the amount of cards with a due_date up to due_date
+        """
+        return sum(count for day, count in self.counts.items() if day <= due_date)
+
+    def balance(self, days: int, today: date = None) -> int:
+        """
+        Finds the least loaded day near an interval.
+        :param days: the interval chosen by the scheduler
+        :param today: the day the interval starts at, defaults to today
+        :return: the interval to the day with the fewest due cards within the tolerance, the closest one on ties
+        """
+        if days < MIN_BALANCED_INTERVAL:
+            return days
+
+        today = today or date.today()
+        window = max(1, round(days * BALANCE_TOLERANCE))
+        return min(range(days - window, days + window + 1),
+                   key=lambda d: (self.counts.get((today + timedelta(days=d)).isoformat(), 0), abs(d - days), d))
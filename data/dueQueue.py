@@ -0,0 +1,88 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Provides an in-memory queue of the cards of one user, ordered by due date.
+It answers which card is due next without querying the database in long-running processes like the server.
+"""
+
+from heapq import heapify, heappop, heappush
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MIN_COMPACTED_SIZE = 1024  # heaps below this size are never compacted
+
+
+class DueQueue:
+    """
+    A heap of (due_date, card_id) entries, the longest overdue card on top.
+    Moving a card pushes a new entry, outdated entries are dropped when they reach the top.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty DueQueue.
+        """
+        self.cards = {}  # type: Dict[int, Tuple[int, str]]  # card_id -> (shelf, due_date)
+        self.heap = []  # type: List[Tuple[str, int]]  # (due_date, card_id), including outdated entries
+
+    def build(self, rows: Iterable[Tuple[int, int, str]]):
+        """
+        Fills the queue.
+        :param rows: 3-tuples (id, shelf, due_date) as returned by UserDatabaseManager.get_all_cards
+        """
+        for card_id, shelf, due_date in rows:
+            self.cards[card_id] = (shelf, due_date)
+        self.compact()
+
+    def push(self, card_id: int, shelf: int, due_date: str):
+        """
+        Adds a card or moves it to its new shelf and due_date.
+        :param card_id: the cards id
+        :param shelf: the cards shelf
+        :param due_date: the cards due_date in format '%Y-%m-%d'
+        """
+        self.cards[card_id] = (shelf, due_date)
+        heappush(self.heap, (due_date, card_id))
+        if len(self.heap) > max(MIN_COMPACTED_SIZE, 2 * len(self.cards)):
+            self.compact()
+
+    def peek(self, due_date: str) -> Optional[Tuple[int, int, str]]:
+        """
+        Returns the card due first, if it is due.
+        :param due_date: the day in format '%Y-%m-%d', cards due until then are due
+        :return: a 3-tuple (id, shelf, due_date) representing the card or None if no card is due
+        """
+        heap = self.heap
+        while heap and self.cards[heap[0][1]][1] != heap[0][0]:
+            heappop(heap)  # the card was moved since the entry was pushed
+        if not heap or heap[0][0] > due_date:
+            return None
+        card_id = heap[0][1]
+        return (card_id,) + self.cards[card_id]
+
+    def compact(self):
+        """
+        Rebuilds the heap from the current due dates, dropping all outdated entries.
+        """
+        self.heap = [(due_date, card_id) for card_id, (_, due_date) in self.cards.items()]
+        heapify(self.heap)
+
+    def __len__(self) -> int:
+        """
+        Returns the amount of cards in the queue.
+        """
+        return len(self.cards)
@@ -0,0 +1,94 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Projects how many cards will be due on each of the next days.
+The projection follows the scheduler of the user: a remembered card is reviewed as CORRECT, a forgotten card
+as WRONG and, as it is learned again right away, as CORRECT on the same day.
+"""
+
+from data.scheduler import Scheduler, State, get_scheduler, WRONG, CORRECT
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+Schedule = Iterable[Tuple[int, int, int]]  # shelf, days until due, amount of cards
+
+STATE_DIGITS = 2  # the precision of the ease, stability and difficulty of cards in a projection
+
+
+def forecast(schedule: Schedule, days: int, recall: float = 1.0, scheduler: Scheduler = None) -> List[float]:
+    """
+    Projects the amount of cards due on each of the next days, assuming every card is reviewed when due.
+    All cards in the same state and due on the same day are moved at once.
+    With a recall below 1 the amounts are expected values.
+    The review histories are not replayed: every card starts in the state scheduler.initial_state gives its shelf,
+    which is exact for Leitner and an approximation for SM2 and FSRS.
+    :param schedule: the cards as returned by UserDatabaseManager.get_schedule
+    :param days: the amount of days to project, starting today
+    :param recall: the probability of remembering a card
+    :param scheduler: the scheduler of the user, Leitner by default
+    :return: a list of the amount of due cards per day
+    """
+    scheduler = scheduler or get_scheduler()
+
+    # due[day][(state, elapsed_days)] = amount of cards, elapsed_days is None before the first projected review
+    due = [{} for _ in range(days)]  # type: List[Dict[Tuple[State, Optional[int]], float]]
+    for shelf, day, count in schedule:
+        if day < days:
+            add(due, day, scheduler.initial_state(shelf), None, count)
+
+    totals = []
+    for day in range(days):
+        total = 0.0
+        for (state, elapsed_days), count in due[day].items():
+            total += count
+            if recall > 0:
+                remembered, interval = scheduler.review(state, CORRECT, elapsed_days)
+                add(due, day + max(1, interval), remembered, interval, count * recall)
+            if recall < 1:
+                forgotten, _ = scheduler.review(state, WRONG, elapsed_days)
+                forgotten, interval = scheduler.review(forgotten, CORRECT, 0)
+                add(due, day + max(1, interval), forgotten, interval, count * (1 - recall))
+        totals.append(total)
+    return totals
+
+
+def add(due: List[Dict[Tuple[State, Optional[int]], float]], day: int, state: State, elapsed_days: Optional[int],
+        count: float):
+    """
+    Adds cards to the projection, if they are due within it.
+    :param due: the projection, see forecast
+    :param day: the day the cards are due on
+    :param state: the state of the cards
+    :param elapsed_days: the days since their last review
+    :param count: the amount of cards
+    """
+    if day < len(due):
+        key = round_state(state), elapsed_days
+        due[day][key] = due[day].get(key, 0.0) + count
+
+
+def round_state(state: State) -> State:
+    """
+    Rounds the numbers of a state to STATE_DIGITS significant digits.
+    Otherwise every path of reviews leads to a state of its own and their amount grows exponentially.
+    :param state: the state
+    :return: the rounded state
+    """
+    return tuple(float("{:.{}g}".format(value, STATE_DIGITS)) if isinstance(value, float) else value
+                 for value in state)
@@ -0,0 +1,325 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Grades the answers of a user to a card, independent of any user interface.
+Call get_prompts to get the questions asked about a card and grade to grade the answers to them.
+"""
+
+from data.cardManager import Card
+from data.scheduler import WRONG, AGAIN, CORRECT
+from language import German, Latin, Phrase, fold
+
+from re import match
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+ROOT_FORMS, TRANSLATIONS = "root forms", "translations"
+
+
+class Prompt:
+    """
+    A question about one latin phrase of a card.
+    """
+
+    def __init__(self, kind: str, phrase: Phrase, text: str, solution: Set[str]):
+        """
+        Initialize the Prompt.
+        :param kind: ROOT_FORMS or TRANSLATIONS
+        :param phrase: the latin phrase asked about
+        :param text: the text shown to the user before the answer
+        :param solution: the correct answers: the missing root forms or the german translations
+        """
+        self.kind = kind
+        self.phrase = phrase
+        self.text = text
+        self.solution = solution
+
+
+class Verdict:
+    """
+    The grading of the answer to a Prompt.
+    """
+
+    def __init__(self, prompt: Prompt, answer: str, typos: List[Tuple[str, str]], wrong: List[str],
+                 missing: List[str], mistakes: int):
+        """
+        Initialize the Verdict.
+        :param prompt: the prompt answered
+        :param answer: the answer given
+        :param typos: (answered, correct) pairs of phrases accepted despite a typo
+        :param wrong: the answered phrases that are wrong
+        :param missing: the correct phrases that were not answered
+        :param mistakes: the amount of mistakes counted
+        """
+        self.prompt = prompt
+        self.answer = answer
+        self.typos = typos
+        self.wrong = wrong
+        self.missing = missing
+        self.mistakes = mistakes
+
+    def is_exact(self) -> bool:
+        """
+        :return: True if the answer was correct without any typos
+        """
+        return not (self.typos or self.wrong or self.missing)
+
+
+class GradeResult:
+    """
+    The grading of all answers to a card.
+    """
+
+    def __init__(self, card_id: int, verdicts: List[Verdict]):
+        """
+        Initialize the GradeResult.
+        :param card_id: the graded cards id
+        :param verdicts: the verdicts in the order of the prompts
+        """
+        self.card_id = card_id
+        self.verdicts = verdicts
+        self.mistakes = sum(verdict.mistakes for verdict in verdicts)
+
+    def get_result(self) -> int:
+        """
+        :return: CORRECT without mistakes, AGAIN for a single mistake, WRONG otherwise
+        """
+        if self.mistakes == 0:
+            return CORRECT
+        elif self.mistakes == 1:
+            return AGAIN
+        return WRONG
+
+
+def get_translations(card: Card) -> Tuple[Dict[Phrase, Set[Phrase]], Dict[Phrase, Set[str]]]:
+    """
+    Collects the latin phrases of a card the user is asked about.
+    :param card: the vocabulary card
+    :return: a tuple (synonyms, translations):
+        synonyms maps latin phrases to their latin synonyms,
+        translations maps the latin phrases in the order they are asked for to their german translations
+    """
+    synonyms = {}  # todo fix synonym recognition
+    translations = {}
+    for phrase1, phrase2 in card.get_translations():
+
+        # switch pairs if pair 1 is a german phrase
+        if phrase1.language == German:
+            phrase1, phrase2 = phrase2, phrase1
+
+        # german-german
+        if phrase1.language == German:
+            continue
+
+        # latin-?
+        elif phrase1.language == Latin:
+
+            # latin-latin == synonym
+            if phrase2.language == Latin:
+
+                # if one of the synonyms is already registered ...
+                for phrase in synonyms:
+                    if phrase1 in synonyms[phrase]:
+                        synonyms[phrase].add(phrase2)
+                    elif phrase2 in synonyms[phrase]:
+                        synonyms[phrase].add(phrase2)
+
+                if phrase1 in synonyms:
+                    synonyms[phrase1].add(phrase2)
+                elif phrase2 in synonyms:
+                    synonyms[phrase2].add(phrase1)
+
+                # or if a translation for one of the phrases already exists, use that phrase as a key
+                elif phrase2 in translations:
+                    synonyms[phrase2] = set()
+                    synonyms[phrase2].add(phrase1)
+
+                else:  # or phrase1 in translations
+                    synonyms[phrase1] = set()
+                    synonyms[phrase1].add(phrase2)
+
+            # latin-german == translation
+            elif phrase2.language == German:
+
+                # if there's a synonym for phrase1 registered already, use that phrase instead
+                for phrase in synonyms:
+                    if phrase1 in synonyms[phrase]:
+                        phrase1 = phrase
+                        break
+
+                if phrase1 not in translations:
+                    translations[phrase1] = set()
+
+                translations[phrase1].add(phrase2.phrase)
+
+            else:
+                raise Exception("Unknown language: {}".format(phrase2.language))
+        else:
+            raise Exception("Unknown language: {}".format(phrase1.language))
+
+    return synonyms, translations
+
+
+def get_prompts(card: Card) -> List[Prompt]:
+    """
+    Returns the questions asked about a card, in the order they are asked.
+    :param card: the vocabulary card
+    :return: a list of Prompts
+    """
+    synonyms, translations = get_translations(card)
+
+    prompts = []
+    last_word = None
+    for phrase in translations:
+
+        if phrase.is_word():
+            text = ""
+
+            # don't show the root_forms again if they were already asked for
+            if last_word is None or last_word.root_forms != phrase.root_forms:
+
+                # show synonyms
+                if phrase in synonyms:
+                    for synonym in synonyms[phrase]:
+                        text += "{} / ".format(synonym)
+
+                # if the phrase is a verb with at least 3 root_forms, ask the user for the root_forms
+                if phrase.is_verb() and match(r"\w+, \w+, .+", phrase.root_forms):
+                    infinitive, *rest = (word.strip(" ") for word in phrase.root_forms.split(","))
+                    prompts.append(Prompt(ROOT_FORMS, phrase, text + infinitive + ", ", {", ".join(rest)}))
+                    text = ""
+
+                # otherwise just show the root_forms
+                else:
+                    text += phrase.root_forms
+
+            last_word = phrase
+            text += (" " if phrase.context else "") + "{}: ".format(phrase.context)
+
+        # phrase is no Word -> WordGroup
+        else:
+            text = phrase.phrase + ": "
+
+        prompts.append(Prompt(TRANSLATIONS, phrase, text, translations[phrase]))
+
+    return prompts
+
+
+def grade(card: Card, answers: List[str], prompts: List[Prompt] = None) -> GradeResult:
+    """
+    Grades the answers to a card.
+    :param card: the vocabulary card
+    :param answers: the answers in the order of the cards prompts
+    :param prompts: the cards prompts, if already known
+    :raises ValueError: when the amount of answers does not match the amount of prompts
+    :return: the GradeResult
+    """
+    if prompts is None:
+        prompts = get_prompts(card)
+    if len(answers) != len(prompts):
+        raise ValueError("{} answers given for {} prompts".format(len(answers), len(prompts)))
+    return GradeResult(card.get_id(), [grade_answer(prompt, answer) for prompt, answer in zip(prompts, answers)])
+
+
+def grade_many(submissions: Iterable[Tuple[Card, List[str]]]) -> Iterator[GradeResult]:
+    """
+    Grades the answers to many cards. The prompts of each card are only generated once.
+    :param submissions: (card, answers) tuples
+    :return: an iterator over the GradeResults in the order of submissions
+    """
+    prompts = {}  # type: Dict[int, List[Prompt]]
+    for card, answers in submissions:
+        if card.get_id() not in prompts:
+            prompts[card.get_id()] = get_prompts(card)
+        yield grade(card, answers, prompts[card.get_id()])
+
+
+def grade_answer(prompt: Prompt, answer: str) -> Verdict:
+    """
+    Grades the answer to a single prompt.
+    :param prompt: the prompt
+    :param answer: the users answer
+    :return: the Verdict
+    """
+    if prompt.kind == ROOT_FORMS:
+        forms = answer.strip(" ")
+        correct = next(iter(prompt.solution))
+        if forms == correct:
+            return Verdict(prompt, answer, [], [], [], 0)
+        elif fuzzy_match(forms, correct):
+            return Verdict(prompt, answer, [(forms, correct)], [], [], 0)
+        return Verdict(prompt, answer, [], [forms], [correct], 1)
+
+    answered = set(word.strip(" ") for word in answer.split(","))
+    answered.discard("")
+
+    # remove correct answers from both sets
+    wrong, missing = answered.difference(prompt.solution), prompt.solution.difference(answered)
+
+    # look for typos
+    typos = []
+    for answer_phrase in sorted(wrong):
+        for correct_phrase in sorted(missing):
+            if fuzzy_match(answer_phrase, correct_phrase):
+                typos.append((answer_phrase, correct_phrase))
+                wrong.remove(answer_phrase)
+                missing.remove(correct_phrase)
+                break
+
+    # a correct phrase containing a comma was split into its parts
+    for correct_phrase in sorted(missing):
+        parts = set(word.strip(" ") for word in correct_phrase.split(","))
+        if len(parts) > 1 and parts <= wrong:
+            missing.remove(correct_phrase)
+            wrong.difference_update(parts)
+
+    return Verdict(prompt, answer, typos, sorted(wrong), sorted(missing), max(len(wrong), len(missing)))
+
+
+def fuzzy_match(string: str, correct: str) -> bool:
+    """
+    Returns True if the string has <= 1 typo in respect to <correct>.
+    A typo is a character too much, a character missing, a wrong character or 2 switched characters.
+    :param string: the string with a typo
+    :param correct: the correct string
+    :return: number of typos < 2
+    """
+    if string == correct or fold(string) == fold(correct):
+        return True
+
+    # skip the common prefix, the typo has to be at its end
+    prefix = 0
+    for char, correct_char in zip(string, correct):
+        if char != correct_char:
+            break
+        prefix += 1
+    string, correct = string[prefix:], correct[prefix:]
+
+    # character too much
+    if len(string) == len(correct) + 1:
+        return string[1:] == correct
+
+    # character missing
+    if len(string) == len(correct) - 1:
+        return string == correct[1:]
+
+    # character wrong or 2 characters switched
+    if len(string) == len(correct):
+        return string[1:] == correct[1:] or (string[:2] == correct[1::-1] and string[2:] == correct[2:])
+
+    return False
@@ -0,0 +1,173 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Parses group expressions like 'adeo-9..adeo-40 & s0|s1 - ratio-aa-2' and evaluates them on sets of card ids,
+bitmaps by default, see data.bitmapIndex.
+Call parse_group_expression to get the expression tree and evaluate to resolve it.
+
+The terms are
+    <group_name>            the cards of a group and its subgroups
+    <group_name>..<name>    the cards of the groups numbered like adeo-9, adeo-10, ..., adeo-40
+    s<shelf>                the used cards on a shelf
+each optionally followed by <prefix to keep only the cards whose sort key is before prefix,
+see CARD_SORT_KEY in data.databaseConstants.
+The operators are | (union), & (intersection) and - (difference), binding in this order.
+Group names may contain dashes, so - has to be surrounded by spaces. Use parentheses to group.
+"""
+
+from data.bitmapIndex import OPERATIONS
+
+from re import compile, match
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+TOKEN = compile(r"\s*(?:([()&|]|-(?=[\s(]))|([\w-]+)(?:\.\.([\w-]+))?(?:<(\w+))?)")
+SHELF_NAME = r"s(\d+)$"
+
+
+class Term:
+    """
+    A group, a range of groups or a shelf in a group expression.
+    """
+
+    def __init__(self, name: str, last: Optional[str] = None, prefix: Optional[str] = None):
+        """
+        Initialize the Term.
+        :param name: the groups name, the first groups name of a range or s<shelf>
+        :param last: the last groups name of a range, None for a single group
+        :param prefix: only cards whose sort key is before prefix are selected, None for all cards
+        """
+        self.name = name
+        self.last = last
+        self.prefix = prefix
+
+    def get_shelf(self) -> Optional[int]:
+        """
+        :return: the shelf if the term is s<shelf>, None otherwise
+        """
+        m = match(SHELF_NAME, self.name)
+        return int(m.group(1)) if m and self.last is None else None
+
+    def get_group_names(self, group_names: List[str]) -> List[str]:
+        """
+        Selects the group names the term stands for.
+        :raises ValueError: if the ends of a range do not differ in their trailing numbers only
+        :param group_names: all existing group names
+        :return: the name of a single group, or the existing group names of a range in ascending order
+        """
+        if self.last is None:
+            return [self.name]
+
+        first, last = match(r"(.*?)(\d+)$", self.name), match(r"(.*?)(\d+)$", self.last)
+        if first is None or last is None or first.group(1) != last.group(1):
+            raise ValueError("{}..{} is no range of numbered groups.".format(self.name, self.last))
+        stem, start, end = first.group(1), int(first.group(2)), int(last.group(2))
+
+        numbers = {}
+        for group_name in group_names:
+            m = match(r"(\d+)$", group_name[len(stem):]) if group_name.startswith(stem) else None
+            if m and start <= int(m.group(1)) <= end:
+                numbers[group_name] = int(m.group(1))
+        return sorted(numbers, key=numbers.get)
+
+    def __str__(self) -> str:
+        """
+        :return: the term as written in an expression
+        """
+        return self.name + (".." + self.last if self.last else "") + ("<" + self.prefix if self.prefix else "")
+
+
+Expression = Union[Term, Tuple[str, "Expression", "Expression"]]  # a Term or (operator, left, right)
+
+
+def parse_group_expression(expression: str) -> Expression:
+    """
+    Parses a group expression.
+    :raises ValueError: if the expression is malformed
+    :param expression: the expression, see the module documentation
+    :return: the expression tree
+    """
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        m = TOKEN.match(expression, position)
+        if m is None or m.end() == position:
+            raise ValueError("Unexpected '{}' in group expression.".format(expression[position:].strip()))
+        tokens.append(m.group(1) or Term(m.group(2), m.group(3), m.group(4)))
+        position = m.end()
+
+    tree, position = parse_operation(tokens, 0, 0)
+    if position < len(tokens):
+        raise ValueError("Unexpected '{}' in group expression.".format(tokens[position]))
+    return tree
+
+
+def parse_operation(tokens: list, position: int, level: int) -> Tuple[Expression, int]:
+    """
+    Parses the operations of one binding level, left to right.
+    :raises ValueError: if the expression is malformed
+    :param tokens: the operators, parentheses and Terms of the expression
+    :param position: the index of the first token to parse
+    :param level: 0 for -, 1 for &, 2 for |, 3 for a single term or a parenthesized expression
+    :return: the expression tree and the index of the first token not parsed
+    """
+    if level == 3:
+        if position == len(tokens):
+            raise ValueError("Group expression ends unexpectedly.")
+        token = tokens[position]
+        if isinstance(token, Term):
+            return token, position + 1
+        if token == "(":
+            tree, position = parse_operation(tokens, position + 1, 0)
+            if position == len(tokens) or tokens[position] != ")":
+                raise ValueError("Missing ')' in group expression.")
+            return tree, position + 1
+        raise ValueError("Unexpected '{}' in group expression.".format(token))
+
+    operator = "-&|"[level]
+    tree, position = parse_operation(tokens, position, level + 1)
+    while position < len(tokens) and tokens[position] == operator:
+        right, position = parse_operation(tokens, position + 1, level + 1)
+        tree = (operator, tree, right)
+    return tree, position
+
+
+def get_terms(tree: Expression) -> List[Term]:
+    """
+    Collects the terms of an expression.
+    :param tree: the expression tree
+    :return: the Terms from left to right
+    """
+    if isinstance(tree, Term):
+        return [tree]
+    return get_terms(tree[1]) + get_terms(tree[2])
+
+
+def evaluate(tree: Expression, resolve: Callable[[Term], Any],
+             operations: Dict[str, Callable[[Any, Any], Any]] = OPERATIONS) -> Any:
+    """
+    Evaluates an expression with set operations.
+    :param tree: the expression tree
+    :param resolve: returns the card ids of a Term, as bitmap by default
+    :param operations: the operations for |, & and -, by default those on bitmaps
+    :return: the selected card ids
+    """
+    if isinstance(tree, Term):
+        return resolve(tree)
+    operator, left, right = tree
+    return operations[operator](evaluate(left, resolve, operations), evaluate(right, resolve, operations))
@@ -0,0 +1,109 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Provides an inverted index over the phrases of one language.
+Instantiate PhraseIndex and call build to load it from the database.
+"""
+
+from language import phrase_classes
+
+from typing import Dict, Iterable, List, Set, Tuple
+
+REQUIRED_WEIGHT = 1.0
+OPTIONAL_WEIGHT = 0.5
+
+
+class PhraseIndex:
+    """
+    Maps normalized words to the phrases containing them and phrases to the cards they are on.
+    """
+
+    def __init__(self, language: str):
+        """
+        Initialize an empty PhraseIndex.
+        :param language: the language of the indexed phrases
+        """
+        self.language = language
+        self.phrase_class = phrase_classes[language]
+
+        self.terms = {}  # type: Dict[str, Dict[int, float]]  # term -> phrase_id -> weight
+        self.phrase_cards = {}  # type: Dict[int, Set[int]]  # phrase_id -> card_ids
+        self.phrase_weights = {}  # type: Dict[int, float]  # phrase_id -> sum of its term weights
+
+    def build(self, rows: Iterable[Tuple[int, str, int]]):
+        """
+        Fills the index.
+        :param rows: (phrase_id, description, card_id) tuples as returned by DatabaseManager.get_phrase_cards
+        """
+        for phrase_id, description, card_id in rows:
+            if phrase_id not in self.phrase_cards:
+                self.add_phrase(phrase_id, description)
+            self.phrase_cards[phrase_id].add(card_id)
+
+    def add_phrase(self, phrase_id: int, description: str):
+        """
+        Adds a phrase to the index.
+        :param phrase_id: the phrases id
+        :param description: the phrases description
+        """
+        self.phrase_cards[phrase_id] = set()
+
+        phrase_weight = 0
+        for terms, optional in self.phrase_class.get_search_terms(description):
+            weight = OPTIONAL_WEIGHT if optional else REQUIRED_WEIGHT
+            phrase_weight += weight
+            for term in terms:
+                postings = self.terms.setdefault(term, {})
+                postings[phrase_id] = max(weight, postings.get(phrase_id, 0))
+        self.phrase_weights[phrase_id] = phrase_weight or REQUIRED_WEIGHT
+
+    def find_phrases(self, string: str) -> List[Tuple[int, float]]:
+        """
+        Finds all phrases containing at least one of the words in string.
+        :param string: the search string
+        :return: a list of (phrase_id, score) tuples, best matches first
+        """
+        # one probe per variant of each query word
+        scores = {}
+        matched = {}
+        for terms, _ in self.phrase_class.get_search_terms(string):
+            word_scores = {}
+            for term in terms:
+                for phrase_id, weight in self.terms.get(term, {}).items():
+                    word_scores[phrase_id] = max(weight, word_scores.get(phrase_id, 0))
+
+            for phrase_id, weight in word_scores.items():
+                scores[phrase_id] = scores.get(phrase_id, 0) + weight
+                matched[phrase_id] = matched.get(phrase_id, 0) + 1
+
+        # prefer phrases matching more query words, then phrases consisting of little more than the query
+        return sorted(((phrase_id, matched[phrase_id] + scores[phrase_id] / self.phrase_weights[phrase_id])
+                       for phrase_id in scores), key=lambda item: (-item[1], item[0]))
+
+    def find_cards(self, string: str) -> List[Tuple[int, float]]:
+        """
+        Finds all cards with a phrase containing at least one of the words in string.
+        :param string: the search string
+        :return: a list of (card_id, score) tuples, best matches first
+        """
+        scores = {}
+        for phrase_id, score in self.find_phrases(string):
+            for card_id in self.phrase_cards[phrase_id]:
+                if score > scores.get(card_id, 0):
+                    scores[card_id] = score
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
@@ -0,0 +1,88 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Decides which of the due cards are questioned in one session.
+Call get_portion_policy with a spec like 'size=50 s0=20 fair=1' to get a PortionPolicy,
+UserDatabaseManager.get_due_portion selects the cards accordingly.
+"""
+
+from typing import Dict
+
+DEFAULT_SIZE = 100
+DEFAULT_PRIORITY_SHELF = 2
+
+
+class PortionPolicy:
+    """
+    Selects at most size due cards: the cards on shelves up to priority_shelf first, then the longest overdue.
+    A quota limits the amount of cards from a single shelf. With fair, the cards are taken from the groups in turns.
+    """
+
+    def __init__(self, size: int = DEFAULT_SIZE, priority_shelf: int = DEFAULT_PRIORITY_SHELF, fair: bool = False,
+                 quotas: Dict[int, int] = None):
+        """
+        Initialize the PortionPolicy.
+        :param size: the maximum amount of cards in a portion
+        :param priority_shelf: cards up to this shelf are taken first, -1 to only go by due_date
+        :param fair: True to take the cards from the groups in turns
+        :param quotas: the maximum amount of cards per shelf, shelves without quota are not limited
+        """
+        self.size = size
+        self.priority_shelf = priority_shelf
+        self.fair = fair
+        self.quotas = dict(quotas or {})  # type: Dict[int, int]
+
+    def get_spec(self) -> str:
+        """
+        Returns the spec get_portion_policy creates this policy from.
+        :return: the parameters as <name>=<value> separated by spaces
+        """
+        return " ".join(["size={}".format(self.size), "priority_shelf={}".format(self.priority_shelf),
+                         "fair={}".format(int(self.fair))]
+                        + ["s{}={}".format(shelf, quota) for shelf, quota in sorted(self.quotas.items())])
+
+
+def get_portion_policy(spec: str = "") -> PortionPolicy:
+    """
+    Returns the portion policy described by spec.
+    :raises ValueError: if a parameter is unknown or its value is no non-negative integer
+    :param spec: parameters like 'size=50 priority_shelf=1 fair=1 s0=20 s1=20', unset ones keep their defaults
+    :return: the PortionPolicy
+    """
+    policy = PortionPolicy()
+    for parameter in spec.split():
+        name, _, value = parameter.partition("=")
+        try:
+            value = int(value)
+        except ValueError:
+            raise ValueError("Parameter {} needs a number: {}=<number>".format(name, name))
+        if value < 0 and name != "priority_shelf":
+            raise ValueError("Parameter {} can not be negative.".format(name))
+
+        if name == "size":
+            policy.size = value
+        elif name == "priority_shelf":
+            policy.priority_shelf = value
+        elif name == "fair":
+            policy.fair = bool(value)
+        elif name.startswith("s") and name[1:].isdigit():
+            policy.quotas[int(name[1:])] = value
+        else:
+            raise ValueError("Unknown parameter {}. Use size, priority_shelf, fair or s<shelf>.".format(name))
+    return policy
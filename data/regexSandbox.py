@@ -0,0 +1,106 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Runs regular expression searches in a worker process with a time budget.
+A user-typed regular expression can backtrack catastrophically, which would block the whole program.
+"""
+
+from re import compile
+from time import monotonic
+from typing import Iterator, List, Tuple
+
+DEFAULT_TIME_BUDGET = 3.0  # seconds
+BATCH_SIZE = 64
+FLUSH_INTERVAL = 0.05  # seconds
+
+
+class RegexTimeout(RuntimeError):
+    """
+    Raised when a regular expression search exceeds its time budget.
+    """
+
+
+def search(pattern: str, texts: List[Tuple[int, str]], time_budget: float = DEFAULT_TIME_BUDGET) -> Iterator[int]:
+    """
+    Searches texts for the regular expression in a worker process and yields the ids of matching texts
+    as soon as the worker reports them.
+    The worker is killed when the time budget is exceeded, the generator is closed or on KeyboardInterrupt.
+    :raises re.error: if pattern is no valid regular expression
+    :raises RegexTimeout: if the time budget is exceeded
+    :param pattern: the regular expression
+    :param texts: (id, text) tuples to be searched
+    :param time_budget: the maximum search time in seconds
+    :return: an iterator over the ids of all matching texts in the order of texts
+    """
+    compile(pattern)  # raise syntax errors here instead of in the worker
+    if not texts:
+        return
+
+    from multiprocessing import get_context  # slow to import and rarely needed
+    context = get_context()
+    receiver, sender = context.Pipe(duplex=False)
+    worker = context.Process(target=search_worker, args=(pattern, texts, sender), daemon=True)
+    deadline = monotonic() + time_budget
+    worker.start()
+    sender.close()
+    try:
+        while True:
+            remaining = deadline - monotonic()
+            if remaining <= 0 or not receiver.poll(remaining):
+                raise RegexTimeout("Search for '{}' took longer than {} seconds.".format(pattern, time_budget))
+            try:
+                batch = receiver.recv()
+            except EOFError:  # the worker died
+                return
+            if batch is None:
+                return
+            yield from batch
+    finally:
+        receiver.close()
+        if worker.is_alive():
+            worker.terminate()
+        worker.join()
+
+
+def search_worker(pattern: str, texts: List[Tuple[int, str]], sender):
+    """
+    Searches texts for the regular expression and sends the ids of matching texts in batches.
+    Runs in the worker process, the end of the search is signalled by sending None.
+    :param pattern: the regular expression
+    :param texts: (id, text) tuples to be searched
+    :param sender: the Connection to send the batches through
+    """
+    try:
+        reg = compile(pattern)
+        batch = []
+        last_flush = monotonic()
+        for text_id, text in texts:
+            if reg.search(text):
+                batch.append(text_id)
+            if batch and (len(batch) >= BATCH_SIZE or monotonic() - last_flush > FLUSH_INTERVAL):
+                sender.send(batch)
+                batch = []
+                last_flush = monotonic()
+        if batch:
+            sender.send(batch)
+        sender.send(None)
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+    finally:
+        sender.close()
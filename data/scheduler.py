@@ -0,0 +1,285 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Decides on which shelf a card lands and when it is due again after it was questioned.
+Leitner is the default, SM2 and FSRS compute their intervals from the review history of a card.
+Call get_scheduler with a spec like 'sm2 initial_ease=2.3' to get a Scheduler.
+"""
+
+from data.userDatabaseManager import Card, Review
+
+from datetime import date, timedelta
+from math import exp, log2
+from typing import Dict, List, Optional, Sequence, Tuple
+
+WRONG, AGAIN, CORRECT = range(3)
+
+MIN_SHELF = 0
+DEFAULT_SHELF = 1
+MIN_AGAIN_SHELF = 3
+MAX_SHELF = 7
+
+State = tuple  # the state of a card, beginning with its shelf
+
+
+class Scheduler:
+    """
+    Base class of the schedulers. A scheduler moves the state of a card through its reviews.
+    """
+    name = None  # type: str
+    defaults = {}  # type: Dict[str, float]  # the tunable parameters and their default values
+    uses_history = True  # False if schedule does not need the reviews of a card
+
+    def __init__(self, **parameters: float):
+        """
+        Initialize the Scheduler.
+        :raises ValueError: if a parameter is unknown
+        :param parameters: values for the tunable parameters, the defaults are used for the others
+        """
+        unknown = set(parameters) - set(self.defaults)
+        if unknown:
+            raise ValueError("Unknown parameter for {}: {}".format(self.name, ", ".join(sorted(unknown))))
+        self.parameters = dict(self.defaults, **parameters)
+
+    def get_spec(self) -> str:
+        """
+        Returns the spec get_scheduler creates this scheduler from.
+        :return: the name followed by the parameters differing from the defaults
+        """
+        return " ".join([self.name] + ["{}={}".format(name, value) for name, value in sorted(self.parameters.items())
+                                       if value != self.defaults[name]])
+
+    def initial_state(self, shelf: int) -> State:
+        """
+        Returns the state of a card on a shelf before its first recorded review.
+        :param shelf: the shelf
+        :return: the state
+        """
+        raise NotImplementedError
+
+    def review(self, state: State, outcome: int, elapsed_days: Optional[int]) -> Tuple[State, int]:
+        """
+        Moves a card according to the outcome of a review.
+        :param state: the state of the card
+        :param outcome: WRONG, AGAIN or CORRECT
+        :param elapsed_days: the days since the last review, None if unknown
+        :return: the new state and the amount of days until the card is due
+        """
+        raise NotImplementedError
+
+    def replay(self, shelf: int, history: List[Review]) -> Tuple[State, int, Optional[date]]:
+        """
+        Replays the reviews of a card.
+        :param shelf: the current shelf of the card, used if there are no reviews
+        :param history: the reviews of the card, oldest first
+        :return: the state, the days until due after the last review and the date of the last review or None
+        """
+        state = self.initial_state(history[0][1] if history else shelf)
+        interval, last_date = 0, None
+        for review_date, _, outcome in history:
+            review_date = date.fromisoformat(review_date)
+            state, interval = self.review(state, outcome, get_elapsed_days(last_date, review_date))
+            last_date = review_date
+        return state, interval, last_date
+
+    def schedule(self, shelf: int, outcome: int, history: List[Review]) -> Tuple[int, int]:
+        """
+        Schedules a card that was just questioned.
+        :param shelf: the current shelf of the card
+        :param outcome: WRONG, AGAIN or CORRECT
+        :param history: the earlier reviews of the card, oldest first, may be empty if not uses_history
+        :return: the new shelf and the amount of days until the card is due
+        """
+        state, _, last_date = self.replay(shelf, history)
+        state, interval = self.review(state, outcome, get_elapsed_days(last_date, date.today()))
+        return state[0], interval
+
+    def reschedule_many(self, cards: Sequence[Card], histories: Dict[int, List[Review]]) -> List[Card]:
+        """
+        Recomputes shelf and due_date of many cards at once from their review histories,
+        e.g. after switching the scheduler or changing its parameters.
+        :param cards: the cards
+        :param histories: the reviews of the cards by card_id, cards without reviews are left as they are
+        :return: the rescheduled cards in the order of cards
+        """
+        rescheduled = []
+        for card_id, shelf, due_date in cards:
+            history = histories.get(card_id)
+            if history:
+                state, interval, last_date = self.replay(shelf, history)
+                shelf, due_date = state[0], (last_date + timedelta(days=interval)).isoformat()
+            rescheduled.append((card_id, shelf, due_date))
+        return rescheduled
+
+
+class Leitner(Scheduler):
+    """
+    The default scheduler. A correct card moves up a shelf and is due again in 2**shelf - 1 days,
+    a wrong card starts over on the lowest shelf.
+    """
+    name = "leitner"
+    uses_history = False
+
+    def initial_state(self, shelf: int) -> State:
+        return shelf,
+
+    def review(self, state: State, outcome: int, elapsed_days: Optional[int]) -> Tuple[State, int]:
+        shelf, = state
+        if outcome == CORRECT:
+            shelf = shelf + 1 if shelf < MAX_SHELF else MAX_SHELF
+            return (shelf,), 2 ** shelf - 1
+        if outcome == AGAIN and shelf >= MIN_AGAIN_SHELF:
+            return (DEFAULT_SHELF + 1 if shelf >= MIN_AGAIN_SHELF + 1 else DEFAULT_SHELF,), 0
+        return (MIN_SHELF,), 0
+
+
+class SM2(Scheduler):
+    """
+    The SuperMemo 2 algorithm. Each card has an ease factor its interval grows with,
+    CORRECT counts as quality 4, AGAIN as 3 and WRONG as 1.
+    """
+    name = "sm2"
+    defaults = {"initial_ease": 2.5, "minimum_ease": 1.3}
+
+    QUALITIES = {WRONG: 1, AGAIN: 3, CORRECT: 4}
+
+    def initial_state(self, shelf: int) -> State:
+        # shelf, repetitions, ease, interval
+        return shelf, shelf, self.parameters["initial_ease"], 2 ** shelf - 1
+
+    def review(self, state: State, outcome: int, elapsed_days: Optional[int]) -> Tuple[State, int]:
+        _, repetitions, ease, interval = state
+        quality = self.QUALITIES[outcome]
+        if quality < 3:
+            return (MIN_SHELF, 0, ease, 1), 1
+
+        if repetitions == 0:
+            interval = 1
+        elif repetitions == 1:
+            interval = 6
+        else:
+            interval = round(interval * ease)
+        ease = max(self.parameters["minimum_ease"], ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        return (get_shelf(interval), repetitions + 1, ease, interval), interval
+
+
+class FSRS(Scheduler):
+    """
+    A scheduler following the Free Spaced Repetition Scheduler (FSRS 4.5) with its default weights.
+    Each card has a stability, the days after which it is remembered with a probability of 90%,
+    and a difficulty. The interval is chosen so that a card is due when it is remembered with the
+    probability retention. WRONG counts as 'again', AGAIN as 'hard' and CORRECT as 'good'.
+    """
+    name = "fsrs"
+    defaults = {"retention": 0.9, "maximum_interval": 36500}
+
+    WEIGHTS = (0.4872, 1.4003, 3.7145, 13.8206, 5.1618, 1.2298, 0.8975, 0.031, 1.6474, 0.1367, 1.0461,
+               2.1072, 0.0793, 0.3246, 1.587, 0.2272, 2.8755)
+    RATINGS = {WRONG: 1, AGAIN: 2, CORRECT: 3}
+
+    def initial_state(self, shelf: int) -> State:
+        # shelf, stability, difficulty, interval; a card without stability has not been learned yet
+        if shelf == MIN_SHELF:
+            return shelf, None, None, 0
+        return shelf, float(2 ** shelf - 1), self.initial_difficulty(3), 2 ** shelf - 1
+
+    def initial_difficulty(self, rating: int) -> float:
+        """
+        Returns the difficulty of a card after its first review.
+        :param rating: the rating of the review
+        :return: the difficulty between 1 and 10
+        """
+        w = self.WEIGHTS
+        return min(10.0, max(1.0, w[4] - (rating - 3) * w[5]))
+
+    def review(self, state: State, outcome: int, elapsed_days: Optional[int]) -> Tuple[State, int]:
+        _, stability, difficulty, interval = state
+        w = self.WEIGHTS
+        rating = self.RATINGS[outcome]
+
+        if stability is None:
+            stability, difficulty = w[rating - 1], self.initial_difficulty(rating)
+        else:
+            # the probability the card was remembered when it was reviewed
+            if elapsed_days is None:
+                recall = self.parameters["retention"]
+            else:
+                recall = (1 + elapsed_days / (9 * stability)) ** -1
+
+            difficulty = difficulty - w[6] * (rating - 3)
+            difficulty = min(10.0, max(1.0, w[7] * self.initial_difficulty(3) + (1 - w[7]) * difficulty))
+            if rating == 1:
+                stability = w[11] * difficulty ** -w[12] * ((stability + 1) ** w[13] - 1) * exp(w[14] * (1 - recall))
+            else:
+                stability *= 1 + exp(w[8]) * (11 - difficulty) * stability ** -w[9] \
+                    * (exp(w[10] * (1 - recall)) - 1) * (w[15] if rating == 2 else 1)
+
+        interval = round(9 * stability * (1 / self.parameters["retention"] - 1))
+        interval = int(min(self.parameters["maximum_interval"], max(1, interval)))
+        shelf = MIN_SHELF if rating == 1 else get_shelf(interval)
+        return (shelf, stability, difficulty, interval), interval
+
+
+def get_elapsed_days(last_date: Optional[date], review_date: date) -> Optional[int]:
+    """
+    Returns the days between two reviews.
+    :param last_date: the date of the earlier review, None if there was none
+    :param review_date: the date of the later review
+    :return: the amount of days, None if last_date is None
+    """
+    if last_date is None:
+        return None
+    return max(0, (review_date - last_date).days)
+
+
+def get_shelf(interval: int) -> int:
+    """
+    Returns the shelf a Leitner scheduled card with a similar interval would be on.
+    :param interval: the interval in days
+    :return: the shelf between DEFAULT_SHELF and MAX_SHELF
+    """
+    return min(MAX_SHELF, max(DEFAULT_SHELF, int(log2(interval + 1))))
+
+
+SCHEDULERS = {scheduler.name: scheduler for scheduler in (Leitner, SM2, FSRS)}
+DEFAULT_SCHEDULER = Leitner.name
+
+loaded_schedulers = {}  # type: Dict[str, Scheduler]
+
+
+def get_scheduler(spec: str = DEFAULT_SCHEDULER) -> Scheduler:
+    """
+    Returns the scheduler described by spec.
+    :raises ValueError: if the scheduler or one of its parameters is unknown or a value is no number
+    :param spec: the schedulers name followed by parameters, e.g. 'fsrs retention=0.85'
+    :return: the Scheduler
+    """
+    if spec not in loaded_schedulers:
+        name, *parameters = spec.split()
+        if name not in SCHEDULERS:
+            raise ValueError("Unknown scheduler {}. Choose one of {}.".format(name, ", ".join(sorted(SCHEDULERS))))
+        values = {}
+        for parameter in parameters:
+            key, _, value = parameter.partition("=")
+            try:
+                values[key] = float(value)
+            except ValueError:
+                raise ValueError("Parameter {} needs a number: {}=<number>".format(key, key))
+        loaded_schedulers[spec] = SCHEDULERS[name](**values)
+    return loaded_schedulers[spec]
@@ -0,0 +1,484 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Stores the cards of all users in a single database, keyed by (user_id, card_id).
+SharedUserDatabaseManager offers the same methods as UserDatabaseManager for one user of the shared database
+and inherits its joined queries.
+Import existing user databases with migrate_user_databases.py.
+"""
+
+from data.databaseOpenHelper import *
+from data.userDatabaseConstants import *
+from data.userDatabaseManager import Card, CardAlreadyUsedError, CardNotUsedError, Review, UserDatabaseManager
+from os.path import abspath, join
+from time import strftime
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+CARD_COLUMNS = ",".join((CARD_ID, USED_CARD_SHELF, USED_CARD_DUE_DATE))
+REVIEW_COLUMNS = ",".join((REVIEW_DATE, REVIEW_SHELF, REVIEW_OUTCOME))
+
+
+class SharedUserDatabaseManager(UserDatabaseManager):
+    """
+    Responsible for all database interactions concerning the data of one user in the shared user database.
+    """
+
+    def __init__(self, user_name: str, check_schema: bool = True, directory: str = ".",
+                 catalog: str = CATALOG_DATABASE):
+        """
+        Initializes the SharedUserDatabaseManager to use the database <directory>/users.sqlite3.
+        The user is added to the database if necessary.
+        :param user_name: the user_name
+        :param check_schema: False to skip creating the tables, if they are known to exist
+        :param directory: the directory containing the shared database
+        :param catalog: the path of the card database used by the joined queries
+        """
+        DatabaseOpenHelper.__init__(self, join(directory, SHARED_DATABASE), check_schema)
+        self.user_name = user_name
+        self.user_id = self.add_user(user_name)
+        self.catalog = abspath(catalog)
+        self.due_histogram = None
+        self.due_queue = None
+        self.shelf_bitmaps = None
+        self.used_card_table = TABLE_USER_CARD
+        self.used_card_condition = TABLE_USER_CARD + "." + USER_ID + "=" + str(self.user_id)
+        self.used_cards = "(SELECT " + CARD_COLUMNS + " FROM " + TABLE_USER_CARD \
+                          + " WHERE " + self.used_card_condition + ")"
+        self.hot_cards = self.used_cards
+
+    def create_tables(self):
+        """
+        Creates the database tables if not present.
+        """
+        db = self.get_connection()
+        cur = db.cursor()
+        cur.execute(CREATE_TABLE_USER)
+        cur.execute(CREATE_TABLE_USER_CARD)
+        cur.execute(CREATE_INDEX_USER_CARD_DUE_DATE)
+        cur.execute(CREATE_TABLE_USER_REVIEW)
+        cur.execute(CREATE_INDEX_USER_REVIEW_CARD_ID)
+        cur.execute(CREATE_TABLE_USER_SETTING)
+        db.commit()
+        db.close()
+
+    @staticmethod
+    def get_user_names(db_name: str) -> List[str]:
+        """
+        Returns the names of all users in a shared database.
+        :param db_name: the path of the shared database
+        :return: a list of names
+        """
+        db = connect(db_name)
+        try:
+            return [row[0] for row in db.execute("SELECT " + USER_NAME + " FROM " + TABLE_USER + ";")]
+        finally:
+            db.close()
+
+    #######
+    # add entries to the database
+
+    def add_user(self, user_name: str, cursor: Cursor = None) -> int:
+        """
+        Adds a user to the database if not present.
+        :param user_name: the users name
+        :param cursor: the cursor to be used to access the database.
+        :return: the users id
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            user_id = self.add_user(user_name, cur)
+            db.commit()
+            db.close()
+            return user_id
+
+        # a cursor was passed on
+        else:
+            cursor.execute("INSERT OR IGNORE INTO " + TABLE_USER + "(" + USER_NAME + ") VALUES (?);", (user_name,))
+            return cursor.execute("SELECT " + USER_ID + " FROM " + TABLE_USER + " WHERE " + USER_NAME + "=?;",
+                                  (user_name,)).fetchone()[0]
+
+    def insert_card(self, card_id: int, shelf: int, due_date: str, cursor: Cursor) -> str:
+        """
+        Inserts a card into the database, without touching the caches.
+        :raises CardAlreadyUsedError: if the card already exists
+        :param card_id: the cards id
+        :param shelf: the cards shelf
+        :param due_date: the cards due date
+        :param cursor: the cursor to be used to access the database
+        :return: the cards due date
+        """
+        if self.card_is_used(card_id, cursor):
+            raise CardAlreadyUsedError("Card {} is already used by user {}.".format(card_id, self.user_name))
+
+        if due_date == "today":
+            due_date = strftime("%Y-%m-%d")
+
+        cursor.execute("INSERT INTO " + TABLE_USER_CARD + "(" + USER_ID + "," + CARD_COLUMNS
+                       + ") VALUES (?,?,?,?);", (self.user_id, card_id, shelf, due_date))
+        return due_date
+
+    def import_cards(self, cards: Iterable[Card], cursor: Cursor = None):
+        """
+        Adds cards to the database, replacing the cards already present.
+        :param cards: 3-tuples (id, shelf, due_date) representing the cards
+        :param cursor: the cursor to be used to access the database.
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            self.import_cards(cards, cur)
+            db.commit()
+            db.close()
+
+        # a cursor was passed on
+        else:
+            cursor.executemany("INSERT OR REPLACE INTO " + TABLE_USER_CARD + "(" + USER_ID + "," + CARD_COLUMNS
+                               + ") VALUES (?,?,?,?);", ((self.user_id,) + tuple(card) for card in cards))
+            self.due_histogram = self.due_queue = self.shelf_bitmaps = None
+
+    #######
+    # look for entries in the database
+
+    def card_is_used(self, card_id: int, cursor: Cursor = None) -> bool:
+        """
+        Checks whether a card_id exists.
+        :param card_id: the card_id
+        :param cursor: the cursor to be used to access the database
+        :return: True/False
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            presence = self.card_is_used(card_id, cur)
+            db.close()
+            return presence
+
+        # a cursor was passed on
+        else:
+            return cursor.execute("SELECT 1 FROM " + TABLE_USER_CARD + " WHERE " + USER_ID + "=? AND " + CARD_ID
+                                  + "=?;", (self.user_id, card_id)).fetchone() is not None
+
+    #######
+    # retrieve entries from the database
+
+    def get_card(self, card_id: int, cursor: Cursor = None) -> Card:
+        """
+        Loads a card from the database.
+        :param card_id: the card_id
+        :param cursor: the cursor to be used to access the database
+        :return: the cards id, its shelf and its due_date in format '%Y-%m-%d'
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            card = self.get_card(card_id, cur)
+            db.close()
+            return card
+
+        # a cursor was passed on
+        else:
+            card = cursor.execute("SELECT " + CARD_COLUMNS + " FROM " + TABLE_USER_CARD + " WHERE " + USER_ID
+                                  + "=? AND " + CARD_ID + "=?;", (self.user_id, card_id)).fetchone()
+            if card is None:
+                raise CardNotUsedError("Card {} is not used by user {}.".format(card_id, self.user_name))
+            return card
+
+    def get_cards(self, card_ids: List[int], cursor: Cursor = None) -> List[Card]:
+        """
+        Loads those of several cards from the database that are used.
+        :param card_ids: the card_ids
+        :param cursor: the cursor to be used to access the database
+        :return: a list of 3-tuples representing the used cards (id, shelf, due_date)
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            cards = self.get_cards(card_ids, cur)
+            db.close()
+            return cards
+
+        # a cursor was passed on
+        else:
+            return cursor.execute("SELECT " + CARD_COLUMNS + " FROM " + TABLE_USER_CARD + " WHERE " + USER_ID
+                                  + "=? AND " + CARD_ID + " IN (" + ",".join(map(str, card_ids)) + ");",
+                                  (self.user_id,)).fetchall()
+
+    def get_all_cards(self, cursor: Cursor = None) -> List[Card]:
+        """
+        Fetches all cards of the user from the database.
+        :param cursor: the cursor to be used to access the database.
+        :return: a list of 3-tuples representing the cards (id, shelf, due_date)
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            cards = self.get_all_cards(cur)
+            db.close()
+            return cards
+
+        # a cursor was passed on
+        else:
+            return cursor.execute("SELECT " + CARD_COLUMNS + " FROM " + TABLE_USER_CARD + " WHERE " + USER_ID
+                                  + "=?;", (self.user_id,)).fetchall()
+
+    def get_due_cards(self, due_date: str = "today", cursor: Cursor = None) -> List[Card]:
+        """
+        Fetches all due cards from the database.
+        :param due_date: a date in format '%Y-%m-%d' or 'today'
+        :param cursor: the cursor to be used to access the database.
+        :return: a list of 3-tuples representing the cards (id, shelf, due_date)
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            cards = self.get_due_cards(due_date, cur)
+            db.close()
+            return cards
+
+        # a cursor was passed on
+        else:
+            if due_date == "today":
+                due_date = strftime('%Y-%m-%d')
+
+            # uses the index on (user_id, due_date)
+            return cursor.execute("SELECT " + CARD_COLUMNS + " FROM " + TABLE_USER_CARD + " WHERE " + USER_ID
+                                  + "=? AND " + USED_CARD_DUE_DATE + "<=?;", (self.user_id, due_date)).fetchall()
+
+    def get_cards_on_shelf(self, shelf: int, cursor: Cursor = None) -> List[Card]:
+        """
+        Fetches the all cards on a shelf from the database.
+        :param shelf: the shelf
+        :param cursor: the cursor to be used to access the database.
+        :return: a list of 3-tuples representing the cards (id, shelf, due_date)
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            cards = self.get_cards_on_shelf(shelf, cur)
+            db.close()
+            return cards
+
+        # a cursor was passed on
+        else:
+            return cursor.execute("SELECT " + CARD_COLUMNS + " FROM " + TABLE_USER_CARD + " WHERE " + USER_ID
+                                  + "=? AND " + USED_CARD_SHELF + "=?;", (self.user_id, shelf)).fetchall()
+
+    #######
+    # update the entries in the database
+
+    def write_card(self, card: Card, review: Optional[Tuple[int, int]], cursor: Cursor) -> str:
+        """
+        Writes the new values of a card and its review to the database, without touching the caches.
+        :raises CardNotUsedError: if the card is not used
+        :param card: a 3-tuple (id, shelf, due_date) representing the card
+        :param review: (shelf before the review, outcome) to add a review of today to the cards history
+        :param cursor: the cursor to be used to access the database
+        :return: the cards due date before the update
+        """
+        card_id, shelf, due_date = card
+
+        old = cursor.execute("SELECT " + USED_CARD_DUE_DATE + " FROM " + TABLE_USER_CARD + " WHERE "
+                             + USER_ID + "=? AND " + CARD_ID + "=?;", (self.user_id, card_id)).fetchone()
+        if old is None:
+            raise CardNotUsedError("Card {} is not used by user {}.".format(card_id, self.user_name))
+
+        cursor.execute("UPDATE " + TABLE_USER_CARD + " SET " + USED_CARD_SHELF + "=?, " + USED_CARD_DUE_DATE
+                       + "=? WHERE " + USER_ID + "=? AND " + CARD_ID + "=?;",
+                       (shelf, due_date, self.user_id, card_id))
+        if review is not None:
+            cursor.execute("INSERT INTO " + TABLE_USER_REVIEW + "(" + USER_ID + "," + CARD_ID + ","
+                           + REVIEW_COLUMNS + ") VALUES (?,?,?,?,?);",
+                           (self.user_id, card_id, strftime("%Y-%m-%d")) + tuple(review))
+        return old[0]
+
+    def update_cards(self, cards: List[Card], cursor: Cursor = None):
+        """
+        Updates many cards in the database at once. Cards that are not used are ignored.
+        :param cards: 3-tuples (id, shelf, due_date) representing the cards
+        :param cursor: the cursor to be used to access the database
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            self.update_cards(cards, cur)
+            db.commit()
+            db.close()
+
+        # a cursor was passed on
+        else:
+            cursor.executemany("UPDATE " + TABLE_USER_CARD + " SET " + USED_CARD_SHELF + "=?, " + USED_CARD_DUE_DATE
+                               + "=? WHERE " + USER_ID + "=? AND " + CARD_ID + "=?;",
+                               ((shelf, due_date, self.user_id, card_id) for card_id, shelf, due_date in cards))
+            self.due_histogram = self.due_queue = self.shelf_bitmaps = None
+
+    #######
+    # hot and cold cards, the index on (user_id, due_date) keeps the due queries from reading the cold cards
+
+    def rotate_cold_cards(self, due_date: str = "today", cursor: Cursor = None):
+        """
+        Does nothing, the shared database keeps all cards in user_card.
+        """
+
+    def promote_cold_cards(self, condition: str, parameters: tuple, cursor: Cursor) -> int:
+        """
+        Does nothing, the shared database keeps all cards in user_card.
+        :return: 0
+        """
+        return 0
+
+    def promote_all_cold_cards(self, cursor: Cursor):
+        """
+        Does nothing, the shared database keeps all cards in user_card.
+        """
+
+    #######
+    # review history and settings
+
+    def import_reviews(self, histories: Dict[int, List[Review]], cursor: Cursor = None):
+        """
+        Replaces the reviews of the user with the given ones.
+        :param histories: the reviews by card_id as returned by get_all_reviews
+        :param cursor: the cursor to be used to access the database
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            self.import_reviews(histories, cur)
+            db.commit()
+            db.close()
+
+        # a cursor was passed on
+        else:
+            cursor.execute("DELETE FROM " + TABLE_USER_REVIEW + " WHERE " + USER_ID + "=?;", (self.user_id,))
+            cursor.executemany("INSERT INTO " + TABLE_USER_REVIEW + "(" + USER_ID + "," + CARD_ID + ","
+                               + REVIEW_COLUMNS + ") VALUES (?,?,?,?,?);",
+                               ((self.user_id, card_id) + tuple(review)
+                                for card_id, reviews in histories.items() for review in reviews))
+
+    def get_reviews(self, card_id: int, cursor: Cursor = None) -> List[Review]:
+        """
+        Fetches the reviews of a card.
+        :param card_id: the cards id
+        :param cursor: the cursor to be used to access the database
+        :return: a list of 3-tuples (review_date, shelf before the review, outcome), oldest first
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            reviews = self.get_reviews(card_id, cur)
+            db.close()
+            return reviews
+
+        # a cursor was passed on
+        else:
+            return cursor.execute("SELECT " + REVIEW_COLUMNS + " FROM " + TABLE_USER_REVIEW + " WHERE " + USER_ID
+                                  + "=? AND " + CARD_ID + "=? ORDER BY " + REVIEW_ID + ";",
+                                  (self.user_id, card_id)).fetchall()
+
+    def get_all_reviews(self, cursor: Cursor = None) -> Dict[int, List[Review]]:
+        """
+        Fetches the reviews of all cards.
+        :param cursor: the cursor to be used to access the database
+        :return: a dict mapping card_ids to lists of reviews as returned by get_reviews
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            reviews = self.get_all_reviews(cur)
+            db.close()
+            return reviews
+
+        # a cursor was passed on
+        else:
+            reviews = {}
+            for card_id, *review in cursor.execute("SELECT " + CARD_ID + "," + REVIEW_COLUMNS + " FROM "
+                                                   + TABLE_USER_REVIEW + " WHERE " + USER_ID + "=? ORDER BY "
+                                                   + REVIEW_ID + ";", (self.user_id,)):
+                reviews.setdefault(card_id, []).append(tuple(review))
+            return reviews
+
+    def get_setting(self, name: str, default: str = None, cursor: Cursor = None) -> str:
+        """
+        Fetches a setting of the user.
+        :param name: the settings name
+        :param default: returned if the setting was not set
+        :param cursor: the cursor to be used to access the database
+        :return: the settings value
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            value = self.get_setting(name, default, cur)
+            db.close()
+            return value
+
+        # a cursor was passed on
+        else:
+            row = cursor.execute("SELECT " + SETTING_VALUE + " FROM " + TABLE_USER_SETTING + " WHERE " + USER_ID
+                                 + "=? AND " + SETTING_NAME + "=?;", (self.user_id, name)).fetchone()
+            return default if row is None else row[0]
+
+    def set_setting(self, name: str, value: str, cursor: Cursor = None):
+        """
+        Saves a setting of the user.
+        :param name: the settings name
+        :param value: the settings value
+        :param cursor: the cursor to be used to access the database
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            self.set_setting(name, value, cur)
+            db.commit()
+            db.close()
+
+        # a cursor was passed on
+        else:
+            cursor.execute("INSERT OR REPLACE INTO " + TABLE_USER_SETTING + "(" + USER_ID + "," + SETTING_NAME + ","
+                           + SETTING_VALUE + ") VALUES (?,?,?);", (self.user_id, name, value))
@@ -0,0 +1,106 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Provides set operations on sorted arrays of ids.
+"""
+
+from array import array
+from bisect import bisect_left
+from typing import Iterable, List
+
+ID_TYPECODE = "i"
+GALLOP_FACTOR = 16  # intersect by binary search if one array is this many times larger
+
+
+def to_ids(ids: Iterable[int]) -> array:
+    """
+    Converts ids into a sorted array without duplicates.
+    :param ids: the ids
+    :return: a sorted array
+    """
+    return array(ID_TYPECODE, sorted(set(ids)))
+
+
+def intersect(a: array, b: array) -> array:
+    """
+    Intersects two sorted arrays.
+    :param a: the first sorted array
+    :param b: the second sorted array
+    :return: a sorted array with all ids in a and b
+    """
+    if len(a) > len(b):
+        a, b = b, a
+
+    # look the few ids of a up in b by binary search ...
+    if len(a) * GALLOP_FACTOR < len(b):
+        result = array(ID_TYPECODE)
+        len_b = len(b)
+        j = 0
+        for item in a:
+            j = bisect_left(b, item, j)
+            if j == len_b:
+                break
+            if b[j] == item:
+                result.append(item)
+        return result
+
+    # ... or let a set do the work for similar sizes
+    return array(ID_TYPECODE, sorted(set(a).intersection(b)))
+
+
+def intersect_all(arrays: List[array]) -> array:
+    """
+    Intersects a non-empty list of sorted arrays, starting with the shortest ones.
+    :param arrays: the sorted arrays
+    :return: a sorted array with all ids in every array
+    """
+    arrays = sorted(arrays, key=len)
+    result = arrays[0]
+    for other in arrays[1:]:
+        if not result:
+            break
+        result = intersect(result, other)
+    return result
+
+
+def union(a: array, b: array) -> array:
+    """
+    Unites two sorted arrays.
+    :param a: the first sorted array
+    :param b: the second sorted array
+    :return: a sorted array with all ids in a or b
+    """
+    if not a:
+        return b
+    if not b:
+        return a
+    return array(ID_TYPECODE, sorted(set(a).union(b)))
+
+
+def difference(a: array, b: array) -> array:
+    """
+    Subtracts one sorted array from another.
+    :param a: the sorted array to subtract from
+    :param b: the sorted array to be subtracted
+    :return: a sorted array with all ids in a but not in b
+    """
+    if not a or not b:
+        return a
+    b = set(b)
+    return array(ID_TYPECODE, (item for item in a if item not in b))
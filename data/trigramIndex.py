@@ -0,0 +1,281 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Provides a trigram index over phrase descriptions used to prefilter regular expression lookups.
+A regular expression is translated into a query of trigrams every match has to contain.
+Only the phrases found by that query have to be searched with the regular expression.
+"""
+
+from data.sortedIds import ID_TYPECODE, intersect_all, union
+
+from array import array
+from itertools import product
+from re import compile, IGNORECASE
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # python < 3.11
+    import sre_parse
+
+MAX_EXACT_STRINGS = 64  # larger sets of possible strings are reduced to trigram queries
+MAX_CLASS_SIZE = 8  # larger character classes are treated like '.'
+
+# a Query is ANY, (AND, [Query]), (OR, [Query]) or a trigram string
+ANY = ("any",)
+AND = "and"
+OR = "or"
+
+
+class TrigramIndex:
+    """
+    Maps trigrams to sorted arrays of the ids of the phrases containing them.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty TrigramIndex.
+        """
+        self.postings = {}  # type: Dict[str, array]
+        self.texts = {}  # type: Dict[int, str]  # phrase_id -> description
+        self.phrase_cards = {}  # type: Dict[int, Set[int]]  # phrase_id -> card_ids
+        self.ids = array(ID_TYPECODE)
+
+    def build(self, rows: Iterable[Tuple[int, str, int]]):
+        """
+        Fills the index.
+        :param rows: (phrase_id, description, card_id) tuples as returned by DatabaseManager.get_phrase_cards
+        """
+        postings = {}
+        for phrase_id, description, card_id in rows:
+            if phrase_id not in self.texts:
+                self.texts[phrase_id] = description
+                self.phrase_cards[phrase_id] = set()
+                for trigram in get_trigrams(description.lower()):
+                    postings.setdefault(trigram, []).append(phrase_id)
+            if card_id is not None:
+                self.phrase_cards[phrase_id].add(card_id)
+
+        self.postings = {trigram: array(ID_TYPECODE, sorted(ids)) for trigram, ids in postings.items()}
+        self.ids = array(ID_TYPECODE, sorted(self.texts))
+
+    def get_candidates(self, pattern: str) -> array:
+        """
+        Returns the ids of all phrases that might match the regular expression.
+        :param pattern: the regular expression
+        :return: a sorted array of phrase_ids
+        """
+        candidates = self.evaluate(regexp_query(pattern))
+        return self.ids if candidates is None else candidates
+
+    def search(self, pattern: str) -> List[int]:
+        """
+        Returns the ids of all phrases matching the regular expression.
+        :param pattern: the regular expression
+        :return: a sorted list of phrase_ids
+        """
+        reg = compile(pattern)
+        candidates = self.evaluate(regexp_query(pattern))
+        if candidates is None:
+            return sorted(phrase_id for phrase_id, text in self.texts.items() if reg.search(text))
+        return [phrase_id for phrase_id in candidates if reg.search(self.texts[phrase_id])]
+
+    def evaluate(self, query) -> Optional[array]:
+        """
+        Evaluates a trigram query.
+        :param query: the query
+        :return: a sorted array of phrase_ids or None if the query matches everything
+        """
+        if query == ANY:
+            return None
+        if isinstance(query, str):
+            return self.postings.get(query, array(ID_TYPECODE))
+
+        operator, operands = query
+        results = [self.evaluate(operand) for operand in operands]
+        if operator == AND:
+            results = [result for result in results if result is not None]
+            return intersect_all(results) if results else None
+
+        # OR
+        if any(result is None for result in results):
+            return None
+        result = array(ID_TYPECODE)
+        for other in results:
+            result = union(result, other)
+        return result
+
+
+def get_trigrams(string: str) -> Set[str]:
+    """
+    Returns all trigrams in string.
+    :param string: the string
+    :return: a set of trigrams
+    """
+    return {string[i:i + 3] for i in range(len(string) - 2)}
+
+
+def regexp_query(pattern: str):
+    """
+    Translates a regular expression into a trigram query every matching string fulfils.
+    :param pattern: the regular expression
+    :return: the query
+    """
+    parsed = sre_parse.parse(pattern, IGNORECASE)  # the index is lower-cased
+    exact, query = analyze_sequence(parsed)
+    return and_query([query, strings_query(exact)])
+
+
+def analyze_sequence(nodes) -> Tuple[Optional[Set[str]], object]:
+    """
+    Analyzes a sequence of regular expression nodes.
+    :param nodes: the parsed nodes
+    :return: the set of strings the sequence matches or None if unknown, and a query every match fulfils
+    """
+    run = {""}  # the strings the nodes since the last unknown node can match
+    exact = True
+    queries = []
+    for op, av in nodes:
+        node_exact, node_query = analyze_node(op, av)
+        queries.append(node_query)
+
+        if node_exact is not None and len(run) * len(node_exact) <= MAX_EXACT_STRINGS:
+            run = {a + b for a, b in product(run, node_exact)}
+            continue
+
+        # the current run ends here, keep the trigrams it requires
+        queries.append(strings_query(run))
+        run = {""} if node_exact is None else node_exact
+        exact = False
+
+    if exact:
+        return run, and_query(queries)
+    queries.append(strings_query(run))
+    return None, and_query(queries)
+
+
+def analyze_node(op, av) -> Tuple[Optional[Set[str]], object]:
+    """
+    Analyzes a single regular expression node.
+    :param op: the nodes operator
+    :param av: the nodes argument
+    :return: the set of strings the node matches or None if unknown, and a query every match fulfils
+    """
+    if op == sre_parse.LITERAL:
+        return {chr(av).lower()}, ANY
+
+    if op == sre_parse.IN:
+        return class_strings(av), ANY
+
+    if op == sre_parse.AT:
+        return {""}, ANY
+
+    if op == sre_parse.SUBPATTERN:
+        return analyze_sequence(av[-1])
+
+    if op == sre_parse.BRANCH:
+        branches = [analyze_sequence(branch) for branch in av[1]]
+        if all(exact is not None for exact, _ in branches) \
+                and sum(len(exact) for exact, _ in branches) <= MAX_EXACT_STRINGS:
+            return set().union(*(exact for exact, _ in branches)), or_query([query for _, query in branches])
+        return None, or_query([and_query([query, strings_query(exact)]) for exact, query in branches])
+
+    if op in REPEATS:
+        min_count, max_count, sub_nodes = av
+        exact, query = analyze_sequence(sub_nodes)
+        if min_count == 0:
+            if max_count == 1 and exact is not None:
+                return exact | {""}, ANY
+            return None, ANY
+        if min_count == max_count == 1:
+            return exact, query
+        return None, and_query([query, strings_query(exact)])
+
+    if op == getattr(sre_parse, "ATOMIC_GROUP", None):
+        return analyze_sequence(av)
+
+    # ANY, NOT_LITERAL, group references, lookarounds, ...
+    return None, ANY
+
+
+REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, "POSSESSIVE_REPEAT", sre_parse.MAX_REPEAT)}
+
+
+def class_strings(items) -> Optional[Set[str]]:
+    """
+    Returns the characters in a character class if there are only few of them.
+    :param items: the parsed items of the character class
+    :return: a set of characters or None
+    """
+    chars = set()
+    for op, av in items:
+        if op == sre_parse.LITERAL:
+            chars.add(chr(av).lower())
+        elif op == sre_parse.RANGE and av[1] - av[0] < MAX_CLASS_SIZE:
+            chars.update(chr(c).lower() for c in range(av[0], av[1] + 1))
+        else:  # NEGATE, CATEGORY, large ranges
+            return None
+    return chars if len(chars) <= MAX_CLASS_SIZE else None
+
+
+def strings_query(strings: Optional[Set[str]]):
+    """
+    Returns a query for texts containing at least one of the strings.
+    :param strings: the strings or None
+    :return: the query
+    """
+    if strings is None or any(len(string) < 3 for string in strings):
+        return ANY
+    return or_query([and_query(sorted(get_trigrams(string))) for string in sorted(strings)])
+
+
+def and_query(queries: list):
+    """
+    Combines queries into a query requiring all of them.
+    :param queries: the queries
+    :return: the combined query
+    """
+    operands = []
+    for query in queries:
+        if query == ANY:
+            continue
+        for operand in (query[1] if isinstance(query, tuple) and query[0] == AND else [query]):
+            if operand not in operands:
+                operands.append(operand)
+    if not operands:
+        return ANY
+    return operands[0] if len(operands) == 1 else (AND, operands)
+
+
+def or_query(queries: list):
+    """
+    Combines queries into a query requiring at least one of them.
+    :param queries: the queries
+    :return: the combined query
+    """
+    operands = []
+    for query in queries:
+        if query == ANY:
+            return ANY
+        for operand in (query[1] if isinstance(query, tuple) and query[0] == OR else [query]):
+            if operand not in operands:
+                operands.append(operand)
+    if not operands:
+        return ANY
+    return operands[0] if len(operands) == 1 else (OR, operands)
@@ -16,10 +16,11 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 """
-Handles the UserDatabaseManager-object.
+Handles the UserDatabaseManager-object of the current user.
 """
 
 from data.userDatabaseManager import UserDatabaseManager
+from data.userSessionManager import UserSessionManager
 from typing import List
 
 
@@ -31,52 +32,40 @@ class NoUserError(RuntimeError):
 
 class UDMHandler:
     """
-    Handles the UserDatabaseManager-object.
+    Handles the UserDatabaseManager-object of the current user.
+    The databases are opened by a UserSessionManager, so switching back to a recent user does not reopen its database.
     """
 
-    def __init__(self, user_name: str = None):
-        if user_name is None:
-            self.udm = None
-        else:
-            self.udm = UserDatabaseManager(user_name)
+    def __init__(self, session_manager: UserSessionManager, user_name: str = None):
+        self.session_manager = session_manager
+        self.user_name = user_name
 
-    @staticmethod
-    def get_user_names() -> List[str]:
+    def get_user_names(self) -> List[str]:
         """
         Returns all available user_names.
         :return: a list of names
         """
-        from os import listdir
-        from re import match
-
-        names = []
-        for file_name in listdir("."):
-            if match(".+[.]sqlite3", file_name) and not file_name == "data.sqlite3":
-                names.append(file_name[:-8])
-        return names
+        return self.session_manager.get_user_names()
 
     def set_user(self, name: str):
         """
         Sets the active user.
         :param name: the users name
         """
-        self.udm = UserDatabaseManager(name)
+        self.user_name = name
 
     def get_user(self) -> str:
         """
         Returns the name of the current user or None.
         :return: the name of the current user or None if no user is active yet.
         """
-        if self.udm is None:
-            return None
-        return self.udm.user_name
+        return self.user_name
 
     def get_udm(self) -> UserDatabaseManager:
         """
-        Returns the UserDatabaseManager-object.
+        Returns the UserDatabaseManager-object, creating the users database if necessary.
         :return:
         """
-        if self.udm is None:
+        if self.user_name is None:
             raise NoUserError("no user active yet.")
-        else:
-            return self.udm
+        return self.session_manager.get_udm(self.user_name, create=True)
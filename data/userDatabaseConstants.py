@@ -30,3 +30,87 @@ CREATE_TABLE_USED_CARD = "CREATE TABLE IF NOT EXISTS " + TABLE_USED_CARD + "(" +
                          CARD_ID + " INTEGER PRIMARY KEY, " + \
                          USED_CARD_SHELF + " INTEGER DEFAULT 0, " + \
                          USED_CARD_DUE_DATE + " DATE DEFAULT CURRENT_DATE);"
+
+# the cards of the last shelf not due for a while, moved out of used_card to keep it small
+TABLE_COLD_CARD = "cold_card"
+
+CREATE_TABLE_COLD_CARD = "CREATE TABLE IF NOT EXISTS " + TABLE_COLD_CARD + "(" + \
+                         CARD_ID + " INTEGER PRIMARY KEY, " + \
+                         USED_CARD_SHELF + " INTEGER DEFAULT 0, " + \
+                         USED_CARD_DUE_DATE + " DATE DEFAULT CURRENT_DATE);"
+
+# the reviews of the cards, used by the schedulers
+TABLE_REVIEW = "review"
+REVIEW_ID = "review_id"
+REVIEW_DATE = "review_date"
+REVIEW_SHELF = "shelf"  # the shelf before the review
+REVIEW_OUTCOME = "outcome"
+
+CREATE_TABLE_REVIEW = "CREATE TABLE IF NOT EXISTS " + TABLE_REVIEW + "(" + \
+                      REVIEW_ID + " INTEGER PRIMARY KEY, " + \
+                      CARD_ID + " INTEGER NOT NULL, " + \
+                      REVIEW_DATE + " DATE DEFAULT CURRENT_DATE, " + \
+                      REVIEW_SHELF + " INTEGER, " + \
+                      REVIEW_OUTCOME + " INTEGER);"
+
+CREATE_INDEX_REVIEW_CARD_ID = "CREATE INDEX IF NOT EXISTS review_card_id ON " + TABLE_REVIEW + "(" + CARD_ID + ");"
+
+TABLE_SETTING = "setting"
+SETTING_NAME = "name"
+SETTING_VALUE = "value"
+
+CREATE_TABLE_SETTING = "CREATE TABLE IF NOT EXISTS " + TABLE_SETTING + "(" + \
+                       SETTING_NAME + " TEXT PRIMARY KEY, " + \
+                       SETTING_VALUE + " TEXT);"
+
+SETTING_SCHEDULER = "scheduler"  # the spec of the users scheduler, see data.scheduler.get_scheduler
+SETTING_PORTION = "portion"  # the spec of the users portion policy, see data.portionPolicy.get_portion_policy
+SETTING_COLD_WATERMARK = "cold_watermark"  # all cold cards are due after this date
+
+# the shared database holding the cards of all users, see data.sharedUserDatabaseManager
+SHARED_DATABASE = "users.sqlite3"
+
+TABLE_USER = "user"
+USER_ID = "user_id"
+USER_NAME = "user_name"
+
+TABLE_USER_CARD = "user_card"
+
+CREATE_TABLE_USER = "CREATE TABLE IF NOT EXISTS " + TABLE_USER + "(" + \
+                    USER_ID + " INTEGER PRIMARY KEY, " + \
+                    USER_NAME + " TEXT UNIQUE NOT NULL);"
+
+CREATE_TABLE_USER_CARD = "CREATE TABLE IF NOT EXISTS " + TABLE_USER_CARD + "(" + \
+                         USER_ID + " INTEGER NOT NULL REFERENCES " + TABLE_USER + ", " + \
+                         CARD_ID + " INTEGER NOT NULL, " + \
+                         USED_CARD_SHELF + " INTEGER DEFAULT 0, " + \
+                         USED_CARD_DUE_DATE + " DATE DEFAULT CURRENT_DATE, " + \
+                         "PRIMARY KEY (" + USER_ID + ", " + CARD_ID + ")) WITHOUT ROWID;"
+
+CREATE_INDEX_USER_CARD_DUE_DATE = "CREATE INDEX IF NOT EXISTS user_card_due_date ON " + TABLE_USER_CARD + "(" + \
+                                  USER_ID + ", " + USED_CARD_DUE_DATE + ");"
+
+TABLE_USER_REVIEW = "user_review"
+
+CREATE_TABLE_USER_REVIEW = "CREATE TABLE IF NOT EXISTS " + TABLE_USER_REVIEW + "(" + \
+                           REVIEW_ID + " INTEGER PRIMARY KEY, " + \
+                           USER_ID + " INTEGER NOT NULL REFERENCES " + TABLE_USER + ", " + \
+                           CARD_ID + " INTEGER NOT NULL, " + \
+                           REVIEW_DATE + " DATE DEFAULT CURRENT_DATE, " + \
+                           REVIEW_SHELF + " INTEGER, " + \
+                           REVIEW_OUTCOME + " INTEGER);"
+
+CREATE_INDEX_USER_REVIEW_CARD_ID = "CREATE INDEX IF NOT EXISTS user_review_card_id ON " + TABLE_USER_REVIEW + \
+                                   "(" + USER_ID + ", " + CARD_ID + ");"
+
+TABLE_USER_SETTING = "user_setting"
+
+CREATE_TABLE_USER_SETTING = "CREATE TABLE IF NOT EXISTS " + TABLE_USER_SETTING + "(" + \
+                            USER_ID + " INTEGER NOT NULL REFERENCES " + TABLE_USER + ", " + \
+                            SETTING_NAME + " TEXT NOT NULL, " + \
+                            SETTING_VALUE + " TEXT, " + \
+                            "PRIMARY KEY (" + USER_ID + ", " + SETTING_NAME + ")) WITHOUT ROWID;"
+
+# the card database, attached read-only to the user databases for joined queries
+CATALOG_DATABASE = "data.sqlite3"
+CATALOG = "catalog"
@@ -19,13 +19,35 @@
 Responsible for all database interactions concerning user data.
 """
 
+from data.bitmapIndex import ShelfBitmaps
 from data.databaseOpenHelper import *
+from data.databaseConstants import TABLE_CARD, TABLE_GROUP, TABLE_CARD_GROUP, TABLE_PHRASE, TABLE_TRANSLATION, \
+    GROUP_ID, GROUP_NAME, GROUP_PARENT, PHRASE_ID, PHRASE_DESCRIPTION, PHRASE_LANGUAGE, \
+    TRANSLATION_ID, TRANSLATION_PHRASE_1, TRANSLATION_PHRASE_2
+from data.dueHistogram import DueHistogram
+from data.dueQueue import DueQueue
+from data.portionPolicy import PortionPolicy
 from data.userDatabaseConstants import *
-from time import strftime
+from datetime import date, timedelta
+from json import loads
+from os.path import abspath, join
+from time import localtime, strftime, time
+from urllib.request import pathname2url
 
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 Card = Tuple[int, int, str]  # id, shelf, due_date
+Review = Tuple[str, int, int]  # review_date, shelf before the review, outcome
+Translation = Tuple[str, str, str, str]
+CardWithContent = Tuple[int, int, str, List[Translation], List[str]]  # id, shelf, due_date, translations, groups
+
+COLD_MARGIN = 14  # the days cold cards are moved back to used_card before they are due
+
+# the subgroup tree of the groups selected by a condition on g: (root group_id, group_id of root or a descendant)
+SUBGROUPS = "WITH RECURSIVE subgroup(root, " + GROUP_ID + ") AS (" \
+            + "SELECT g." + GROUP_ID + ", g." + GROUP_ID + " FROM " + CATALOG + "." + TABLE_GROUP + " AS g WHERE {}" \
+            + " UNION SELECT s.root, g." + GROUP_ID + " FROM " + CATALOG + "." + TABLE_GROUP + " AS g" \
+            + " JOIN subgroup AS s ON g." + GROUP_PARENT + "=s." + GROUP_ID + ")"
 
 
 class CardNotUsedError(ValueError):
@@ -40,18 +62,65 @@ class CardAlreadyUsedError(ValueError):
     """
 
 
+class GroupStatistics:
+    """
+    Holds the progress of a user in a card group and its subgroups.
+    """
+
+    def __init__(self, name: str):
+        """
+        Initialize empty GroupStatistics.
+        :param name: the groups name
+        """
+        self.name = name
+        self.shelves = {}  # type: Dict[int, int]  # shelf -> amount of used cards
+        self.due = {}  # type: Dict[str, int]  # due_date -> amount of cards, overdue cards count as due today
+        self.unused = 0
+
+    def get_used(self) -> int:
+        """
+        Returns the amount of used cards in the group.
+        :return: the amount
+        """
+        return sum(self.shelves.values())
+
+
 class UserDatabaseManager(DatabaseOpenHelper):
     """
     Responsible for all database interactions concerning user data.
     """
 
-    def __init__(self, user_name: str):
+    def __init__(self, user_name: str, check_schema: bool = True, directory: str = ".",
+                 catalog: str = CATALOG_DATABASE):
         """
-        Initializes the UserDatabaseManager to use the database user/<user_name>.sqlite3.
+        Initializes the UserDatabaseManager to use the database <directory>/<user_name>.sqlite3.
         :param user_name: the user_name
+        :param check_schema: False to skip creating the tables, if they are known to exist
+        :param directory: the directory containing the user databases
+        :param catalog: the path of the card database used by the joined queries
         """
-        super().__init__(user_name + ".sqlite3")
+        super().__init__(join(directory, user_name + ".sqlite3"), check_schema)
         self.user_name = user_name
+        self.catalog = abspath(catalog)
+        self.used_cards = "(SELECT " + ",".join((CARD_ID, USED_CARD_SHELF, USED_CARD_DUE_DATE)) + " FROM " \
+                          + TABLE_USED_CARD + " UNION ALL SELECT " + ",".join((CARD_ID, USED_CARD_SHELF,
+                                                                              USED_CARD_DUE_DATE)) \
+                          + " FROM " + TABLE_COLD_CARD + ")"  # the table expression the queries select cards from
+        self.hot_cards = TABLE_USED_CARD  # holds all cards due until the cold watermark, see rotate_cold_cards
+        self.used_card_table, self.used_card_condition = TABLE_USED_CARD, "1"  # where the bulk updates write to
+        self.due_histogram = None  # type: DueHistogram  # loaded by get_due_histogram, then kept up to date
+        self.due_queue = None  # type: DueQueue  # loaded by get_due_queue, then kept up to date
+        self.shelf_bitmaps = None  # type: ShelfBitmaps  # loaded by get_shelf_bitmaps, then kept up to date
+
+    def attach_catalog(self, cursor: Cursor):
+        """
+        Attaches the card database read-only as schema 'catalog' to the cursors connection, if not done yet.
+        Must not be called while the connection has uncommitted changes.
+        :param cursor: the cursor to be used to access the database
+        """
+        if not any(row[1] == CATALOG for row in cursor.execute("PRAGMA database_list;")):
+            cursor.execute("ATTACH DATABASE ? AS " + CATALOG + ";",
+                           ("file:" + pathname2url(self.catalog) + "?mode=ro",))
 
     def create_tables(self):
         """
@@ -60,6 +129,10 @@ class UserDatabaseManager(DatabaseOpenHelper):
         db = self.get_connection()
         cur = db.cursor()
         cur.execute(CREATE_TABLE_USED_CARD)
+        cur.execute(CREATE_TABLE_COLD_CARD)
+        cur.execute(CREATE_TABLE_REVIEW)
+        cur.execute(CREATE_INDEX_REVIEW_CARD_ID)
+        cur.execute(CREATE_TABLE_SETTING)
         db.commit()
         db.close()
 
@@ -76,25 +149,41 @@ class UserDatabaseManager(DatabaseOpenHelper):
         :param cursor: the cursor to be used to access the database.
         """
 
-        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        # if no cursor was passed on, open the database and add the card with a new cursor object
         if cursor is None:
             db = self.get_connection()
-            cur = db.cursor()
-            self.add_card(card_id, shelf, due_date, cur)
-            db.commit()
-            db.close()
+            try:
+                due_date = self.insert_card(card_id, shelf, due_date, db.cursor())
+                db.commit()
+            finally:
+                db.close()
+            self.update_caches(card_id, shelf, None, due_date)
 
-        # a cursor was passed on
+        # a cursor was passed on, the caller commits or rolls back and the caches are loaded again afterwards
         else:
-            if self.card_is_used(card_id, cursor):
-                raise CardAlreadyUsedError("Card {} is already used by user {}.".format(card_id, self.user_name))
+            self.insert_card(card_id, shelf, due_date, cursor)
+            self.due_histogram = self.due_queue = self.shelf_bitmaps = None
 
-            if due_date == "today":
-                due_date = strftime("%Y-%m-%d")
+    def insert_card(self, card_id: int, shelf: int, due_date: str, cursor: Cursor) -> str:
+        """
+        Inserts a card into the database, without touching the caches.
+        :raises CardAlreadyUsedError: if the card already exists
+        :param card_id: the cards id
+        :param shelf: the cards shelf
+        :param due_date: the cards due date
+        :param cursor: the cursor to be used to access the database
+        :return: the cards due date
+        """
+        if self.card_is_used(card_id, cursor):
+            raise CardAlreadyUsedError("Card {} is already used by user {}.".format(card_id, self.user_name))
+
+        if due_date == "today":
+            due_date = strftime("%Y-%m-%d")
 
-            cursor.execute("INSERT INTO " + TABLE_USED_CARD + "("
-                           + ",".join((CARD_ID, USED_CARD_SHELF, USED_CARD_DUE_DATE))
-                           + ") VALUES (?,?,?);", (card_id, shelf, due_date))
+        cursor.execute("INSERT INTO " + TABLE_USED_CARD + "("
+                       + ",".join((CARD_ID, USED_CARD_SHELF, USED_CARD_DUE_DATE))
+                       + ") VALUES (?,?,?);", (card_id, shelf, due_date))
+        return due_date
 
     #######
     # look for entries in the database
@@ -117,7 +206,7 @@ class UserDatabaseManager(DatabaseOpenHelper):
 
         # a cursor was passed on
         else:
-            return cursor.execute("SELECT * FROM " + TABLE_USED_CARD + " WHERE " + CARD_ID + "=?;",
+            return cursor.execute("SELECT * FROM " + self.used_cards + " WHERE " + CARD_ID + "=?;",
                                   (card_id,)).fetchone() is not None
 
     #######
@@ -145,10 +234,52 @@ class UserDatabaseManager(DatabaseOpenHelper):
                 raise CardNotUsedError("Card {} is not used by user {}.".format(card_id, self.user_name))
 
             shelf, due_date = cursor.execute("SELECT " + ",".join((USED_CARD_SHELF, USED_CARD_DUE_DATE))
-                                             + " FROM " + TABLE_USED_CARD + " WHERE " + CARD_ID + "=?;",
+                                             + " FROM " + self.used_cards + " WHERE " + CARD_ID + "=?;",
                                              (card_id,)).fetchone()
             return card_id, shelf, due_date
 
+    def get_cards(self, card_ids: List[int], cursor: Cursor = None) -> List[Card]:
+        """
+        Loads those of several cards from the database that are used.
+        :param card_ids: the card_ids
+        :param cursor: the cursor to be used to access the database
+        :return: a list of 3-tuples representing the used cards (id, shelf, due_date)
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            cards = self.get_cards(card_ids, cur)
+            db.close()
+            return cards
+
+        # a cursor was passed on
+        else:
+            return cursor.execute("SELECT " + ",".join((CARD_ID, USED_CARD_SHELF, USED_CARD_DUE_DATE))
+                                  + " FROM " + self.used_cards
+                                  + " WHERE " + CARD_ID + " IN (" + ",".join(map(str, card_ids)) + ");").fetchall()
+
+    def get_all_cards(self, cursor: Cursor = None) -> List[Card]:
+        """
+        Fetches all used cards from the database.
+        :param cursor: the cursor to be used to access the database.
+        :return: a list of 3-tuples representing the cards (id, shelf, due_date)
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            cards = self.get_all_cards(cur)
+            db.close()
+            return cards
+
+        # a cursor was passed on
+        else:
+            return cursor.execute("SELECT " + ",".join((CARD_ID, USED_CARD_SHELF, USED_CARD_DUE_DATE))
+                                  + " FROM " + self.used_cards + ";").fetchall()
+
     def get_due_cards(self, due_date: str = "today", cursor: Cursor = None) -> List[Card]:
         """
         Fetches all due cards from the database.
@@ -171,7 +302,8 @@ class UserDatabaseManager(DatabaseOpenHelper):
                 due_date = strftime('%Y-%m-%d')
 
             return cursor.execute("SELECT " + ",".join((CARD_ID, USED_CARD_SHELF, USED_CARD_DUE_DATE))
-                                  + " FROM " + TABLE_USED_CARD + " WHERE " + USED_CARD_DUE_DATE + "<=?;",
+                                  + " FROM " + self.get_due_table(due_date, cursor)
+                                  + " WHERE " + USED_CARD_DUE_DATE + "<=?;",
                                   (due_date,)).fetchall()
 
     def get_cards_on_shelf(self, shelf:int, cursor: Cursor = None) -> List[Card]:
@@ -192,17 +324,477 @@ class UserDatabaseManager(DatabaseOpenHelper):
 
         # a cursor was passed on
         else:
+            from data.scheduler import MAX_SHELF  # data.scheduler imports this module
+
             return cursor.execute("SELECT " + ",".join((CARD_ID, USED_CARD_SHELF, USED_CARD_DUE_DATE))
-                                  + " FROM " + TABLE_USED_CARD + " WHERE " + USED_CARD_SHELF + "=?;",
-                                  (shelf,)).fetchall()
+                                  + " FROM " + (self.hot_cards if shelf < MAX_SHELF else self.used_cards)
+                                  + " WHERE " + USED_CARD_SHELF + "=?;", (shelf,)).fetchall()
+
+    def get_schedule(self, cursor: Cursor = None) -> List[Tuple[int, int, int]]:
+        """
+        Counts the used cards per shelf and day they are due on.
+        :param cursor: the cursor to be used to access the database.
+        :return: a list of 3-tuples (shelf, days until due, amount of cards), overdue cards are due in 0 days
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            schedule = self.get_schedule(cur)
+            db.close()
+            return schedule
+
+        # a cursor was passed on
+        else:
+            return cursor.execute("SELECT " + USED_CARD_SHELF + ", MAX(CAST(julianday(" + USED_CARD_DUE_DATE + ")"
+                                  + " - julianday(?) AS INTEGER), 0) AS due_day, COUNT(*)"
+                                  + " FROM " + self.used_cards + " GROUP BY " + USED_CARD_SHELF + ", due_day;",
+                                  (strftime("%Y-%m-%d"),)).fetchall()
+
+    def get_due_date_counts(self, cursor: Cursor = None) -> List[Tuple[str, int]]:
+        """
+        Counts the used cards per due_date.
+        :param cursor: the cursor to be used to access the database.
+        :return: a list of 2-tuples (due_date, amount of cards)
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            counts = self.get_due_date_counts(cur)
+            db.close()
+            return counts
+
+        # a cursor was passed on
+        else:
+            return cursor.execute("SELECT " + USED_CARD_DUE_DATE + ", COUNT(*) FROM " + self.used_cards
+                                  + " GROUP BY " + USED_CARD_DUE_DATE + ";").fetchall()
+
+    def get_due_histogram(self) -> DueHistogram:
+        """
+        Returns the histogram of the due dates of the used cards. It is loaded on the first call
+        and kept up to date by add_card and update_card from then on.
+        :return: the DueHistogram
+        """
+        if self.due_histogram is None:
+            due_histogram = DueHistogram()
+            due_histogram.build(self.get_due_date_counts())
+            self.due_histogram = due_histogram
+        return self.due_histogram
+
+    def get_due_queue(self) -> DueQueue:
+        """
+        Returns the queue of the used cards by due date. It is loaded on the first call
+        and kept up to date by add_card and update_card from then on.
+        :return: the DueQueue
+        """
+        if self.due_queue is None:
+            due_queue = DueQueue()
+            due_queue.build(self.get_all_cards())
+            self.due_queue = due_queue
+        return self.due_queue
+
+    def get_shelf_bitmaps(self) -> ShelfBitmaps:
+        """
+        Returns the bitmaps of the used cards on every shelf. They are loaded on the first call
+        and kept up to date by add_card and update_card from then on.
+        :return: the ShelfBitmaps
+        """
+        if self.shelf_bitmaps is None:
+            shelf_bitmaps = ShelfBitmaps()
+            shelf_bitmaps.build(self.get_all_cards())
+            self.shelf_bitmaps = shelf_bitmaps
+        return self.shelf_bitmaps
+
+    def get_next_due_card(self, due_date: str = "today") -> Optional[Card]:
+        """
+        Returns the longest overdue card from the due queue, without accessing the database once it is loaded.
+        :param due_date: the day in format '%Y-%m-%d', cards due until then are due
+        :return: a 3-tuple (id, shelf, due_date) representing the card or None if no card is due
+        """
+        if due_date == "today":
+            due_date = strftime("%Y-%m-%d")
+        return self.get_due_queue().peek(due_date)
+
+    #######
+    # joined queries over the used cards and the attached card database
+
+    def get_due_cards_with_content(self, due_date: str = "today", cursor: Cursor = None) -> List[CardWithContent]:
+        """
+        Fetches all due cards together with their translations and groups in a single query.
+        :param due_date: a date in format '%Y-%m-%d' or 'today'
+        :param cursor: the cursor to be used to access the database.
+        :return: a list of 5-tuples representing the cards (id, shelf, due_date, translations, group_names)
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            cards = self.get_due_cards_with_content(due_date, cur)
+            db.close()
+            return cards
+
+        # a cursor was passed on
+        else:
+            if due_date == "today":
+                due_date = strftime('%Y-%m-%d')
+
+            self.attach_catalog(cursor)
+            return self.select_cards_with_content("u." + USED_CARD_DUE_DATE + "<=?", (due_date,), cursor,
+                                                  self.get_due_table(due_date, cursor))
+
+    def get_due_portion(self, policy: PortionPolicy, due_date: str = "today", cursor: Cursor = None) -> List[int]:
+        """
+        Selects the due cards to be questioned according to a portion policy in a single query,
+        without loading their content.
+        :param policy: the PortionPolicy
+        :param due_date: a date in format '%Y-%m-%d' or 'today'
+        :param cursor: the cursor to be used to access the database.
+        :return: the card_ids in the order of the policy
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            card_ids = self.get_due_portion(policy, due_date, cur)
+            db.close()
+            return card_ids
+
+        # a cursor was passed on
+        else:
+            if due_date == "today":
+                due_date = strftime('%Y-%m-%d')
+            due_table = self.get_due_table(due_date, cursor)
+
+            # number the due cards per shelf, oldest first, and drop those exceeding the quota of their shelf
+            quotas = " AND ".join("(" + USED_CARD_SHELF + "!=? OR shelf_rank<=?)" for _ in policy.quotas) or "1"
+            parameters = (due_date,) + tuple(value for quota in sorted(policy.quotas.items()) for value in quota)
+            portion = "WITH due AS (SELECT " + ",".join((CARD_ID, USED_CARD_SHELF, USED_CARD_DUE_DATE)) \
+                      + ", ROW_NUMBER() OVER (PARTITION BY " + USED_CARD_SHELF + " ORDER BY " + USED_CARD_DUE_DATE \
+                      + ", " + CARD_ID + ") AS shelf_rank FROM " + due_table \
+                      + " WHERE " + USED_CARD_DUE_DATE + "<=?), allowed AS (SELECT * FROM due WHERE " + quotas + ")"
+            order = "{0}" + USED_CARD_SHELF + ">?, {0}" + USED_CARD_DUE_DATE + ", {0}" + USED_CARD_SHELF \
+                    + ", {0}" + CARD_ID
+
+            # then take the cards in the order of the policy, from the groups in turns if it is fair,
+            # the group of a card is its newest group, which is its most specific one for subgroups
+            if policy.fair:
+                self.attach_catalog(cursor)
+                primary_groups = "SELECT " + CARD_ID + ", MAX(" + GROUP_ID + ") AS " + GROUP_ID \
+                                 + " FROM " + CATALOG + "." + TABLE_CARD_GROUP + " GROUP BY " + CARD_ID
+                portion += ", ranked AS (SELECT a.*, ROW_NUMBER() OVER (PARTITION BY p." + GROUP_ID \
+                           + " ORDER BY " + order.format("a.") + ") AS group_rank FROM allowed AS a" \
+                           + " LEFT JOIN (" + primary_groups + ") AS p ON p." + CARD_ID + "=a." + CARD_ID + ")" \
+                           + " SELECT " + CARD_ID + " FROM ranked ORDER BY group_rank, " + order.format("") \
+                           + " LIMIT ?"
+                parameters += (policy.priority_shelf, policy.priority_shelf, policy.size)
+            else:
+                portion += " SELECT " + CARD_ID + " FROM allowed ORDER BY " + order.format("") + " LIMIT ?"
+                parameters += (policy.priority_shelf, policy.size)
+
+            return [row[0] for row in cursor.execute(portion + ";", parameters)]
+
+    def count_due_cards(self, due_date: str = "today", cursor: Cursor = None) -> int:
+        """
+        Counts the due cards.
+        :param due_date: a date in format '%Y-%m-%d' or 'today'
+        :param cursor: the cursor to be used to access the database.
+        :return: the amount of due cards
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            count = self.count_due_cards(due_date, cur)
+            db.close()
+            return count
+
+        # a cursor was passed on
+        else:
+            if due_date == "today":
+                due_date = strftime('%Y-%m-%d')
+
+            return cursor.execute("SELECT COUNT(*) FROM " + self.get_due_table(due_date, cursor)
+                                  + " WHERE " + USED_CARD_DUE_DATE + "<=?;", (due_date,)).fetchone()[0]
+
+    def get_cards_with_content(self, card_ids: List[int], cursor: Cursor = None) -> List[CardWithContent]:
+        """
+        Fetches those of several cards that are used together with their translations and groups in a single query.
+        :param card_ids: the card_ids
+        :param cursor: the cursor to be used to access the database.
+        :return: a list of 5-tuples representing the cards (id, shelf, due_date, translations, group_names)
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            cards = self.get_cards_with_content(card_ids, cur)
+            db.close()
+            return cards
+
+        # a cursor was passed on
+        else:
+            return self.select_cards_with_content("u." + CARD_ID + " IN (" + ",".join(map(str, card_ids)) + ")", (),
+                                                  cursor)
+
+    def get_cards_on_shelf_with_content(self, shelf: int, cursor: Cursor = None) -> List[CardWithContent]:
+        """
+        Fetches all cards on a shelf together with their translations and groups in a single query.
+        :param shelf: the shelf
+        :param cursor: the cursor to be used to access the database.
+        :return: a list of 5-tuples representing the cards (id, shelf, due_date, translations, group_names)
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            cards = self.get_cards_on_shelf_with_content(shelf, cur)
+            db.close()
+            return cards
+
+        # a cursor was passed on
+        else:
+            from data.scheduler import MAX_SHELF  # data.scheduler imports this module
+
+            return self.select_cards_with_content("u." + USED_CARD_SHELF + "=?", (shelf,), cursor,
+                                                  self.hot_cards if shelf < MAX_SHELF else self.used_cards)
+
+    def select_cards_with_content(self, condition: str, parameters: tuple, cursor: Cursor,
+                                  used_cards: str = None) -> List[CardWithContent]:
+        """
+        Selects the used cards matching a condition on u together with their translations and groups.
+        :param condition: an SQL condition on the used card u
+        :param parameters: the parameters of the condition
+        :param cursor: the cursor to be used to access the database
+        :param used_cards: the table expression to select u from, defaults to all used cards
+        :return: a list of 5-tuples representing the cards (id, shelf, due_date, translations, group_names)
+        """
+        self.attach_catalog(cursor)
+
+        cards = []
+        for card_id, shelf, due_date, *translation, groups in cursor.execute(
+                "SELECT u." + CARD_ID + ", u." + USED_CARD_SHELF + ", u." + USED_CARD_DUE_DATE
+                + ", l1." + PHRASE_DESCRIPTION + ", l1." + PHRASE_LANGUAGE
+                + ", l2." + PHRASE_DESCRIPTION + ", l2." + PHRASE_LANGUAGE
+                + ", coalesce(n.group_names, '[]')"
+                + " FROM " + (used_cards or self.used_cards) + " AS u"
+                + " JOIN " + CATALOG + "." + TABLE_CARD + " AS c ON c." + CARD_ID + "=u." + CARD_ID
+                + " JOIN " + CATALOG + "." + TABLE_TRANSLATION + " AS t ON t." + TRANSLATION_ID + "=c." + TRANSLATION_ID
+                + " JOIN " + CATALOG + "." + TABLE_PHRASE + " AS l1 ON l1." + PHRASE_ID + "=t." + TRANSLATION_PHRASE_1
+                + " JOIN " + CATALOG + "." + TABLE_PHRASE + " AS l2 ON l2." + PHRASE_ID + "=t." + TRANSLATION_PHRASE_2
+                + " LEFT JOIN (SELECT cg." + CARD_ID + ", json_group_array(g." + GROUP_NAME + ") AS group_names"
+                + " FROM " + CATALOG + "." + TABLE_CARD_GROUP + " AS cg"
+                + " JOIN " + CATALOG + "." + TABLE_GROUP + " AS g ON g." + GROUP_ID + "=cg." + GROUP_ID
+                + " GROUP BY cg." + CARD_ID + ") AS n ON n." + CARD_ID + "=u." + CARD_ID
+                + " WHERE " + condition
+                + " ORDER BY u." + CARD_ID + ", c." + TRANSLATION_ID + ";", parameters):
+            if not cards or cards[-1][0] != card_id:
+                cards.append((card_id, shelf, due_date, [], loads(groups)))
+            cards[-1][3].append(tuple(translation))
+        return cards
+
+    def get_shelf_distribution(self, group_name: str = None, cursor: Cursor = None) -> Dict[str, Dict[int, int]]:
+        """
+        Counts the used cards per shelf in a group and its subgroups, or in every group at once.
+        :param group_name: the groups name, None for all groups
+        :param cursor: the cursor to be used to access the database.
+        :return: a dict mapping each group_name to a dict mapping shelves to card counts
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            distribution = self.get_shelf_distribution(group_name, cur)
+            db.close()
+            return distribution
+
+        # a cursor was passed on
+        else:
+            self.attach_catalog(cursor)
+
+            if group_name is None:
+                condition, parameters = "1", ()
+            else:
+                condition, parameters = "g." + GROUP_NAME + "=?", (group_name,)
+
+            distribution = {}
+            for name, shelf, count in cursor.execute(
+                    SUBGROUPS.format(condition)
+                    + " SELECT g." + GROUP_NAME + ", u." + USED_CARD_SHELF + ", COUNT(DISTINCT u." + CARD_ID + ")"
+                    + " FROM subgroup AS s"
+                    + " JOIN " + CATALOG + "." + TABLE_CARD_GROUP + " AS cg ON cg." + GROUP_ID + "=s." + GROUP_ID
+                    + " JOIN " + self.used_cards + " AS u ON u." + CARD_ID + "=cg." + CARD_ID
+                    + " JOIN " + CATALOG + "." + TABLE_GROUP + " AS g ON g." + GROUP_ID + "=s.root"
+                    + " GROUP BY s.root, u." + USED_CARD_SHELF + ";", parameters):
+                distribution.setdefault(name, {})[shelf] = count
+            return distribution
+
+    def get_group_statistics(self, group_name: str = None, days: int = 7,
+                             cursor: Cursor = None) -> Dict[str, GroupStatistics]:
+        """
+        Computes shelf histograms, due counts for the next days and unused counts
+        for a group and its subgroups, or for every group at once.
+        :param group_name: the groups name, None for all groups
+        :param days: the amount of days, starting today, to count the due cards for
+        :param cursor: the cursor to be used to access the database.
+        :return: a dict mapping each group_name to its GroupStatistics
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            statistics = self.get_group_statistics(group_name, days, cur)
+            db.close()
+            return statistics
+
+        # a cursor was passed on
+        else:
+            self.attach_catalog(cursor)
+
+            if group_name is None:
+                condition, parameters = "1", ()
+            else:
+                condition, parameters = "g." + GROUP_NAME + "=?", (group_name,)
+            today = strftime("%Y-%m-%d")
+            last_day = strftime("%Y-%m-%d", localtime(time() + 86400 * (days - 1)))
+
+            # unused cards have neither shelf nor due_day, cards due after last_day have no due_day
+            statistics = {}
+            for name, shelf, due_day, count in cursor.execute(
+                    SUBGROUPS.format(condition)
+                    + " SELECT g." + GROUP_NAME + ", u." + USED_CARD_SHELF
+                    + ", CASE WHEN u." + USED_CARD_DUE_DATE + "<=? THEN ?"
+                    + " WHEN u." + USED_CARD_DUE_DATE + "<=? THEN u." + USED_CARD_DUE_DATE + " END AS due_day"
+                    + ", COUNT(DISTINCT cg." + CARD_ID + ")"
+                    + " FROM subgroup AS s"
+                    + " JOIN " + CATALOG + "." + TABLE_CARD_GROUP + " AS cg ON cg." + GROUP_ID + "=s." + GROUP_ID
+                    + " LEFT JOIN " + self.used_cards + " AS u ON u." + CARD_ID + "=cg." + CARD_ID
+                    + " JOIN " + CATALOG + "." + TABLE_GROUP + " AS g ON g." + GROUP_ID + "=s.root"
+                    + " GROUP BY s.root, u." + USED_CARD_SHELF + ", due_day;",
+                    parameters + (today, today, last_day)):
+                group = statistics.setdefault(name, GroupStatistics(name))
+                if shelf is None:
+                    group.unused += count
+                    continue
+                group.shelves[shelf] = group.shelves.get(shelf, 0) + count
+                if due_day is not None:
+                    group.due[due_day] = group.due.get(due_day, 0) + count
+            return statistics
+
+    def get_unused_card_ids(self, group_name: str, cursor: Cursor = None) -> List[int]:
+        """
+        Fetches the ids of the cards in a group and its subgroups that are not used yet.
+        :param group_name: the groups name
+        :param cursor: the cursor to be used to access the database.
+        :return: a sorted list of card_ids
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            card_ids = self.get_unused_card_ids(group_name, cur)
+            db.close()
+            return card_ids
+
+        # a cursor was passed on
+        else:
+            self.attach_catalog(cursor)
+            return [row[0] for row in cursor.execute(
+                SUBGROUPS.format("g." + GROUP_NAME + "=?")
+                + " SELECT DISTINCT cg." + CARD_ID + " FROM subgroup AS s"
+                + " JOIN " + CATALOG + "." + TABLE_CARD_GROUP + " AS cg ON cg." + GROUP_ID + "=s." + GROUP_ID
+                + " WHERE NOT EXISTS (SELECT 1 FROM " + self.used_cards + " AS u"
+                + " WHERE u." + CARD_ID + "=cg." + CARD_ID + ")"
+                + " ORDER BY cg." + CARD_ID + ";", (group_name,))]
 
     #######
     # update the entries in the database
 
-    def update_card(self, card: Card, cursor: Cursor = None):
+    def update_card(self, card: Card, review: Tuple[int, int] = None, cursor: Cursor = None):
         """
         Updates the card in the database to the new values.
         :param card: a 3-tuple (id, shelf, due_date) representing the card
+        :param review: (shelf before the review, outcome) to add a review of today to the cards history
+        :param cursor: the cursor to be used to access the database
+        """
+
+        # if no cursor was passed on, open the database and update the card with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            try:
+                old_due_date = self.write_card(card, review, db.cursor())
+                db.commit()
+            finally:
+                db.close()
+            self.update_caches(card[0], card[1], old_due_date, card[2])
+
+        # a cursor was passed on, the caller commits or rolls back and the caches are loaded again afterwards
+        else:
+            self.write_card(card, review, cursor)
+            self.due_histogram = self.due_queue = self.shelf_bitmaps = None
+
+    def write_card(self, card: Card, review: Optional[Tuple[int, int]], cursor: Cursor) -> str:
+        """
+        Writes the new values of a card and its review to the database, without touching the caches.
+        :raises CardNotUsedError: if the card is not used
+        :param card: a 3-tuple (id, shelf, due_date) representing the card
+        :param review: (shelf before the review, outcome) to add a review of today to the cards history
+        :param cursor: the cursor to be used to access the database
+        :return: the cards due date before the update
+        """
+        card_id, shelf, due_date = card
+
+        old = cursor.execute("SELECT " + USED_CARD_DUE_DATE + " FROM " + TABLE_USED_CARD + " WHERE " + CARD_ID
+                             + "=?;", (card_id,)).fetchone()
+        if old is None and self.promote_cold_cards(CARD_ID + "=?", (card_id,), cursor):
+            old = cursor.execute("SELECT " + USED_CARD_DUE_DATE + " FROM " + TABLE_USED_CARD + " WHERE "
+                                 + CARD_ID + "=?;", (card_id,)).fetchone()
+        if old is None:
+            raise CardNotUsedError("Card {} is not used by user {}.".format(card_id, self.user_name))
+
+        cursor.execute("UPDATE " + TABLE_USED_CARD + " SET " + USED_CARD_SHELF + "=?, "
+                       + USED_CARD_DUE_DATE + "=? WHERE " + CARD_ID + "=?;", (shelf, due_date, card_id))
+        if review is not None:
+            cursor.execute("INSERT INTO " + TABLE_REVIEW + "(" + ",".join((CARD_ID, REVIEW_DATE, REVIEW_SHELF,
+                                                                           REVIEW_OUTCOME))
+                           + ") VALUES (?,?,?,?);", (card_id, strftime("%Y-%m-%d")) + tuple(review))
+        return old[0]
+
+    def update_caches(self, card_id: int, shelf: int, old_due_date: Optional[str], due_date: str):
+        """
+        Applies a committed change of a card to the loaded caches.
+        :param card_id: the cards id
+        :param shelf: the cards new shelf
+        :param old_due_date: the cards due date before the change, None if the card was added
+        :param due_date: the cards new due date
+        """
+        if self.due_histogram is not None:
+            if old_due_date is None:
+                self.due_histogram.add(due_date)
+            else:
+                self.due_histogram.move(old_due_date, due_date)
+        if self.due_queue is not None:
+            self.due_queue.push(card_id, shelf, due_date)
+        if self.shelf_bitmaps is not None:
+            if old_due_date is None:
+                self.shelf_bitmaps.add(card_id, shelf)
+            else:
+                self.shelf_bitmaps.move(card_id, shelf)
+
+    def update_cards(self, cards: List[Card], cursor: Cursor = None):
+        """
+        Updates many cards in the database at once. Cards that are not used are ignored.
+        :param cards: 3-tuples (id, shelf, due_date) representing the cards
         :param cursor: the cursor to be used to access the database
         """
 
@@ -210,16 +802,255 @@ class UserDatabaseManager(DatabaseOpenHelper):
         if cursor is None:
             db = self.get_connection()
             cur = db.cursor()
-            self.update_card(card, cur)
+            self.update_cards(cards, cur)
             db.commit()
             db.close()
 
         # a cursor was passed on
         else:
-            card_id, shelf, due_date = card
+            self.promote_all_cold_cards(cursor)
+            cursor.executemany("UPDATE " + TABLE_USED_CARD + " SET " + USED_CARD_SHELF + "=?, "
+                               + USED_CARD_DUE_DATE + "=? WHERE " + CARD_ID + "=?;",
+                               ((shelf, due_date, card_id) for card_id, shelf, due_date in cards))
+            self.due_histogram = self.due_queue = self.shelf_bitmaps = None
 
-            if not self.card_is_used(card_id, cursor):
-                raise CardNotUsedError("Card {} is not used by user {}.".format(card_id, self.user_name))
+    def shift_due_dates(self, days: int, card_ids: List[int] = None, cursor: Cursor = None) -> int:
+        """
+        Moves the due dates of all used cards or of the given cards by days, in a single statement.
+        :param days: the amount of days, negative to move the due dates back
+        :param card_ids: the card_ids, None for all cards
+        :param cursor: the cursor to be used to access the database
+        :return: the amount of moved cards
+        """
 
-            cursor.execute("UPDATE " + TABLE_USED_CARD + " SET " + USED_CARD_SHELF + "=?, "
-                           + USED_CARD_DUE_DATE + "=? WHERE " + CARD_ID + "=?;", (shelf, due_date, card_id))
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            count = self.shift_due_dates(days, card_ids, cur)
+            db.commit()
+            db.close()
+            return count
+
+        # a cursor was passed on
+        else:
+            self.promote_all_cold_cards(cursor)
+            cursor.execute("UPDATE " + self.used_card_table
+                           + " SET " + USED_CARD_DUE_DATE + "=date(" + USED_CARD_DUE_DATE + ", ?)"
+                           + " WHERE " + self.used_card_condition + " AND " + self.get_card_condition(card_ids) + ";",
+                           ("{:+d} days".format(days),))
+            self.due_histogram = self.due_queue = None
+            return cursor.rowcount
+
+    def spread_overdue(self, days: int, card_ids: List[int] = None, cursor: Cursor = None) -> int:
+        """
+        Spreads the cards due today or earlier evenly over the next days, the longest overdue first,
+        in a single statement.
+        :param days: the amount of days, starting today
+        :param card_ids: the card_ids, None for all cards
+        :param cursor: the cursor to be used to access the database
+        :return: the amount of moved cards
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            count = self.spread_overdue(days, card_ids, cur)
+            db.commit()
+            db.close()
+            return count
+
+        # a cursor was passed on
+        else:
+            today = strftime("%Y-%m-%d")
+            self.promote_all_cold_cards(cursor)
+            backlog = " FROM " + self.used_cards + " WHERE " + USED_CARD_DUE_DATE + "<=? AND " \
+                + self.get_card_condition(card_ids)
+            cursor.execute("UPDATE " + self.used_card_table
+                           + " SET " + USED_CARD_DUE_DATE + "=date(?, '+' || ((backlog.position - 1) * ?"
+                           + " / (SELECT COUNT(*)" + backlog + ")) || ' days')"
+                           + " FROM (SELECT " + CARD_ID + ", ROW_NUMBER() OVER (ORDER BY " + USED_CARD_DUE_DATE
+                           + ", " + CARD_ID + ") AS position" + backlog + ") AS backlog"
+                           + " WHERE " + self.used_card_condition + " AND "
+                           + self.used_card_table + "." + CARD_ID + "=backlog." + CARD_ID + ";",
+                           (today, days, today, today))
+            self.due_histogram = self.due_queue = None
+            return cursor.rowcount
+
+    @staticmethod
+    def get_card_condition(card_ids: Optional[List[int]]) -> str:
+        """
+        Builds the condition selecting the given cards for the bulk updates.
+        :param card_ids: the card_ids, None for all cards
+        :return: the condition on card_id
+        """
+        if card_ids is None:
+            return "1"
+        return CARD_ID + " IN (" + ",".join(map(str, card_ids)) + ")"
+
+    #######
+    # hot and cold cards
+
+    def get_due_table(self, due_date: str, cursor: Cursor) -> str:
+        """
+        Returns the table expression to select the cards due until due_date from. These are the hot cards
+        while due_date is not past the watermark set by rotate_cold_cards, all used cards otherwise.
+        :param due_date: a date in format '%Y-%m-%d'
+        :param cursor: the cursor to be used to access the database
+        :return: the table expression
+        """
+        if due_date <= self.get_setting(SETTING_COLD_WATERMARK, "", cursor):
+            return self.hot_cards
+        return self.used_cards
+
+    def rotate_cold_cards(self, due_date: str = "today", cursor: Cursor = None):
+        """
+        Makes sure used_card holds all cards due until due_date, call it before questioning the due cards.
+        Does nothing while due_date is not past the watermark, otherwise moves the watermark COLD_MARGIN days
+        past due_date, moves the cold cards due until then back to used_card and the cards on the
+        MAX_SHELF of data.scheduler due later to cold_card.
+        :param due_date: a date in format '%Y-%m-%d' or 'today'
+        :param cursor: the cursor to be used to access the database
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            self.rotate_cold_cards(due_date, cur)
+            db.commit()
+            db.close()
+
+        # a cursor was passed on
+        else:
+            from data.scheduler import MAX_SHELF  # data.scheduler imports this module
+
+            if due_date == "today":
+                due_date = strftime('%Y-%m-%d')
+            if due_date <= self.get_setting(SETTING_COLD_WATERMARK, "", cursor):
+                return
+
+            watermark = (date(*map(int, due_date.split("-"))) + timedelta(days=COLD_MARGIN)).isoformat()
+            self.promote_cold_cards(USED_CARD_DUE_DATE + "<=?", (watermark,), cursor)
+
+            condition = " WHERE " + USED_CARD_SHELF + ">=? AND " + USED_CARD_DUE_DATE + ">?;"
+            cursor.execute("INSERT INTO " + TABLE_COLD_CARD + " SELECT * FROM " + TABLE_USED_CARD + condition,
+                           (MAX_SHELF, watermark))
+            cursor.execute("DELETE FROM " + TABLE_USED_CARD + condition, (MAX_SHELF, watermark))
+            self.set_setting(SETTING_COLD_WATERMARK, watermark, cursor)
+
+    def promote_cold_cards(self, condition: str, parameters: tuple, cursor: Cursor) -> int:
+        """
+        Moves the cold cards matching a condition back to used_card. The caller has to commit.
+        :param condition: an SQL condition on the cold cards
+        :param parameters: the parameters of the condition
+        :param cursor: the cursor to be used to access the database
+        :return: the amount of moved cards
+        """
+        cursor.execute("INSERT INTO " + TABLE_USED_CARD + " SELECT * FROM " + TABLE_COLD_CARD
+                       + " WHERE " + condition + ";", parameters)
+        cursor.execute("DELETE FROM " + TABLE_COLD_CARD + " WHERE " + condition + ";", parameters)
+        return cursor.rowcount
+
+    def promote_all_cold_cards(self, cursor: Cursor):
+        """
+        Moves all cold cards back to used_card before a bulk update, the next rotate_cold_cards moves them out again.
+        The caller has to commit.
+        :param cursor: the cursor to be used to access the database
+        """
+        self.promote_cold_cards("1", (), cursor)
+        self.set_setting(SETTING_COLD_WATERMARK, "", cursor)
+
+    #######
+    # review history and settings
+
+    def get_reviews(self, card_id: int, cursor: Cursor = None) -> List[Review]:
+        """
+        Fetches the reviews of a card.
+        :param card_id: the cards id
+        :param cursor: the cursor to be used to access the database
+        :return: a list of 3-tuples (review_date, shelf before the review, outcome), oldest first
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            reviews = self.get_reviews(card_id, cur)
+            db.close()
+            return reviews
+
+        # a cursor was passed on
+        else:
+            return cursor.execute("SELECT " + ",".join((REVIEW_DATE, REVIEW_SHELF, REVIEW_OUTCOME))
+                                  + " FROM " + TABLE_REVIEW + " WHERE " + CARD_ID + "=? ORDER BY " + REVIEW_ID + ";",
+                                  (card_id,)).fetchall()
+
+    def get_all_reviews(self, cursor: Cursor = None) -> Dict[int, List[Review]]:
+        """
+        Fetches the reviews of all cards.
+        :param cursor: the cursor to be used to access the database
+        :return: a dict mapping card_ids to lists of reviews as returned by get_reviews
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            reviews = self.get_all_reviews(cur)
+            db.close()
+            return reviews
+
+        # a cursor was passed on
+        else:
+            reviews = {}
+            for card_id, *review in cursor.execute("SELECT " + ",".join((CARD_ID, REVIEW_DATE, REVIEW_SHELF,
+                                                                         REVIEW_OUTCOME))
+                                                   + " FROM " + TABLE_REVIEW + " ORDER BY " + REVIEW_ID + ";"):
+                reviews.setdefault(card_id, []).append(tuple(review))
+            return reviews
+
+    def get_setting(self, name: str, default: str = None, cursor: Cursor = None) -> str:
+        """
+        Fetches a setting of the user.
+        :param name: the settings name
+        :param default: returned if the setting was not set
+        :param cursor: the cursor to be used to access the database
+        :return: the settings value
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            value = self.get_setting(name, default, cur)
+            db.close()
+            return value
+
+        # a cursor was passed on
+        else:
+            row = cursor.execute("SELECT " + SETTING_VALUE + " FROM " + TABLE_SETTING + " WHERE " + SETTING_NAME
+                                 + "=?;", (name,)).fetchone()
+            return default if row is None else row[0]
+
+    def set_setting(self, name: str, value: str, cursor: Cursor = None):
+        """
+        Saves a setting of the user.
+        :param name: the settings name
+        :param value: the settings value
+        :param cursor: the cursor to be used to access the database
+        """
+
+        # if no cursor was passed on, open the database and call the method recursively with a new cursor object
+        if cursor is None:
+            db = self.get_connection()
+            cur = db.cursor()
+            self.set_setting(name, value, cur)
+            db.commit()
+            db.close()
+
+        # a cursor was passed on
+        else:
+            cursor.execute("INSERT OR REPLACE INTO " + TABLE_SETTING + "(" + SETTING_NAME + "," + SETTING_VALUE
+                           + ") VALUES (?,?);", (name, value))
@@ -0,0 +1,247 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Keeps the databases of many users open at the same time.
+Instantiate UserSessionManager and call get_udm or session to access the database of a user.
+Each user has a database file of their own, unless the shared user database exists.
+"""
+
+from data.sharedUserDatabaseManager import SharedUserDatabaseManager
+from data.userDatabaseConstants import SHARED_DATABASE
+from data.userDatabaseManager import UserDatabaseManager
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from os import listdir, stat
+from os.path import exists, join
+from re import match
+from threading import Lock, RLock
+from time import monotonic
+from typing import Callable, Dict, Iterator, List, Optional, Set
+
+MAX_OPEN_USERS = 64
+IDLE_TIMEOUT = 300.0  # seconds
+DATABASE_SUFFIX = ".sqlite3"
+RESERVED_NAMES = {"data", SHARED_DATABASE[:-len(DATABASE_SUFFIX)]}  # the card database and the shared user database
+
+
+class NoSuchUserError(KeyError):
+    """
+    Raised when the database of a user that does not exist is requested.
+    """
+
+
+class UserSession:
+    """
+    The open database of a user.
+    """
+
+    def __init__(self, udm: UserDatabaseManager):
+        self.udm = udm
+        self.lock = RLock()  # held while a thread works with the database
+        self.last_used = monotonic()
+
+
+class UserSessionManager:
+    """
+    Keeps the databases of the most recently used users open, up to MAX_OPEN_USERS of them.
+    Databases not used for IDLE_TIMEOUT seconds are closed.
+    A UserDatabaseManager stays usable after its session was closed, it just opens a new connection per call again.
+    """
+
+    def __init__(self, directory: str = ".", max_open_users: int = MAX_OPEN_USERS,
+                 idle_timeout: float = IDLE_TIMEOUT, shared: bool = None,
+                 on_close: Optional[Callable[[str], None]] = None):
+        """
+        Initialize the UserSessionManager.
+        :param directory: the directory containing the user databases
+        :param max_open_users: the maximum amount of databases kept open
+        :param idle_timeout: the seconds after which an unused database is closed
+        :param shared: True to use the shared user database, defaults to True if it exists
+        :param on_close: called with the user name after a session was evicted or closed, holding self.lock
+        """
+        self.directory = directory
+        self.shared = exists(join(directory, SHARED_DATABASE)) if shared is None else shared
+        self.max_open_users = max_open_users
+        self.idle_timeout = idle_timeout
+        self.on_close = on_close
+
+        self.lock = Lock()
+        self.sessions = OrderedDict()  # type: Dict[str, UserSession]  # least recently used first
+        self.checked = set()  # type: Set[str]  # users whose database schema was checked in this process
+
+        self.user_names = set()  # type: Set[str]
+        self.directory_version = None
+
+    #######
+    # user registry
+
+    def get_user_names(self) -> List[str]:
+        """
+        Returns all available user_names. The directory is only read again if it changed.
+        :return: a sorted list of names
+        """
+        with self.lock:
+            self.refresh_user_names()
+            return sorted(self.user_names)
+
+    def user_exists(self, user_name: str) -> bool:
+        """
+        Checks whether a user exists.
+        :param user_name: the users name
+        :return: True/False
+        """
+        with self.lock:
+            self.refresh_user_names()
+            return user_name in self.user_names
+
+    def refresh_user_names(self):
+        """
+        Reads the user names again if the directory or the shared database changed since the last call.
+        Requires self.lock.
+        """
+        path = join(self.directory, SHARED_DATABASE) if self.shared else self.directory
+        if not exists(path):
+            self.user_names = set()
+            self.directory_version = None
+            return
+
+        path_stat = stat(path)
+        version = path_stat.st_mtime_ns, path_stat.st_ino, path_stat.st_size
+        if version == self.directory_version:
+            return
+
+        self.directory_version = version
+        if self.shared:
+            self.user_names = set(SharedUserDatabaseManager.get_user_names(path))
+        else:
+            self.user_names = set(file_name[:-len(DATABASE_SUFFIX)] for file_name in listdir(self.directory)
+                                  if file_name.endswith(DATABASE_SUFFIX)
+                                  and file_name[:-len(DATABASE_SUFFIX)] not in RESERVED_NAMES | {""})
+
+    #######
+    # sessions
+
+    def get_udm(self, user_name: str, create: bool = False) -> UserDatabaseManager:
+        """
+        Returns the database of a user, opening it if necessary.
+        The UserDatabaseManager must not be used by several threads at the same time, see session.
+        :param user_name: the users name
+        :param create: True to create the users database if it does not exist
+        :raises NoSuchUserError: when the user does not exist and create is False
+        :return: the UserDatabaseManager
+        """
+        return self.get_session(user_name, create).udm
+
+    @contextmanager
+    def session(self, user_name: str, create: bool = False) -> Iterator[UserDatabaseManager]:
+        """
+        Provides the database of a user to one thread at a time.
+        The database is not closed by the eviction while the with-block runs.
+        :param user_name: the users name
+        :param create: True to create the users database if it does not exist
+        :raises NoSuchUserError: when the user does not exist and create is False
+        """
+        user_session = self.get_session(user_name, create)
+        with user_session.lock:
+            user_session.last_used = monotonic()
+            yield user_session.udm
+
+    def get_session(self, user_name: str, create: bool) -> UserSession:
+        """
+        Returns the UserSession of a user, opening it and evicting other sessions if necessary.
+        :param user_name: the users name
+        :param create: True to create the users database if it does not exist
+        :raises NoSuchUserError: when the user does not exist and create is False
+        :return: the UserSession
+        """
+        with self.lock:
+            user_session = self.sessions.get(user_name)
+            if user_session is not None:
+                self.sessions.move_to_end(user_name)
+                user_session.last_used = monotonic()
+                self.evict()
+                return user_session
+
+            if not match(r"^[\w\-. ]+$", user_name) or user_name in RESERVED_NAMES:
+                raise ValueError("Invalid user name: {}".format(user_name))
+            self.refresh_user_names()
+            if user_name not in self.user_names and not create:
+                raise NoSuchUserError(user_name)
+            check_schema = user_name not in self.checked or user_name not in self.user_names
+
+        # other users can be served while the database is opened
+        udm_class = SharedUserDatabaseManager if self.shared else UserDatabaseManager
+        udm = udm_class(user_name, check_schema, self.directory)
+        udm.keep_connection()
+        user_session = UserSession(udm)
+
+        with self.lock:
+            if self.sessions.get(user_name, user_session) is not user_session:
+                # another thread opened the database in the meantime
+                user_session.udm.close_connection()
+                user_session = self.sessions[user_name]
+            self.sessions[user_name] = user_session
+            self.sessions.move_to_end(user_name)
+            user_session.last_used = monotonic()
+            self.checked.add(user_name)
+            self.user_names.add(user_name)
+
+            self.evict()
+            return user_session
+
+    def evict(self):
+        """
+        Closes the least recently used sessions above max_open_users and all idle sessions. Requires self.lock.
+        Sessions in use by a thread are skipped.
+        """
+        now = monotonic()
+        for user_name, user_session in list(self.sessions.items()):
+            if len(self.sessions) <= self.max_open_users and now - user_session.last_used < self.idle_timeout:
+                break  # all remaining sessions were used more recently
+            if user_session.lock.acquire(blocking=False):
+                try:
+                    user_session.udm.close_connection()
+                    del self.sessions[user_name]
+                finally:
+                    user_session.lock.release()
+                if self.on_close is not None:
+                    self.on_close(user_name)
+
+    def close(self, user_name: str = None):
+        """
+        Closes the session of a user or all sessions.
+        :param user_name: the users name, None to close all sessions
+        """
+        with self.lock:
+            for name in ([user_name] if user_name is not None else list(self.sessions)):
+                user_session = self.sessions.pop(name, None)
+                if user_session is not None:
+                    with user_session.lock:
+                        user_session.udm.close_connection()
+                    if self.on_close is not None:
+                        self.on_close(name)
+
+    def is_open(self, user_name: str) -> bool:
+        """
+        Checks whether the database of a user is open, without waiting for self.lock.
+        :param user_name: the users name
+        :return: True/False
+        """
+        return user_name in self.sessions
@@ -20,6 +20,7 @@ Provides language specific classes.
 """
 
 from language.abc import Phrase
+from language.folding import fold
 from language.latin import LatinPhrase, Latin
 from language.german import GermanPhrase, German
 
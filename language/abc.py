@@ -19,7 +19,7 @@
 Provides abstract base classes for all languages.
 """
 
-from typing import List
+from typing import List, Tuple
 
 
 class Language:
@@ -73,3 +73,12 @@ class Phrase:
         :return: a list of strings
         """
         raise NotImplementedError
+
+    @staticmethod
+    def get_search_terms(phrase: str) -> List[Tuple[List[str], bool]]:
+        """
+        Splits a phrase description into words and returns the normalized search terms for each word.
+        :param phrase: the phrase description
+        :return: a list of (terms, optional) tuples, one for each word
+        """
+        raise NotImplementedError
@@ -0,0 +1,36 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Provides the folding of phrases into language independent search keys.
+"""
+
+from re import sub
+from unicodedata import combining, normalize
+
+
+def fold(string: str) -> str:
+    """
+    Folds a string into its search key:
+    Diacritics like macrons and umlauts are removed, the string is case-folded ('ß' -> 'ss'),
+    brackets are removed and all other punctuation is replaced by single spaces.
+    :param string: the string to be folded
+    :return: the search key
+    """
+    string = "".join(c for c in normalize("NFKD", string) if not combining(c)).casefold()
+    string = sub(r"[()\[\]'\"]", "", string)
+    return " ".join(sub(r"[\W_]", " ", string).split())
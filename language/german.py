@@ -20,10 +20,15 @@ Manages the parsing of german phrases.
 """
 
 from language.abc import Language, Phrase
-from typing import List
+from language.folding import fold
+
+from re import findall, sub
+from typing import List, Tuple
 
 German = Language("german")
 
+TRANSCRIPTIONS = {"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"}
+
 
 class GermanPhrase(Phrase):
     """
@@ -48,5 +53,43 @@ class GermanPhrase(Phrase):
         :param string: the string to find root forms for
         :return: a list of strings
         """
-        return string
+        return []
+
+    @staticmethod
+    def get_search_terms(phrase: str) -> List[Tuple[List[str], bool]]:
+        """
+        Splits a phrase description into words and returns the normalized search terms for each word.
+        Words in standalone brackets like '(genau) erfahren' are optional,
+        words with inline brackets like '(ver)sammeln' yield both variants.
+        :param phrase: the phrase description
+        :return: a list of (terms, optional) tuples, one for each word
+        """
+        optional = findall(r"(?:^|\s)\(([^)]*)\)(?=\s|$)", phrase)
+        required = sub(r"(?:^|\s)\([^)]*\)(?=\s|$)", " ", phrase)
+
+        words = []
+        for word in findall(r"[\w()]+", required):
+            terms = []
+            for variant in (sub(r"\(([^)]*)\)", r"\1", word), sub(r"\([^)]*\)", "", word)):
+                for term in normalize_word(variant.replace("(", "").replace(")", "")):
+                    if term not in terms:
+                        terms.append(term)
+            if terms:
+                words.append((terms, False))
+        for word in findall(r"\w+", " ".join(optional)):
+            words.append((normalize_word(word), True))
+        return words
+
 
+def normalize_word(word: str) -> List[str]:
+    """
+    Returns the folded forms of a german word with umlauts replaced by their base vowel
+    and - if the word contains umlauts - with umlauts transcribed as in 'ae', 'oe', 'ue' and 'ss'.
+    :param word: the word
+    :return: a list of normalized forms, the base vowel form first
+    """
+    forms = [fold(word)]
+    transcribed = fold("".join(TRANSCRIPTIONS.get(c, c) for c in word.lower()))
+    if transcribed not in forms:
+        forms.append(transcribed)
+    return [form for form in forms if form]
@@ -26,6 +26,23 @@ from typing import List
 
 Latin = Language("latin")
 
+MIN_STEM_LENGTH = 2
+
+# (inflected ending, ending of the root form), only regular a-, e-, i-, o- and consonant conjugations/declensions
+ENDINGS = [
+    # verbs: present and imperfect active -> infinitive
+    ("o", "are"), ("as", "are"), ("at", "are"), ("amus", "are"), ("atis", "are"), ("ant", "are"),
+    ("abam", "are"), ("abat", "are"), ("abant", "are"),
+    ("eo", "ere"), ("es", "ere"), ("et", "ere"), ("emus", "ere"), ("etis", "ere"), ("ent", "ere"),
+    ("ebam", "ere"), ("ebat", "ere"), ("ebant", "ere"),
+    ("o", "ere"), ("is", "ere"), ("it", "ere"), ("imus", "ere"), ("itis", "ere"), ("unt", "ere"),
+    ("io", "ire"), ("is", "ire"), ("it", "ire"), ("imus", "ire"), ("itis", "ire"), ("iunt", "ire"),
+    # nouns and adjectives -> nominative singular
+    ("ae", "a"), ("am", "a"), ("arum", "a"), ("is", "a"), ("as", "a"),
+    ("i", "us"), ("o", "us"), ("um", "us"), ("orum", "us"), ("os", "us"), ("e", "us"),
+    ("i", "um"), ("o", "um"), ("a", "um"), ("orum", "um"), ("is", "um"),
+]
+
 
 class LatinPhrase(Phrase):
     """
@@ -58,8 +75,14 @@ class LatinPhrase(Phrase):
         :param string: the string to find root forms for
         :return: a list of strings
         """
-        raise NotImplementedError
-        # todo implement get possible root forms
+        string = string.strip(" ").lower()
+        root_forms = []
+        for ending, root_ending in ENDINGS:
+            if string.endswith(ending) and len(string) - len(ending) >= MIN_STEM_LENGTH:
+                root_form = string[:len(string) - len(ending)] + root_ending
+                if root_form != string and root_form not in root_forms:
+                    root_forms.append(root_form)
+        return root_forms
 
     def is_word(self):
         """
@@ -0,0 +1,161 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Load-tests the review server with many concurrent sessions, each of them a user reviewing the cards of a group.
+The server runs in this process on a copy of the card database in a temporary directory;
+the sessions talk to it over real HTTP connections.
+Usage: python load_test_server.py [session_count [reviews_per_session]]
+"""
+
+from os import chdir
+from os.path import abspath, dirname, join
+from random import Random
+from shutil import copy
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Dict, List, Tuple
+import asyncio
+import json
+import sys
+
+CORRECT_RATE = 0.8  # the share of cards answered correctly
+
+
+class Session:
+    """
+    A user talking to the server over a keep-alive connection.
+    """
+
+    def __init__(self, port: int, user_name: str):
+        self.port = port
+        self.user_name = user_name
+        self.reader = None
+        self.writer = None
+        self.latencies = []  # type: List[float]
+        self.statuses = {}  # type: Dict[int, int]
+
+    async def request(self, method: str, action: str, data: Dict = None) -> Tuple[int, Dict]:
+        """
+        Sends a request and waits for the response.
+        :return: the status and the response object
+        """
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+
+        body = json.dumps(data).encode("utf-8") if data is not None else b""
+        start = perf_counter()
+        self.writer.write("{} /users/{}/{} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {}\r\n\r\n"
+                          .format(method, self.user_name, action, len(body)).encode("latin-1") + body)
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        response = json.loads(await self.reader.readexactly(length))
+
+        self.latencies.append(perf_counter() - start)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        return status, response
+
+    async def run(self, group_name: str, reviews: int, solutions: Dict[int, List[str]], random: Random):
+        """
+        Uses a group and reviews its due cards.
+        :param group_name: the group to be used
+        :param reviews: the amount of cards to review
+        :param solutions: card_id -> the correct answers
+        :param random: the random number generator
+        """
+        await self.request("POST", "use", {"group": group_name})
+        for _ in range(reviews):
+            _, response = await self.request("GET", "next")
+            if response.get("card") is None:
+                break
+            card_id = response["card"]["card_id"]
+            answers = solutions[card_id]
+            if random.random() > CORRECT_RATE:
+                answers = ["falsch"] * len(answers)
+            await self.request("POST", "answer", {"card_id": card_id, "answers": answers})
+        self.writer.close()
+
+
+async def run_sessions(session_count: int, reviews: int) -> List[Session]:
+    """
+    Starts the server and runs all sessions concurrently.
+    :return: the finished sessions
+    """
+    import server
+    from data import database_manager
+
+    catalog = server.Catalog()
+    catalog.load()
+    solutions = {card_id: [", ".join(sorted(prompt.solution)) for prompt in prompts]
+                 for card_id, prompts in catalog.prompts.items()}
+    group_names = sorted(database_manager.get_all_group_names())
+
+    review_server = server.ReviewServer(catalog)
+    tcp_server = await asyncio.start_server(review_server.handle_connection, "127.0.0.1", 0)
+    port = tcp_server.sockets[0].getsockname()[1]
+
+    random = Random(0)
+    sessions = [Session(port, "load-{}".format(i)) for i in range(session_count)]
+    try:
+        await asyncio.gather(*(session.run(random.choice(group_names), reviews, solutions, Random(i))
+                               for i, session in enumerate(sessions)))
+    finally:
+        tcp_server.close()
+        await tcp_server.wait_closed()
+        review_server.close()
+    return sessions
+
+
+def main(session_count: int, reviews: int):
+    """
+    Runs the load test.
+    :param session_count: the amount of concurrent sessions
+    :param reviews: the amount of cards each session reviews
+    """
+    with TemporaryDirectory() as directory:
+        copy(join(dirname(abspath(__file__)), "data.sqlite3"), directory)
+        chdir(directory)
+
+        start = perf_counter()
+        sessions = asyncio.run(run_sessions(session_count, reviews))
+        duration = perf_counter() - start
+
+    latencies = sorted(latency for session in sessions for latency in session.latencies)
+    statuses = {}
+    for session in sessions:
+        for status, count in session.statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+
+    print("{} sessions sent {} requests in {:.2f}s: {:.0f} requests/s".format(
+        session_count, len(latencies), duration, len(latencies) / duration))
+    print("latency p50 {:.1f} ms, p95 {:.1f} ms, p99 {:.1f} ms, max {:.1f} ms".format(
+        *(1000 * latencies[min(len(latencies) - 1, int(len(latencies) * q))] for q in (0.5, 0.95, 0.99, 1))))
+    print("status:", ", ".join("{} {}".format(count, status) for status, count in sorted(statuses.items())))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200, int(sys.argv[2]) if len(sys.argv) > 2 else 20)
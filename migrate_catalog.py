@@ -0,0 +1,42 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Brings the card database data.sqlite3 up to date with the schema of this version of lHelper.
+lHelper migrates an outdated card database when it opens it, run this to migrate it ahead of time.
+Running the migration again does no harm.
+Usage: python migrate_catalog.py
+"""
+
+from data.databaseManager import DatabaseManager
+
+
+def main():
+    """
+    Migrates the card database in the working directory.
+    """
+    database_manager = DatabaseManager(check_schema=False)
+    if not database_manager.is_outdated():
+        print("{} is up to date.".format(database_manager.db_name))
+        return
+
+    database_manager.migrate()
+    print("{} migrated.".format(database_manager.db_name))
+
+
+if __name__ == "__main__":
+    main()
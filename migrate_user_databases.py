@@ -0,0 +1,61 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Imports the user databases <user_name>.sqlite3 into the shared user database users.sqlite3.
+Once users.sqlite3 exists, lHelper uses it instead of the files of the single users.
+Running the migration again replaces the imported cards, reviews and settings with the ones in the files.
+Usage: python migrate_user_databases.py [directory]
+"""
+
+from data.sharedUserDatabaseManager import SharedUserDatabaseManager
+from data.userDatabaseConstants import SETTING_SCHEDULER, SHARED_DATABASE
+from data.userDatabaseManager import UserDatabaseManager
+from data.userSessionManager import UserSessionManager
+
+from os.path import join
+import sys
+
+
+def main(directory: str):
+    """
+    Imports all user databases in directory.
+    :param directory: the directory containing the user databases
+    """
+    user_names = UserSessionManager(directory, shared=False).get_user_names()
+    if not user_names:
+        print("No user databases found in {}.".format(directory))
+        return
+
+    for user_name in user_names:
+        udm = UserDatabaseManager(user_name, directory=directory)
+        shared = SharedUserDatabaseManager(user_name, directory=directory)
+        cards = udm.get_all_cards()
+        shared.import_cards(cards)
+        shared.import_reviews(udm.get_all_reviews())
+        scheduler = udm.get_setting(SETTING_SCHEDULER)
+        if scheduler is not None:
+            shared.set_setting(SETTING_SCHEDULER, scheduler)
+        print("{}: imported {} cards".format(user_name, len(cards)))
+
+    print("{} users imported into {}.".format(len(user_names), join(directory, SHARED_DATABASE)))
+    print("lHelper uses the shared database from now on, the files of the single users can be removed.")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else ".")
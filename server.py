@@ -0,0 +1,461 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+A local HTTP server letting several users review their cards at the same time.
+Request and response bodies are JSON objects:
+
+GET  /users/<user_name>/due     the ids of the users due cards
+GET  /users/<user_name>/next    the next due card and the prompts to answer
+POST /users/<user_name>/answer  {"card_id": <card_id>, "answers": [<answer>, ...], "forward": false}
+                                grades the answers and moves the card to its new shelf
+POST /users/<user_name>/use     {"group": <group_name>} adds all cards selected by the group expression
+                                to the users cards, see data.groupExpression
+
+The cards are loaded once and shared by all users, the databases of recent users are kept open.
+All database work runs in a thread pool, so the event loop never waits for SQLite.
+Start the server by calling serve.
+"""
+
+from data import database_manager
+from data.cardManager import Card, CardManager, UsedCard
+from data.grading import get_prompts, grade, Prompt, CORRECT, AGAIN, WRONG
+from data.userDatabaseManager import UserDatabaseManager, CardNotUsedError
+from data.userSessionManager import NoSuchUserError, UserSessionManager, RESERVED_NAMES
+
+from concurrent.futures import ThreadPoolExecutor
+from re import match
+from time import strftime
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+import asyncio
+import json
+import logging
+
+HOST = "127.0.0.1"
+PORT = 8080
+WORKER_COUNT = 8
+MAX_OPEN_USERS = 256
+MAX_BODY_SIZE = 1 << 16
+
+RESULT_NAMES = {WRONG: "wrong", AGAIN: "again", CORRECT: "correct"}
+logger = logging.getLogger(__name__)
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    """
+    Raised to answer a request with an error status.
+    """
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class Catalog:
+    """
+    A snapshot of all cards, shared by all users.
+    """
+
+    def __init__(self):
+        self.translations = {}  # type: Dict[int, List[Tuple[str, str, str, str]]]
+        self.cards = {}  # type: Dict[int, Card]
+        self.prompts = {}  # type: Dict[int, List[Prompt]]
+
+    def load(self):
+        """
+        Loads all cards from the database.
+        """
+        card_ids = database_manager.get_all_card_ids()
+        groups = database_manager.get_group_names_for_cards(card_ids)
+        for card_id, translations in database_manager.get_cards(card_ids):
+            self.translations[card_id] = translations
+            self.cards[card_id] = Card(card_id, translations, groups[card_id])
+            self.prompts[card_id] = get_prompts(self.cards[card_id])
+
+        # the thread pool only reads the group bitmaps
+        database_manager.get_group_bitmaps()
+
+    def get_used_card(self, card_id: int, shelf: int, due_date: str) -> UsedCard:
+        """
+        Creates a UsedCard for a card in the catalog.
+        :param card_id: the cards id
+        :param shelf: the shelf the card is on
+        :param due_date: the cards due date
+        :return: the UsedCard
+        """
+        return UsedCard(card_id, shelf, due_date, self.translations[card_id], self.cards[card_id].get_groups())
+
+    def get_group_card_ids(self, group_name: str, udm: UserDatabaseManager) -> List[int]:
+        """
+        Returns the ids of all cards selected by a group expression. Called from the thread pool.
+        :param group_name: the group expression, see data.groupExpression
+        :param udm: the database of the user whose shelves are selected
+        :raises HTTPError: when the expression is malformed or a group does not exist
+        :return: a sorted list of card_ids
+        """
+        try:
+            return list(CardManager.get_group_card_ids(group_name, udm))
+        except ValueError as error:
+            raise HTTPError(404, str(error))
+
+
+class ReviewServer:
+    """
+    Answers the requests of all users.
+    """
+
+    def __init__(self, catalog: Catalog, worker_count: int = WORKER_COUNT, max_open_users: int = MAX_OPEN_USERS):
+        """
+        Initialize the ReviewServer.
+        :param catalog: the loaded catalog
+        :param worker_count: the amount of threads doing the database work
+        :param max_open_users: the maximum amount of user databases kept open
+        """
+        self.catalog = catalog
+        self.executor = ThreadPoolExecutor(worker_count)
+        self.sessions = UserSessionManager(max_open_users=max_open_users, on_close=self.session_closed)
+        self.locks = {}  # type: Dict[str, asyncio.Lock]  # requests of the same user wait for each other
+        self.pending = {}  # type: Dict[str, int]  # the amount of requests of a user waiting for or holding its lock
+        self.loop = None  # type: Optional[asyncio.AbstractEventLoop]
+        self.routes = {
+            ("GET", "due"): self.get_due,
+            ("GET", "next"): self.get_next,
+            ("POST", "answer"): self.post_answer,
+            ("POST", "use"): self.post_use,
+        }
+
+    def close(self):
+        """
+        Closes the databases of all users and stops the thread pool.
+        """
+        self.executor.shutdown()
+        self.sessions.close()
+
+    async def run_in_thread(self, function, *args):
+        """
+        Runs function in the thread pool.
+        :return: the result of function
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    #######
+    # HTTP
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Answers the requests on a connection until the client closes it.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    await self.send(writer, 400, {"error": "Malformed request."}, False)
+                    break
+                if length > MAX_BODY_SIZE:
+                    await self.send(writer, 413, {"error": "Request body too large."}, False)
+                    break
+
+                body = await reader.readexactly(length)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                status, response = await self.respond(method, target, body)
+                await self.send(writer, status, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # the client went away
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def send(writer: asyncio.StreamWriter, status: int, response: Dict, keep_alive: bool):
+        """
+        Sends a JSON response.
+        """
+        body = json.dumps(response, ensure_ascii=False).encode("utf-8")
+        writer.write("HTTP/1.1 {} {}\r\nContent-Type: application/json; charset=utf-8\r\nContent-Length: {}\r\n{}\r\n"
+                     .format(status, REASONS[status], len(body), "" if keep_alive else "Connection: close\r\n")
+                     .encode("latin-1") + body)
+        await writer.drain()
+
+    async def respond(self, method: str, target: str, body: bytes) -> Tuple[int, Dict]:
+        """
+        Routes a request to its handler.
+        :param method: the HTTP method
+        :param target: the requested path
+        :param body: the request body
+        :return: the status and the response object
+        """
+        try:
+            parts = [unquote(part) for part in urlsplit(target).path.strip("/").split("/")]
+            if len(parts) != 3 or parts[0] != "users" or not any(action == parts[2] for _, action in self.routes):
+                raise HTTPError(404, "Unknown path {}.".format(target))
+            _, user_name, action = parts
+            if (method, action) not in self.routes:
+                raise HTTPError(405, "Use {} for {}.".format(
+                    " or ".join(m for m, a in self.routes if a == action), action))
+
+            try:
+                data = json.loads(body) if body else {}
+            except ValueError:
+                raise HTTPError(400, "The request body is no valid JSON.")
+            if not isinstance(data, dict):
+                raise HTTPError(400, "The request body has to be a JSON object.")
+
+            return 200, await self.routes[method, action](user_name, data)
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except Exception:
+            logger.exception("%s %s failed", method, target)
+            return 500, {"error": "Internal server error."}
+
+    #######
+    # users
+
+    async def run_for_user(self, user_name: str, function: Callable, *args, create: bool = False):
+        """
+        Runs function(udm, *args) in the thread pool with the database of a user.
+        Only one function at a time runs for each user.
+        :param user_name: the users name
+        :param function: called with the users UserDatabaseManager and args
+        :param create: True to create the user if it does not exist
+        :raises HTTPError: when the user does not exist or the name is invalid
+        :return: the result of function
+        """
+        if not match(r"^[\w\-. ]+$", user_name) or user_name in RESERVED_NAMES:
+            raise HTTPError(400, "Invalid user name. Only use a-z, A-Z, 0-9, _, -, .")
+
+        self.loop = asyncio.get_running_loop()
+        lock = self.locks.get(user_name)
+        if lock is None:
+            lock = self.locks[user_name] = asyncio.Lock()
+        self.pending[user_name] = self.pending.get(user_name, 0) + 1
+        try:
+            async with lock:
+                return await self.run_in_thread(self.call_with_udm, user_name, create, function, *args)
+        finally:
+            self.pending[user_name] -= 1
+            if not self.pending[user_name]:
+                del self.pending[user_name]
+                if not self.sessions.is_open(user_name):  # the user does not exist or was evicted meanwhile
+                    self.drop_lock(user_name)
+
+    def session_closed(self, user_name: str):
+        """
+        Drops the lock of a user whose database was closed. Called by the session manager from any thread.
+        """
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.drop_lock, user_name)
+
+    def drop_lock(self, user_name: str):
+        """
+        Drops the lock of a user unless a request of the user waits for it or holds it.
+        """
+        if user_name not in self.pending:
+            self.locks.pop(user_name, None)
+
+    def call_with_udm(self, user_name: str, create: bool, function: Callable, *args):
+        """
+        Calls function(udm, *args) with the database of a user. Called from the thread pool.
+        """
+        try:
+            with self.sessions.session(user_name, create) as udm:
+                return function(udm, *args)
+        except NoSuchUserError:
+            raise HTTPError(404, "User {} does not exist.".format(user_name))
+
+    #######
+    # requests
+
+    async def get_due(self, user_name: str, data: Dict) -> Dict:
+        """
+        Returns the ids of the users due cards, earliest due first.
+        """
+        cards = await self.run_for_user(user_name, get_due_cards)
+        return {"user": user_name, "due": [card_id for card_id, _, _ in sorted(cards, key=lambda c: (c[2], c[0]))]}
+
+    async def get_next(self, user_name: str, data: Dict) -> Dict:
+        """
+        Returns the earliest due card of the user and its prompts, or null if no card is due.
+        """
+        card, due = await self.run_for_user(user_name, get_next_due_card)
+        if card is None:
+            return {"user": user_name, "due": 0, "card": None}
+
+        card_id, shelf, due_date = card
+        return {"user": user_name, "due": due, "card": {
+            "card_id": card_id, "shelf": shelf, "due_date": due_date,
+            "groups": sorted(self.catalog.cards[card_id].get_groups()),
+            "prompts": [prompt.text for prompt in self.catalog.prompts[card_id]]}}
+
+    async def post_answer(self, user_name: str, data: Dict) -> Dict:
+        """
+        Grades the answers to a card and moves the card like a questioning in the CLI would.
+        Set forward to true to accept the answers despite mistakes.
+        """
+        card_id, answers = data.get("card_id"), data.get("answers")
+        if not isinstance(card_id, int) or card_id not in self.catalog.cards:
+            raise HTTPError(404, "Card {} does not exist.".format(card_id))
+        if not isinstance(answers, list) or not all(isinstance(answer, str) for answer in answers):
+            raise HTTPError(400, "answers has to be a list of strings.")
+
+        try:
+            result = grade(self.catalog.cards[card_id], answers, self.catalog.prompts[card_id])
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        outcome = CORRECT if data.get("forward") else result.get_result()
+
+        card, outcome = await self.run_for_user(user_name, self.reschedule, card_id, outcome)
+
+        return {"user": user_name, "card_id": card_id, "mistakes": result.mistakes,
+                "result": RESULT_NAMES[outcome], "shelf": card.get_shelf(), "due_date": card.get_due_date(),
+                "verdicts": [{"prompt": verdict.prompt.text, "answer": verdict.answer, "typos": verdict.typos,
+                              "wrong": verdict.wrong, "missing": verdict.missing} for verdict in result.verdicts]}
+
+    def reschedule(self, udm: UserDatabaseManager, card_id: int, outcome: int) -> Tuple[UsedCard, int]:
+        """
+        Moves a card according to the outcome of its questioning. Called from the thread pool.
+        Cards below CardManager.MIN_AGAIN_SHELF get no second chance, AGAIN counts as WRONG for them.
+        :return: the moved card and the outcome applied
+        """
+        try:
+            card = self.catalog.get_used_card(*udm.get_card(card_id))
+        except CardNotUsedError as e:
+            raise HTTPError(404, str(e))
+
+        if outcome == CORRECT:
+            CardManager.correct(card, udm)
+        elif outcome == AGAIN and card.shelf >= CardManager.MIN_AGAIN_SHELF:
+            CardManager.again(card, udm)
+        else:
+            CardManager.wrong(card, udm)
+            outcome = WRONG
+        return card, outcome
+
+    async def post_use(self, user_name: str, data: Dict) -> Dict:
+        """
+        Adds all cards selected by a group expression to the users cards. Creates the user if necessary.
+        """
+        group_name = data.get("group")
+        if not isinstance(group_name, str):
+            raise HTTPError(400, "group has to be a group name.")
+
+        # no user is created for an unknown group, the group bitmaps are loaded already
+        if not CardManager.group_name_exists(group_name):
+            raise HTTPError(404, "Group {} does not exist.".format(group_name))
+        cards, added = await self.run_for_user(user_name, use_group, self.catalog, group_name, create=True)
+        return {"user": user_name, "group": group_name, "cards": cards, "added": added}
+
+
+def get_due_cards(udm: UserDatabaseManager) -> List[Tuple[int, int, str]]:
+    """
+    Returns the cards due today, a client questions them next. Called from the thread pool.
+    :param udm: the users database
+    :return: a list of 3-tuples representing the cards (id, shelf, due_date)
+    """
+    udm.rotate_cold_cards()
+    return udm.get_due_cards()
+
+
+def get_next_due_card(udm: UserDatabaseManager) -> Tuple[Optional[Tuple[int, int, str]], int]:
+    """
+    Returns the longest overdue card from the users due queue. Called from the thread pool.
+    :param udm: the users database
+    :return: a 3-tuple (id, shelf, due_date) representing the card or None, and the amount of due cards
+    """
+    today = strftime("%Y-%m-%d")
+    return udm.get_next_due_card(today), udm.get_due_histogram().count_until(today)
+
+
+def use_group(udm: UserDatabaseManager, catalog: Catalog, group_name: str) -> Tuple[int, int]:
+    """
+    Adds the cards selected by a group expression to the users cards. Called from the thread pool.
+    :param udm: the users database
+    :param catalog: the catalog
+    :param group_name: the group expression, see data.groupExpression
+    :raises HTTPError: when the expression is malformed or a group does not exist
+    :return: the amount of selected cards and the amount of cards added
+    """
+    card_ids = catalog.get_group_card_ids(group_name, udm)
+    return len(card_ids), use_cards(udm, card_ids)
+
+
+def use_cards(udm: UserDatabaseManager, card_ids: List[int]) -> int:
+    """
+    Adds the cards not used yet to the users cards, in a single transaction. Called from the thread pool.
+    :param udm: the users database
+    :param card_ids: the cards to be used
+    :return: the amount of cards added
+    """
+    used = set(card_id for card_id, _, _ in udm.get_cards(card_ids))
+    new = [card_id for card_id in card_ids if card_id not in used]
+
+    db = udm.get_connection()
+    try:
+        cur = db.cursor()
+        for card_id in new:
+            udm.add_card(card_id, CardManager.DEFAULT_SHELF, "today", cur)
+        db.commit()
+    finally:
+        db.close()
+    return len(new)
+
+
+async def run(server: ReviewServer, host: str, port: int):
+    """
+    Serves requests until cancelled.
+    """
+    tcp_server = await asyncio.start_server(server.handle_connection, host, port)
+    print("Serving on http://{}:{}/users/<user_name>/(due|next|answer|use)".format(host, port))
+    async with tcp_server:
+        await tcp_server.serve_forever()
+
+
+def serve(host: str = HOST, port: int = PORT, worker_count: int = WORKER_COUNT):
+    """
+    Loads the catalog and serves requests until interrupted.
+    :param host: the address to listen on
+    :param port: the port to listen on
+    :param worker_count: the amount of threads doing the database work
+    """
+    catalog = Catalog()
+    catalog.load()
+    server = ReviewServer(catalog, worker_count)
+    try:
+        asyncio.run(run(server, host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
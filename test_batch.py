@@ -0,0 +1,74 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests replaying batches of commands and answers with cli.batch.
+"""
+
+import cli  # registers the commands
+import data
+from cli.batch import run
+from data.databaseManager import DatabaseManager
+
+from io import StringIO
+from json import loads
+from pytest import fixture
+
+
+@fixture
+def batch_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    database_manager = DatabaseManager()
+    database_manager.add_card([("amicus", "latin", "Freund", "german")])
+
+    # the data module opens the databases in the working directory on first use
+    monkeypatch.setattr(data.database_manager, "instance", database_manager)
+    monkeypatch.setattr(data.session_manager, "instance", None)
+    monkeypatch.setattr(data.udm_handler, "instance", None)
+    return tmp_path
+
+
+def replay(batch: str) -> list:
+    target = StringIO()
+    run(StringIO(batch), target)
+    return [loads(line) for line in target.getvalue().splitlines()]
+
+
+def test_commands(batch_directory):
+    records = replay("# a comment\n\nhelp user\nfrobnicate\nuser test\nexit\nhelp\n")
+    assert [(record["command"], record["status"]) for record in records] \
+        == [("help user", "ok"), ("frobnicate", "unknown"), ("user test", "ok"), ("exit", "exit")]
+    assert records[0]["output"][0] == "Usage: user <user_name>"
+    assert data.udm_handler.get_user() == "test"
+
+
+def test_answers(batch_directory):
+    records = replay("user test\nquestion 1\n")
+    assert records[1] == {"type": "command", "command": "question 1", "status": "ok",
+                          "output": ["Card 1 is not used."]}
+
+    data.udm_handler.get_udm().add_card(1, 1)
+    records = replay("question 1\nFreund\nquestion 1\n")
+    assert [(record["type"], record["command"]) for record in records] \
+        == [("answer", "question 1"), ("command", "question 1"), ("command", "question 1")]
+    assert (records[0]["prompt"], records[0]["answer"]) == ("amicus: ", "Freund")
+    assert records[1]["status"] == "ok"
+    assert records[1]["output"][0] == "Correct +1"
+
+    # the batch ended while the command was still waiting for an answer
+    assert records[2]["status"] == "incomplete"
+    assert not any("support" in line or "EOF" in line for line in records[2]["output"])
@@ -0,0 +1,120 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests the group bitmaps of data.databaseManager and the shelf bitmaps of data.userDatabaseManager,
+kept up to date by the methods changing the databases.
+"""
+
+from data.bitmapIndex import GroupBitmaps, ShelfBitmaps, to_bitmap
+from data.databaseConstants import GROUP_ID, GROUP_NAME, TABLE_CARD_GROUP, TABLE_GROUP
+from data.databaseManager import DatabaseManager
+from data.userDatabaseManager import UserDatabaseManager
+
+from json import dump, load
+from os import stat, utime
+from pytest import fixture
+
+
+def build_group_bitmaps(database_manager: DatabaseManager) -> GroupBitmaps:
+    group_bitmaps = GroupBitmaps()
+    group_bitmaps.build(database_manager.get_group_memberships())
+    return group_bitmaps
+
+
+@fixture
+def database_manager(tmp_path, monkeypatch) -> DatabaseManager:
+    monkeypatch.chdir(tmp_path)
+    database_manager = DatabaseManager()
+    for word in ["amicus", "amica", "amor", "clamor"]:
+        database_manager.add_card([(word, "latin", word, "german")])
+    database_manager.add_group("friends")
+    database_manager.add_group("amicus", "friends")
+    database_manager.add_card_to_group(1, "amicus")
+    database_manager.add_card_to_group(2, "friends")
+    return database_manager
+
+
+def test_group_bitmaps(database_manager):
+    group_bitmaps = database_manager.get_group_bitmaps()
+    assert group_bitmaps.get_group("friends") == to_bitmap([1, 2])
+    assert group_bitmaps.get_group("amicus") == to_bitmap([1])
+    assert group_bitmaps.get_group_names(2) == ["friends"]
+
+
+def test_incremental_group_bitmaps(database_manager):
+    group_bitmaps = database_manager.get_group_bitmaps()
+    database_manager.add_card_to_group(3, "amicus")
+    database_manager.add_card_to_group(3, "amicus")  # already in the group
+    database_manager.add_group("love", "friends")
+    database_manager.add_card_to_group(4, "love")
+    database_manager.add_card_to_group(4, "hate")  # added with the card
+
+    assert database_manager.get_group_bitmaps() is group_bitmaps
+    assert group_bitmaps.get_group("friends") == to_bitmap([1, 2, 3, 4])
+    fresh = build_group_bitmaps(database_manager)
+    assert (group_bitmaps.members, group_bitmaps.parents) == (fresh.members, fresh.parents)
+
+    # the saved bitmaps have the version of the changed database and are read instead of built again
+    loaded = GroupBitmaps.load(database_manager.bitmap_file, database_manager.get_version())
+    assert loaded is not None and loaded.members == fresh.members
+
+
+def test_stale_group_bitmaps(database_manager):
+    database_manager.get_group_bitmaps()
+
+    # another process adds a card to a group
+    db = database_manager.get_connection()
+    db.execute("INSERT INTO " + TABLE_CARD_GROUP + " SELECT " + GROUP_ID + ", 3 FROM " + TABLE_GROUP
+               + " WHERE " + GROUP_NAME + "='amicus';")
+    db.commit()
+    db.close()
+    db_stat = stat(database_manager.db_name)
+    utime(database_manager.db_name, ns=(db_stat.st_atime_ns, db_stat.st_mtime_ns + 1))
+
+    reopened = DatabaseManager()
+    assert reopened.get_group_bitmaps().get_group("amicus") == to_bitmap([1, 3])
+    with open(reopened.bitmap_file, encoding="utf-8") as file:
+        assert tuple(load(file)["version"]) == reopened.get_version()
+
+    # a damaged file is built again as well
+    with open(reopened.bitmap_file, "w", encoding="utf-8") as file:
+        dump({"version": list(reopened.get_version())}, file)
+    assert DatabaseManager().get_group_bitmaps().get_group("friends") == to_bitmap([1, 2, 3])
+
+
+def test_shelf_bitmaps():
+    shelf_bitmaps = ShelfBitmaps()
+    shelf_bitmaps.build([(1, 0, "2026-10-01"), (2, 1, "2026-10-02"), (3, 4, "2026-10-03")])
+    shelf_bitmaps.move(1, 4)
+    shelf_bitmaps.add(5, 2)
+    assert shelf_bitmaps.shelves == {0: 0, 1: to_bitmap([2]), 2: to_bitmap([5]), 4: to_bitmap([1, 3])}
+    assert shelf_bitmaps.get_used(2) == to_bitmap([1, 3, 5])
+    assert shelf_bitmaps.get_used() == to_bitmap([1, 2, 3, 5])
+
+
+def test_incremental_shelf_bitmaps(tmp_path):
+    udm = UserDatabaseManager("test", directory=str(tmp_path))
+    udm.add_card(1, 1, "2026-10-01")
+    shelf_bitmaps = udm.get_shelf_bitmaps()
+    udm.add_card(2, 1, "2026-10-02")
+    udm.update_card((1, 3, "2026-10-05"), (1, 2))
+    udm.update_cards([(2, 2, "2026-10-03")])  # drops the bitmaps
+
+    assert shelf_bitmaps.shelves == {1: to_bitmap([2]), 3: to_bitmap([1])}
+    assert udm.get_shelf_bitmaps() is not shelf_bitmaps
+    assert udm.get_shelf_bitmaps().shelves == {2: to_bitmap([2]), 3: to_bitmap([1])}
@@ -0,0 +1,97 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests the due queries over hot and cold cards and moving the due dates of many cards at once
+in data.userDatabaseManager.
+"""
+
+from data.scheduler import MAX_SHELF
+from data.userDatabaseConstants import SETTING_COLD_WATERMARK, TABLE_COLD_CARD
+from data.userDatabaseManager import UserDatabaseManager, COLD_MARGIN
+
+from datetime import date, timedelta
+
+
+def day(offset: int) -> str:
+    return (date.today() + timedelta(days=offset)).isoformat()
+
+
+def create_udm(directory, cards) -> UserDatabaseManager:
+    udm = UserDatabaseManager("test", directory=str(directory))
+    for card_id, shelf, due_date in cards:
+        udm.add_card(card_id, shelf, due_date)
+    return udm
+
+
+def count_cold_cards(udm: UserDatabaseManager) -> int:
+    db = udm.get_connection()
+    count = db.execute("SELECT COUNT(*) FROM " + TABLE_COLD_CARD + ";").fetchone()[0]
+    db.close()
+    return count
+
+
+def test_due_queries_do_not_rotate(tmp_path):
+    udm = create_udm(tmp_path, [(1, 1, day(0)), (2, MAX_SHELF, day(-1)), (3, MAX_SHELF, day(60))])
+    assert sorted(udm.get_due_cards()) == [(1, 1, day(0)), (2, MAX_SHELF, day(-1))]
+    assert udm.count_due_cards(day(60)) == 3
+    assert udm.get_setting(SETTING_COLD_WATERMARK) is None
+    assert count_cold_cards(udm) == 0
+
+
+def test_rotate_cold_cards(tmp_path):
+    udm = create_udm(tmp_path, [(1, 1, day(0)), (2, MAX_SHELF, day(-1)), (3, MAX_SHELF, day(60)),
+                                (4, MAX_SHELF - 1, day(60))])
+    udm.rotate_cold_cards()
+    assert udm.get_setting(SETTING_COLD_WATERMARK) == day(COLD_MARGIN)
+    assert count_cold_cards(udm) == 1
+    assert sorted(udm.get_due_cards()) == [(1, 1, day(0)), (2, MAX_SHELF, day(-1))]
+    assert udm.get_cards_on_shelf(MAX_SHELF) == [(2, MAX_SHELF, day(-1)), (3, MAX_SHELF, day(60))]
+
+    # past the watermark the due queries include the cold cards until the next rotation
+    assert udm.count_due_cards(day(60)) == 4
+    udm.rotate_cold_cards(day(50))
+    assert count_cold_cards(udm) == 0
+    assert udm.count_due_cards(day(60)) == 4
+
+
+def test_shift_due_dates(tmp_path):
+    udm = create_udm(tmp_path, [(1, 1, day(0)), (2, 2, day(3)), (3, 6, day(60))])
+    assert udm.shift_due_dates(2, [1, 3]) == 2
+    assert udm.get_all_cards() == [(1, 1, day(2)), (2, 2, day(3)), (3, 6, day(62))]
+    assert udm.shift_due_dates(-1) == 3
+    assert udm.get_all_cards() == [(1, 1, day(1)), (2, 2, day(2)), (3, 6, day(61))]
+    assert udm.shift_due_dates(5, []) == 0
+
+
+def test_shift_cold_cards(tmp_path):
+    udm = create_udm(tmp_path, [(1, 1, day(0)), (2, MAX_SHELF, day(60))])
+    udm.rotate_cold_cards()
+    assert udm.shift_due_dates(-50) == 2
+    assert sorted(udm.get_due_cards(day(10))) == [(1, 1, day(-50)), (2, MAX_SHELF, day(10))]
+
+
+def test_spread_overdue(tmp_path):
+    udm = create_udm(tmp_path, [(1, 1, day(-3)), (2, 1, day(-1)), (3, 2, day(0)), (4, 1, day(-2)), (5, 3, day(4))])
+    assert udm.spread_overdue(2) == 4
+    assert udm.get_all_cards() == [(1, 1, day(0)), (2, 1, day(1)), (3, 2, day(1)), (4, 1, day(0)), (5, 3, day(4))]
+
+
+def test_spread_overdue_selected_cards(tmp_path):
+    udm = create_udm(tmp_path, [(1, 1, day(-3)), (2, 1, day(-1)), (3, 2, day(-2)), (4, 1, day(5))])
+    assert udm.spread_overdue(3, [2, 3, 4]) == 2
+    assert udm.get_all_cards() == [(1, 1, day(-3)), (2, 1, day(1)), (3, 2, day(0)), (4, 1, day(5))]
@@ -0,0 +1,65 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests the balancing of due dates in data.dueHistogram.
+"""
+
+from data.dueHistogram import DueHistogram
+
+from datetime import date
+
+TODAY = date(2026, 10, 1)
+
+
+def create_histogram() -> DueHistogram:
+    histogram = DueHistogram()
+    histogram.build([("2026-10-01", 4), ("2026-10-08", 5), ("2026-10-09", 2), ("2026-10-10", 3), ("2026-10-11", 2)])
+    return histogram
+
+
+def test_counts():
+    histogram = create_histogram()
+    histogram.add("2026-10-02")
+    histogram.move("2026-10-01", "2026-10-02")
+    histogram.move("2026-10-11", "2026-10-12")
+    histogram.move("2026-10-11", "2026-10-12")
+    assert histogram.counts["2026-10-01"] == 3
+    assert histogram.counts["2026-10-02"] == 2
+    assert "2026-10-11" not in histogram.counts
+    assert histogram.count_until("2026-10-02") == 5
+    assert histogram.count_until("2026-12-31") == 17
+
+
+def test_balance_short_intervals():
+    histogram = create_histogram()
+    assert histogram.balance(0, TODAY) == 0
+    assert histogram.balance(2, TODAY) == 2
+
+
+def test_balance():
+    histogram = create_histogram()
+    assert histogram.balance(8, TODAY) == 8  # 2026-10-09 is the least loaded of 10-08 to 10-10
+    assert histogram.balance(7, TODAY) == 6  # no cards are due on 10-07
+    assert histogram.balance(9, TODAY) == 8  # 10-09 and 10-11 are tied, the earlier one is taken
+
+
+def test_balance_closest_on_ties():
+    histogram = DueHistogram()
+    assert histogram.balance(20, TODAY) == 20
+    histogram.add("2026-10-21")
+    assert histogram.balance(20, TODAY) == 19
@@ -0,0 +1,86 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests the grading of answers in data.grading.
+"""
+
+from data.cardManager import Card
+from data.grading import fuzzy_match, get_prompts, grade, grade_many, ROOT_FORMS, TRANSLATIONS
+from data.scheduler import WRONG, AGAIN, CORRECT
+
+from pytest import raises
+
+AC = Card(9, [("ac", "latin", "und", "german"), ("ac", "latin", "und auch", "german"),
+              ("atque", "latin", "und", "german")], ["adeo-9"])
+VOCARE = Card(1, [("vocare, voco, vocavi, vocatum", "latin", "rufen", "german")], [])
+
+
+def test_fuzzy_match():
+    assert fuzzy_match("rufen", "rufen")
+    assert fuzzy_match("rufn", "rufen")  # character missing
+    assert fuzzy_match("ruffen", "rufen")  # character too much
+    assert fuzzy_match("rifen", "rufen")  # character wrong
+    assert fuzzy_match("rfuen", "rufen")  # characters switched
+    assert fuzzy_match("fuhren", "führen")  # folded
+    assert not fuzzy_match("rfn", "rufen")
+    assert not fuzzy_match("laufen", "rufen")
+
+
+def test_prompts():
+    prompts = get_prompts(AC)
+    assert [(prompt.kind, prompt.text, prompt.solution) for prompt in prompts] == \
+        [(TRANSLATIONS, "ac: ", {"und", "und auch"}), (TRANSLATIONS, "atque: ", {"und"})]
+
+    prompts = get_prompts(VOCARE)
+    assert [(prompt.kind, prompt.text, prompt.solution) for prompt in prompts] == \
+        [(ROOT_FORMS, "vocare, ", {"voco, vocavi, vocatum"}), (TRANSLATIONS, ": ", {"rufen"})]
+
+
+def test_grade_correct():
+    result = grade(AC, ["und auch, und", "und"])
+    assert result.get_result() == CORRECT
+    assert all(verdict.is_exact() for verdict in result.verdicts)
+
+
+def test_grade_typos_are_no_mistakes():
+    result = grade(VOCARE, ["voco, vocavi, vocatun", "rufn"])
+    assert result.get_result() == CORRECT
+    assert [verdict.typos for verdict in result.verdicts] == \
+        [[("voco, vocavi, vocatun", "voco, vocavi, vocatum")], [("rufn", "rufen")]]
+
+
+def test_grade_mistakes():
+    result = grade(AC, ["und", "und"])
+    assert result.get_result() == AGAIN
+    assert result.verdicts[0].missing == ["und auch"]
+
+    result = grade(AC, ["oder", "aber"])
+    assert result.get_result() == WRONG
+    assert result.verdicts[0].wrong == ["oder"]
+    assert result.verdicts[0].missing == ["und", "und auch"]
+
+
+def test_grade_answer_count():
+    with raises(ValueError):
+        grade(AC, ["und"])
+
+
+def test_grade_many():
+    results = list(grade_many([(AC, ["und, und auch", "und"]), (VOCARE, ["", ""]), (AC, ["", ""])]))
+    assert [result.card_id for result in results] == [9, 1, 9]
+    assert [result.get_result() for result in results] == [CORRECT, WRONG, WRONG]
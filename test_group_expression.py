@@ -0,0 +1,77 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests the parsing and evaluation of group expressions in data.groupExpression.
+"""
+
+from data.bitmapIndex import to_bitmap, to_ids
+from data.groupExpression import evaluate, get_terms, parse_group_expression, Term
+from data.sortedIds import difference, ID_TYPECODE, intersect, union
+
+from array import array
+from pytest import raises
+
+GROUP_NAMES = ["adeo", "adeo-9", "adeo-10", "adeo-40", "adeo-41", "ratio-aa-2"]
+CARDS = {"adeo-9": [1, 2, 3], "adeo-10": [3, 4], "adeo-40": [5], "ratio-aa-2": [2, 6], "s0": [1, 4, 6], "s1": [5]}
+
+
+def show(tree) -> str:
+    if isinstance(tree, Term):
+        return str(tree)
+    return "(" + " ".join((show(tree[1]), tree[0], show(tree[2]))) + ")"
+
+
+def resolve(term: Term) -> array:
+    card_ids = set()
+    for name in ([term.name] if term.get_shelf() is not None else term.get_group_names(GROUP_NAMES)):
+        card_ids.update(CARDS.get(name, []))
+    return array(ID_TYPECODE, sorted(card_ids))
+
+
+def test_parse():
+    assert show(parse_group_expression("adeo-9")) == "adeo-9"
+    assert show(parse_group_expression("adeo-9..adeo-40 & s0|s1 - ratio-aa-2")) \
+        == "((adeo-9..adeo-40 & (s0 | s1)) - ratio-aa-2)"
+    assert show(parse_group_expression("a - (b - c) - d")) == "((a - (b - c)) - d)"
+    assert show(parse_group_expression(" adeo<b | s2<amo ")) == "(adeo<b | s2<amo)"
+
+
+def test_parse_errors():
+    for expression in ["", "adeo &", "(adeo", "adeo)", "adeo s0", "adeo & | s0", "adeo + s0"]:
+        with raises(ValueError):
+            parse_group_expression(expression)
+
+
+def test_terms():
+    terms = get_terms(parse_group_expression("adeo-9..adeo-40 & s12 - adeo<b"))
+    assert [(term.name, term.last, term.prefix) for term in terms] \
+        == [("adeo-9", "adeo-40", None), ("s12", None, None), ("adeo", None, "b")]
+    assert [term.get_shelf() for term in terms] == [None, 12, None]
+    assert terms[0].get_group_names(GROUP_NAMES) == ["adeo-9", "adeo-10", "adeo-40"]
+    assert Term("s1", "s3").get_shelf() is None
+    with raises(ValueError):
+        Term("adeo-9", "ratio-aa-2").get_group_names(GROUP_NAMES)
+
+
+def test_evaluate():
+    for expression, card_ids in [("adeo-9 | adeo-10", [1, 2, 3, 4]), ("adeo-9..adeo-40", [1, 2, 3, 4, 5]),
+                                 ("adeo-9..adeo-40 & s0|s1 - ratio-aa-2", [1, 4, 5]),
+                                 ("(adeo-9 - ratio-aa-2) | s1", [1, 3, 5]), ("adeo-9 & adeo-40", [])]:
+        tree = parse_group_expression(expression)
+        assert list(to_ids(evaluate(tree, lambda term: to_bitmap(resolve(term))))) == card_ids, expression
+        assert list(evaluate(tree, resolve, {"|": union, "&": intersect, "-": difference})) == card_ids, expression
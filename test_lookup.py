@@ -0,0 +1,91 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests the staged lookup of cards in data.cardManager against a small temporary card database.
+"""
+
+import data
+from data.cardManager import CardManager
+from data.databaseManager import DatabaseManager
+
+from pytest import fixture
+
+CARDS = [[("amare, amo, amavi, amatum", "latin", "lieben", "german")],  # 1
+         [("amicus", "latin", "Freund", "german")],  # 2
+         [("amica", "latin", "Freundin", "german")],  # 3
+         [("amor", "latin", "Liebe", "german")],  # 4
+         [("clamor", "latin", "Geschrei", "german")],  # 5
+         [("amo", "latin", "ich liebe", "german")],  # 6
+         [("amoenus", "latin", "lieblich", "german")]]  # 7
+
+
+@fixture
+def database_manager(tmp_path, monkeypatch) -> DatabaseManager:
+    monkeypatch.chdir(tmp_path)
+    database_manager = DatabaseManager()
+    for translations in CARDS:
+        database_manager.add_card(translations)
+
+    # the data module opens the databases in the working directory on first use
+    monkeypatch.setattr(data.database_manager, "instance", database_manager)
+    monkeypatch.setattr(data.session_manager, "instance", None)
+    monkeypatch.setattr(data.udm_handler, "instance", None)
+    CardManager.clear_caches()
+    yield database_manager
+    CardManager.clear_caches()
+
+
+def test_ranking(database_manager):
+    # equal, then starting with the string, shorter phrases first, then root forms, then containing it
+    assert list(CardManager.lookup_card_ids("amo", "latin")) == [6, 4, 7, 1, 5]
+    assert list(CardManager.lookup_card_ids("AMICUS", "latin")) == [2]
+    assert list(CardManager.lookup_card_ids("amamus", "latin")) == [1]  # the root form amare
+    assert list(CardManager.lookup_card_ids("xyz", "latin")) == []
+
+
+def test_regular_expressions(database_manager):
+    assert list(CardManager.lookup_card_ids("^ami.", "latin")) == [2, 3]
+    assert list(CardManager.lookup_card_ids("or$", "latin")) == [4, 5]
+
+
+def test_german(database_manager):
+    assert list(CardManager.lookup_card_ids("Freund", "german"))[0] == 2
+    assert 1 not in CardManager.lookup_card_ids("Freund", "german")
+
+
+def test_only_the_displayed_page_is_loaded(database_manager, monkeypatch):
+    loaded = []
+    get_cards = database_manager.get_cards
+
+    def record(card_ids, cursor=None):
+        if cursor is None:
+            loaded.append(card_ids)
+        return get_cards(card_ids, cursor)
+
+    monkeypatch.setattr(database_manager, "get_cards", record)
+
+    pages = CardManager.lookup_pages("amo", "latin", page_size=2)
+    assert [card.get_id() for card in next(pages)] == [6, 4]
+    assert loaded == [[6, 4]]
+    assert [card.get_id() for card in next(pages)] == [7, 1]
+    assert loaded == [[6, 4], [7, 1]]
+    pages.close()
+
+    cards = list(CardManager.lookup("amo", "latin"))
+    assert [card.get_id() for card in cards] == [6, 4, 7, 1, 5]
+    assert str(cards[0].get_translations()[0][1]) == "ich liebe"
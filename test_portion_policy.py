@@ -0,0 +1,80 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests the portion policies of data.portionPolicy and the query selecting the due portion in data.userDatabaseManager.
+"""
+
+from data.databaseConstants import CREATE_TABLE_CARD_GROUP, TABLE_CARD_GROUP
+from data.portionPolicy import get_portion_policy, PortionPolicy
+from data.userDatabaseManager import UserDatabaseManager
+
+from datetime import date, timedelta
+from pytest import raises
+from sqlite3 import connect
+
+# card_id: (shelf, days until due, group_ids), the group of a card is its newest one
+CARDS = {1: (0, -4, [1]), 2: (0, -3, [1]), 3: (0, -2, [1]), 4: (0, -1, [2]), 5: (3, -10, [1]), 6: (3, -9, [2]),
+         7: (1, -2, [2, 3]), 8: (0, 1, [1])}
+
+
+def create_udm(directory) -> UserDatabaseManager:
+    catalog = str(directory / "catalog.sqlite3")
+    db = connect(catalog)
+    db.execute(CREATE_TABLE_CARD_GROUP)
+    db.executemany("INSERT INTO " + TABLE_CARD_GROUP + " VALUES (?,?);",
+                   [(group_id, card_id) for card_id, (_, _, group_ids) in CARDS.items() for group_id in group_ids])
+    db.commit()
+    db.close()
+
+    udm = UserDatabaseManager("test", directory=str(directory), catalog=catalog)
+    for card_id, (shelf, days, _) in CARDS.items():
+        udm.add_card(card_id, shelf, (date.today() + timedelta(days=days)).isoformat())
+    return udm
+
+
+def test_get_portion_policy():
+    policy = get_portion_policy("size=5 fair=1 s0=2")
+    assert (policy.size, policy.priority_shelf, policy.fair, policy.quotas) == (5, 2, True, {0: 2})
+    assert policy.get_spec() == "size=5 priority_shelf=2 fair=1 s0=2"
+    assert get_portion_policy(policy.get_spec()).get_spec() == policy.get_spec()
+    assert get_portion_policy("priority_shelf=-1").priority_shelf == -1
+    with raises(ValueError):
+        get_portion_policy("size=-1")
+    with raises(ValueError):
+        get_portion_policy("size=many")
+    with raises(ValueError):
+        get_portion_policy("color=1")
+
+
+def test_priority_shelves_first(tmp_path):
+    udm = create_udm(tmp_path)
+    assert udm.get_due_portion(PortionPolicy()) == [1, 2, 3, 7, 4, 5, 6]
+    assert udm.get_due_portion(PortionPolicy(size=4)) == [1, 2, 3, 7]
+    assert udm.get_due_portion(PortionPolicy(priority_shelf=-1)) == [5, 6, 1, 2, 3, 7, 4]
+
+
+def test_quotas(tmp_path):
+    udm = create_udm(tmp_path)
+    assert udm.get_due_portion(PortionPolicy(quotas={0: 2})) == [1, 2, 7, 5, 6]
+    assert udm.get_due_portion(PortionPolicy(quotas={0: 0, 3: 1})) == [7, 5]
+
+
+def test_fair(tmp_path):
+    udm = create_udm(tmp_path)
+    assert udm.get_due_portion(PortionPolicy(priority_shelf=-1, fair=True)) == [5, 6, 7, 1, 4, 2, 3]
+    assert udm.get_due_portion(PortionPolicy(size=3, fair=True)) == [1, 7, 4]  # one card of each group
@@ -0,0 +1,50 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests the time budget of regular expression searches in data.regexSandbox.
+"""
+
+from data.regexSandbox import search, RegexTimeout, BATCH_SIZE
+
+from re import error
+from time import monotonic
+from pytest import raises
+
+CATASTROPHIC = "(a+)+$"
+TIME_BUDGET = 0.5  # seconds
+MARGIN = 2.0  # seconds, for starting and stopping the worker on a loaded machine
+
+
+def test_search():
+    texts = [(1, "amicus"), (2, "domus"), (3, "amica")]
+    assert list(search("^ami", texts)) == [1, 3]
+    assert list(search("x", texts)) == []
+    assert list(search("x", [])) == []
+    with raises(error):
+        list(search("(", texts))
+
+
+def test_catastrophic_pattern_is_cancelled():
+    texts = [(text_id, "aaa") for text_id in range(BATCH_SIZE)] + [(BATCH_SIZE, "a" * 40 + "b")]
+    found = []
+    start = monotonic()
+    with raises(RegexTimeout):
+        for text_id in search(CATASTROPHIC, texts, TIME_BUDGET):
+            found.append(text_id)
+    assert monotonic() - start < TIME_BUDGET + MARGIN
+    assert found == list(range(BATCH_SIZE))  # the matches sent before the worker got stuck
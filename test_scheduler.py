@@ -0,0 +1,90 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests the schedulers in data.scheduler and the projection in data.forecast.
+"""
+
+from data.forecast import forecast
+from data.scheduler import get_scheduler, get_shelf, MAX_SHELF, WRONG, AGAIN, CORRECT
+
+from pytest import raises
+
+HISTORY = [("2026-10-01", 1, CORRECT), ("2026-10-02", 2, CORRECT)]
+
+
+def test_leitner():
+    leitner = get_scheduler()
+    assert leitner.schedule(1, CORRECT, []) == (2, 3)
+    assert leitner.schedule(MAX_SHELF, CORRECT, []) == (MAX_SHELF, 127)
+    assert leitner.schedule(4, AGAIN, []) == (2, 0)
+    assert leitner.schedule(3, AGAIN, []) == (1, 0)
+    assert leitner.schedule(2, AGAIN, []) == (0, 0)  # below MIN_AGAIN_SHELF AGAIN counts as WRONG
+    assert leitner.schedule(5, WRONG, []) == (0, 0)
+
+
+def test_sm2():
+    sm2 = get_scheduler("sm2")
+    state, interval, last_date = sm2.replay(1, HISTORY)
+    assert (state, interval, last_date.isoformat()) == ((4, 3, 2.5, 15), 15, "2026-10-02")
+    assert sm2.schedule(1, CORRECT, HISTORY) == (5, 38)
+    assert sm2.schedule(1, WRONG, HISTORY) == (0, 1)
+
+
+def test_fsrs():
+    fsrs = get_scheduler("fsrs retention=0.85")
+    assert fsrs.get_spec() == "fsrs retention=0.85"
+    assert fsrs.schedule(0, CORRECT, []) == (2, 6)
+    shelf, interval = fsrs.schedule(3, WRONG, HISTORY)
+    assert shelf == 0 and interval >= 1
+
+
+def test_reschedule_many():
+    cards = [(1, 2, "2026-10-10"), (2, 3, "2026-10-11")]
+    assert get_scheduler().reschedule_many(cards, {1: HISTORY}) == [(1, 3, "2026-10-09"), (2, 3, "2026-10-11")]
+
+
+def test_get_scheduler():
+    assert get_scheduler("sm2") is get_scheduler("sm2")
+    assert get_scheduler("sm2 initial_ease=2.3").parameters["initial_ease"] == 2.3
+    with raises(ValueError):
+        get_scheduler("anki")
+    with raises(ValueError):
+        get_scheduler("sm2 bonus=1")
+    with raises(ValueError):
+        get_scheduler("sm2 initial_ease=high")
+
+
+def test_get_shelf():
+    assert [get_shelf(interval) for interval in (0, 1, 3, 7, 1000)] == [1, 1, 2, 3, MAX_SHELF]
+
+
+def test_forecast_leitner():
+    # 10 cards on shelf 1 due today are due again in 3 days on shelf 2, then in 7 days on shelf 3
+    assert forecast([(1, 0, 10)], 12) == [10, 0, 0, 10, 0, 0, 0, 0, 0, 0, 10, 0]
+
+    # the forgotten half is learned again and due the next day on shelf 1, the remembered half in 3 days
+    assert forecast([(1, 0, 10)], 4, 0.5) == [10, 5, 2.5, 5 + 1.25]
+
+
+def test_forecast_other_schedulers():
+    schedule = [(1, 0, 30), (3, 2, 20), (MAX_SHELF, 40, 100)]
+    for spec in ("sm2", "fsrs"):
+        counts = forecast(schedule, 60, 0.9, get_scheduler(spec))
+        assert len(counts) == 60
+        assert counts[0] == 30 and counts[2] >= 20
+        assert sum(counts[:40]) < sum(counts)
@@ -0,0 +1,136 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests the review server over real HTTP connections, on an ephemeral port and a small temporary card database.
+"""
+
+import data
+import server
+from data.cardManager import CardManager
+from data.databaseManager import DatabaseManager
+
+from pytest import fixture
+from typing import Dict, Tuple
+import asyncio
+import json
+
+
+@fixture
+def catalog(tmp_path, monkeypatch) -> server.Catalog:
+    monkeypatch.chdir(tmp_path)
+    database_manager = DatabaseManager()
+    database_manager.add_card([("amicus", "latin", "Freund", "german")])
+    database_manager.add_card([("amica", "latin", "Freundin", "german")])
+    database_manager.add_card_to_group(1, "friends")
+    database_manager.add_card_to_group(2, "friends")
+
+    # the data module opens the databases in the working directory on first use
+    monkeypatch.setattr(data.database_manager, "instance", database_manager)
+    monkeypatch.setattr(data.session_manager, "instance", None)
+    monkeypatch.setattr(data.udm_handler, "instance", None)
+    CardManager.clear_caches()
+    catalog = server.Catalog()
+    catalog.load()
+    yield catalog
+    CardManager.clear_caches()
+
+
+async def request(port: int, method: str, path: str, data: Dict = None) -> Tuple[int, Dict]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(data).encode("utf-8") if data is not None else b""
+    writer.write("{} {} HTTP/1.1\r\nConnection: close\r\nContent-Length: {}\r\n\r\n"
+                 .format(method, path, len(body)).encode("latin-1") + body)
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+def serve(catalog: server.Catalog, client):
+    """
+    Runs client(review_server, port) against a server listening on an ephemeral port.
+    """
+    async def run():
+        review_server = server.ReviewServer(catalog, worker_count=2)
+        tcp_server = await asyncio.start_server(review_server.handle_connection, "127.0.0.1", 0)
+        try:
+            return await client(review_server, tcp_server.sockets[0].getsockname()[1])
+        finally:
+            tcp_server.close()
+            await tcp_server.wait_closed()
+            review_server.close()
+
+    return asyncio.run(run())
+
+
+def test_review(catalog):
+    async def client(review_server, port):
+        assert await request(port, "GET", "/users/test/next") == (404, {"error": "User test does not exist."})
+        assert await request(port, "POST", "/users/test/use", {"group": "enemies"}) \
+            == (404, {"error": "Group enemies does not exist."})
+        assert await request(port, "POST", "/users/test/use", {"group": "friends"}) \
+            == (200, {"user": "test", "group": "friends", "cards": 2, "added": 2})
+        assert (await request(port, "POST", "/users/test/use", {"group": "friends"}))[1]["added"] == 0
+
+        status, response = await request(port, "GET", "/users/test/next")
+        assert status == 200 and response["due"] == 2
+        card = response["card"]
+        assert card["card_id"] in (1, 2) and card["groups"] == ["friends"] and len(card["prompts"]) == 1
+
+        answer = "Freund" if card["card_id"] == 1 else "Freundin"
+        status, response = await request(port, "POST", "/users/test/answer",
+                                         {"card_id": card["card_id"], "answers": [answer]})
+        assert status == 200
+        assert (response["result"], response["mistakes"], response["shelf"]) == ("correct", 0, 2)
+
+        status, response = await request(port, "GET", "/users/test/next")
+        assert response["due"] == 1 and response["card"]["card_id"] != card["card_id"]
+
+        wrong_id = response["card"]["card_id"]
+        status, response = await request(port, "POST", "/users/test/answer",
+                                         {"card_id": wrong_id, "answers": ["falsch"]})
+        assert (status, response["result"], response["shelf"]) == (200, "wrong", 0)
+        status, response = await request(port, "GET", "/users/test/next")
+        assert (response["due"], response["card"]["card_id"], response["card"]["shelf"]) == (1, wrong_id, 0)
+
+        # only the lock of the user with an open database is kept
+        assert set(review_server.locks) == {"test"}
+        review_server.sessions.close("test")
+        await asyncio.sleep(0)
+        assert review_server.locks == {}
+
+    serve(catalog, client)
+
+
+def test_errors(catalog, monkeypatch):
+    def fail(udm):
+        raise RuntimeError("secret details")
+
+    monkeypatch.setattr(server, "get_due_cards", fail)
+
+    async def client(review_server, port):
+        assert (await request(port, "GET", "/users/nobody/due"))[0] == 404
+        assert (await request(port, "GET", "/users/x/unknown"))[0] == 404
+        assert (await request(port, "GET", "/users/x/answer"))[0] == 405
+        assert (await request(port, "POST", "/users/x/use", {"group": 1}))[0] == 400
+        assert review_server.locks == {}
+
+        await request(port, "POST", "/users/test/use", {"group": "friends"})
+        assert await request(port, "GET", "/users/test/due") == (500, {"error": "Internal server error."})
+
+    serve(catalog, client)
@@ -0,0 +1,73 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests the card sort keys of data.databaseManager, kept up to date by triggers.
+"""
+
+from data.databaseConstants import DROP_TRIGGER_CARD_DELETE, DROP_TRIGGER_CARD_INSERT, DROP_TRIGGER_PHRASE_SORT_KEY
+from data.databaseManager import DatabaseManager
+
+from pytest import fixture
+
+
+@fixture
+def database_manager(tmp_path, monkeypatch) -> DatabaseManager:
+    monkeypatch.chdir(tmp_path)
+    database_manager = DatabaseManager()
+    database_manager.add_card([("villa", "latin", "Landhaus", "german")])
+    database_manager.add_card([("Haus", "german", "domus", "latin"), ("aedes", "latin", "Haus", "german")])
+    database_manager.add_card([("amicus", "latin", "Freund", "german")])
+    database_manager.add_card([("cena", "latin", "Mahl", "german"), ("epulae", "latin", "Mahl", "german")])
+    return database_manager
+
+
+def test_card_ids_before(database_manager):
+    assert database_manager.get_card_ids_before("z") == [3, 4, 2, 1]  # amicus, cena, domus, villa
+    assert database_manager.get_card_ids_before("d") == [3, 4]
+    assert database_manager.get_card_ids_before("a") == []
+
+
+def test_sort_key_triggers(database_manager):
+    database_manager.update_card(4, [], [("cena", "latin", "Mahl", "german")])
+    assert database_manager.get_card_ids_before("z") == [3, 2, 4, 1]  # epulae is the key of card 4 now
+    database_manager.update_card(4, [], [("epulae", "latin", "Mahl", "german")])
+    assert database_manager.get_card_ids_before("z") == [3, 2, 1]
+
+    database_manager.edit_translation(("amicus", "latin", "Freund", "german"), ("socius", "latin", "Freund", "german"))
+    assert database_manager.get_card_ids_before("z") == [2, 3, 1]
+
+
+def test_outdated_database(database_manager):
+    # the schema of databases created before the search and sort keys
+    db = database_manager.get_connection()
+    for drop_trigger in (DROP_TRIGGER_CARD_INSERT, DROP_TRIGGER_CARD_DELETE, DROP_TRIGGER_PHRASE_SORT_KEY):
+        db.execute(drop_trigger)
+    db.execute("DROP TABLE card_sort_key;")
+    db.execute("DROP INDEX phrase_search_key;")
+    db.execute("ALTER TABLE phrase DROP COLUMN search_key;")
+    db.commit()
+    db.close()
+    assert database_manager.is_outdated()
+
+    # migrated when opened
+    database_manager = DatabaseManager()
+    assert not database_manager.is_outdated()
+    assert database_manager.get_card_ids_before("z") == [3, 4, 2, 1]
+    database_manager.add_card([("aqua", "latin", "Wasser", "german")])
+    assert database_manager.get_card_ids_before("b") == [3, 5]
+    assert database_manager.get_card_ids_before("z") == [3, 5, 4, 2, 1]
@@ -0,0 +1,82 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Tests that importing cli neither opens a database nor imports the modules only needed by single commands,
+using 'python -X importtime'.
+Run directly to check the startup time budget and see the slowest modules: python test_startup_time.py
+Wall-clock budgets depend on the machine, so pytest does not check it.
+"""
+
+from os.path import abspath, dirname
+from re import match
+from subprocess import run
+import sys
+
+BUDGET_MS = 40
+RUNS = 5
+FORBIDDEN_MODULES = ("sqlite3", "multiprocessing", "data.databaseManager", "data.cardManager", "cli.questioning")
+
+
+def measure() -> (int, dict):
+    """
+    Imports cli in a fresh interpreter and parses the import times.
+    :return: the cumulative import time of cli in microseconds and a dict of the self times of all modules
+    """
+    result = run([sys.executable, "-X", "importtime", "-c", "import cli"],
+                 cwd=dirname(abspath(__file__)), capture_output=True, text=True, check=True)
+    total = None
+    self_times = {}
+    for line in result.stderr.splitlines():
+        m = match(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)", line)
+        if m:
+            self_times[m.group(4)] = int(m.group(1))
+            if m.group(4) == "cli":
+                total = int(m.group(2))
+    return total, self_times
+
+
+def measure_best() -> (int, dict):
+    """
+    Measures RUNS times, to ignore the runs slowed down by other processes.
+    :return: the fastest run as returned by measure
+    """
+    return min((measure() for _ in range(RUNS)), key=lambda run_result: run_result[0])
+
+
+def test_no_forbidden_modules_on_startup():
+    _, self_times = measure()
+    imported = [name for name in FORBIDDEN_MODULES if name in self_times]
+    assert not imported, "imported on startup: {}".format(", ".join(imported))
+
+
+def main():
+    """
+    Measures the startup time, prints the slowest modules and exits with status 1 if the budget is exceeded.
+    """
+    total, self_times = measure_best()
+    print("importing cli took {:.1f} ms (best of {}), budget {} ms".format(total / 1000, RUNS, BUDGET_MS))
+    print("slowest modules:")
+    for name, self_time in sorted(self_times.items(), key=lambda item: -item[1])[:10]:
+        print("  {:6.1f} ms {}".format(self_time / 1000, name))
+    if total > BUDGET_MS * 1000:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests the trigram prefilter of regular expression lookups in data.trigramIndex.
+"""
+
+from data.trigramIndex import TrigramIndex, get_trigrams, regexp_query, AND, ANY, OR
+
+from re import search
+
+ROWS = [(1, "amicus", 10), (2, "amica", 11), (2, "amica", 12), (3, "domus", 13), (4, "Dominus", None),
+        (5, "cena", 14), (6, "kenia", 15), (7, "ac", 16), (8, "vocare, voco, vocavi, vocatum", 17)]
+PATTERNS = ["amic", "^dom", "us$", "mic.s", "(ami|dom)us", "[ck]en", "voca(re|vi)", "o+c", "ca?t", "x",
+            ".*", "ac", "d[a-z]+us", "(?i)DOM", "co, v"]
+
+
+def create_index() -> TrigramIndex:
+    index = TrigramIndex()
+    index.build(ROWS)
+    return index
+
+
+def test_get_trigrams():
+    assert get_trigrams("amica") == {"ami", "mic", "ica"}
+    assert get_trigrams("ac") == set()
+
+
+def test_regexp_query():
+    assert regexp_query("amic") == (AND, ["ami", "mic"])
+    assert regexp_query("(ami|dom)us") == (OR, [(AND, ["ami", "ius", "miu"]), (AND, ["dom", "mus", "omu"])])
+    assert regexp_query("a.c") == ANY
+    assert regexp_query("ab") == ANY
+
+
+def test_build():
+    index = create_index()
+    assert index.phrase_cards[2] == {11, 12}
+    assert index.phrase_cards[4] == set()
+    assert list(index.postings["mic"]) == [1, 2]
+    assert list(index.ids) == list(range(1, 9))
+
+
+def test_search_matches_regular_expression():
+    index = create_index()
+    for pattern in PATTERNS:
+        expected = [phrase_id for phrase_id, text in sorted(index.texts.items()) if search(pattern, text)]
+        assert index.search(pattern) == expected, pattern
+        assert set(expected) <= set(index.get_candidates(pattern)), pattern
+
+
+def test_candidates_are_prefiltered():
+    index = create_index()
+    assert list(index.get_candidates("amic")) == [1, 2]
+    assert list(index.get_candidates("[ck]en")) == [5, 6]
+    assert list(index.get_candidates("ac")) == list(range(1, 9))
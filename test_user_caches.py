@@ -0,0 +1,92 @@
+# coding=utf-8
+#
+# Copyright (C) 2016 Julian Mueller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests that the in-memory caches of data.userDatabaseManager follow only committed changes.
+"""
+
+from data.userDatabaseConstants import TABLE_REVIEW
+from data.userDatabaseManager import UserDatabaseManager
+
+from datetime import date, timedelta
+from pytest import raises
+from sqlite3 import IntegrityError
+
+
+def day(offset: int) -> str:
+    return (date.today() + timedelta(days=offset)).isoformat()
+
+
+def load_caches(udm: UserDatabaseManager):
+    udm.get_due_histogram()
+    udm.get_due_queue()
+    udm.get_shelf_bitmaps()
+
+
+def get_caches(udm: UserDatabaseManager) -> tuple:
+    due_queue = udm.get_due_queue()
+    return udm.get_due_histogram().counts, due_queue.cards, udm.get_shelf_bitmaps().shelves
+
+
+def get_fresh_caches(udm: UserDatabaseManager) -> tuple:
+    udm.due_histogram = udm.due_queue = udm.shelf_bitmaps = None
+    return get_caches(udm)
+
+
+def create_udm(directory) -> UserDatabaseManager:
+    udm = UserDatabaseManager("test", directory=str(directory))
+    udm.keep_connection()
+    udm.add_card(1, 1, day(0))
+    udm.add_card(2, 3, day(2))
+    load_caches(udm)
+    return udm
+
+
+def test_committed_changes(tmp_path):
+    udm = create_udm(tmp_path)
+    udm.add_card(3, 1, day(1))
+    udm.update_card((1, 2, day(3)), (1, 2))
+    assert get_caches(udm) == get_fresh_caches(udm)
+    assert udm.get_next_due_card(day(1)) == (3, 1, day(1))
+
+
+def test_failed_update(tmp_path):
+    udm = create_udm(tmp_path)
+    db = udm.get_connection()
+    db.execute("CREATE TRIGGER fail_review BEFORE INSERT ON " + TABLE_REVIEW
+               + " BEGIN SELECT RAISE(ABORT, 'no reviews'); END;")
+    db.commit()
+    db.close()
+
+    caches = get_caches(udm)
+    with raises(IntegrityError):
+        udm.update_card((1, 2, day(3)), (1, 2))
+    assert udm.get_card(1) == (1, 1, day(0))  # rolled back
+    assert get_caches(udm) == caches == get_fresh_caches(udm)
+    assert udm.get_next_due_card(day(0)) == (1, 1, day(0))
+
+
+def test_rolled_back_cursor(tmp_path):
+    udm = create_udm(tmp_path)
+    db = udm.get_connection()
+    cur = db.cursor()
+    udm.add_card(3, 1, day(-1), cur)
+    udm.update_card((2, 4, day(-2)), None, cur)
+    db.close()  # rolls back
+
+    assert udm.get_next_due_card(day(0)) == (1, 1, day(0))
+    assert get_caches(udm) == get_fresh_caches(udm)